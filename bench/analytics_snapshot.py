@@ -0,0 +1,125 @@
+"""
+Long-range sales analytics: SQLite row store vs the Parquet month snapshot.
+
+Builds a scratch database with --bills bills (--lines per bill) spread over
+--years years, snapshots every closed month, then times the analytics
+page's two queries over the whole range both ways and checks that the
+answers agree. Usage:
+
+    python bench/analytics_snapshot.py [--bills 700000] [--lines 3] [--years 3]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.snapshot import SalesAnalytics, SalesSnapshot  # noqa: E402
+
+TOP_MEDICINES = '''
+    SELECT m.brand_name, SUM(s.quantity) AS total_sold, SUM(s.total_amount) AS total_revenue
+    FROM sales s
+    JOIN medicines m ON s.medicine_id = m.id
+    WHERE s.sale_date BETWEEN ? AND ?
+    GROUP BY m.brand_name
+    ORDER BY total_sold DESC
+    LIMIT 10
+'''
+
+
+def build_db(db_file, bills, lines, first_day, days):
+    IndianPharmacyDB(db_file).conn.close()
+    conn = sqlite3.connect(db_file)
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO bills (id, bill_no, bill_date, payment_mode, subtotal, discount_amount,
+                           gst_amount, total, item_count)
+        SELECT i, 'BILL-C1-' || printf('%07d', i), date(?, '+' || (i * ? / ?) || ' days'),
+               'Cash', 30.0 * ?, 0, 5.4 * ?, 35.4 * ?, ?
+        FROM n
+    ''', (bills, first_day, days, bills, lines, lines, lines, lines))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ? - 1)
+        INSERT INTO sales (bill_id, bill_no, medicine_id, quantity, selling_price,
+                           total_amount, sale_date)
+        SELECT b.id, b.bill_no, (b.id + n.i) % 10 + 1, 2, 15.0, 30.0, b.bill_date
+        FROM bills b, n
+    ''', (lines,))
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat=3):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bills', type=int, default=700000)
+    parser.add_argument('--lines', type=int, default=3)
+    parser.add_argument('--years', type=int, default=3)
+    args = parser.parse_args()
+
+    today = date.today()
+    first_day = (today - timedelta(days=365 * args.years)).isoformat()
+    days = 365 * args.years
+    workdir = tempfile.mkdtemp(prefix='pragnya-snapshot-')
+    try:
+        db_file = os.path.join(workdir, 'analytics.db')
+        t0 = time.perf_counter()
+        build_db(db_file, args.bills, args.lines, first_day, days)
+        print(f"Built {args.bills:,} bills / {args.bills * args.lines:,} lines "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+        db = IndianPharmacyDB(db_file)
+        snapshot = SalesSnapshot(os.path.join(workdir, 'snapshots'))
+        t0 = time.perf_counter()
+        months = snapshot.refresh(db)
+        print(f"Snapshot of {len(months)} closed months in {time.perf_counter() - t0:.1f}s; "
+              f"incremental re-run {timed(lambda: snapshot.refresh(db), 1)[0]:.0f} ms")
+        analytics = SalesAnalytics(db, snapshot)
+        start, end = first_day, today.isoformat()
+
+        sqlite_ms, sqlite_daily = timed(lambda: db.get_daily_sales(start, end))
+        snap_ms, snap_daily = timed(lambda: analytics.daily_sales(start, end))
+        print(f"daily sales    sqlite {sqlite_ms:8.0f} ms   snapshot {snap_ms:6.0f} ms   "
+              f"x{sqlite_ms / snap_ms:.0f}")
+
+        sqlite_top_ms, sqlite_top = timed(
+            lambda: db.conn.execute(TOP_MEDICINES, (start, end)).fetchall())
+        snap_top_ms, snap_top = timed(lambda: analytics.top_medicines(start, end))
+        print(f"top medicines  sqlite {sqlite_top_ms:8.0f} ms   snapshot {snap_top_ms:6.0f} ms   "
+              f"x{sqlite_top_ms / snap_top_ms:.0f}")
+
+        checks = [
+            ('days', len(sqlite_daily), len(snap_daily)),
+            ('revenue', round(sqlite_daily['daily_revenue'].sum(), 2),
+             round(snap_daily['daily_revenue'].sum(), 2)),
+            ('units', int(sqlite_daily['daily_quantity'].sum()), int(snap_daily['daily_quantity'].sum())),
+            ('bills', int(sqlite_daily['daily_bills'].sum()), int(snap_daily['daily_bills'].sum())),
+            ('top units', sum(r[1] for r in sqlite_top), int(snap_top['total_sold'].sum())),
+        ]
+        mismatched = [c for c in checks if c[1] != c[2]]
+        for name, expected, got in mismatched:
+            print(f"MISMATCH {name}: sqlite {expected} snapshot {got}")
+        if mismatched:
+            sys.exit(1)
+        print("OK: snapshot + live results match SQLite")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
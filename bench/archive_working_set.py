@@ -0,0 +1,161 @@
+"""
+Hot database size and query latency before and after archiving.
+
+Builds a scratch database with --bills bills over --years years plus
+resolved alerts, then archives everything older than --keep-months into
+per-year files and VACUUMs. It compares file size, the working set of the
+sales/bills indexes and the latency of the everyday queries before and
+after, and checks that full-range reads (now unioned with the archive)
+return the same totals. Usage:
+
+    python bench/archive_working_set.py [--bills 500000] [--years 3] [--keep-months 12]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.archive import months_ago  # noqa: E402
+
+LINES = 3
+
+
+def build_db(db_file, bills, first_day, days):
+    IndianPharmacyDB(db_file).conn.close()
+    conn = sqlite3.connect(db_file)
+    conn.execute("UPDATE medicines SET quantity = 100000000")
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO bills (id, bill_no, bill_date, payment_mode, subtotal, discount_amount,
+                           gst_amount, total, item_count)
+        SELECT i, 'BILL-C1-' || printf('%07d', i), date(?, '+' || (i * ? / ?) || ' days'),
+               'Cash', 90.0, 0, 16.2, 106.2, 3
+        FROM n
+    ''', (bills, first_day, days, bills))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ? - 1)
+        INSERT INTO sales (bill_id, bill_no, medicine_id, quantity, selling_price,
+                           total_amount, sale_date)
+        SELECT b.id, b.bill_no, (b.id + n.i) % 10 + 1, 2, 15.0, 30.0, b.bill_date
+        FROM bills b, n
+    ''', (LINES,))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO alerts (medicine_id, alert_type, message, severity, created_date, resolved)
+        SELECT i % 10 + 1, 'LOW_STOCK', 'Low stock', 'MEDIUM', date(?, '+' || (i % ?) || ' days'),
+               i % 20 != 0
+        FROM n
+    ''', (bills // 10, first_day, days))
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat=20):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def measure(db_file, today, month_ago):
+    db = IndianPharmacyDB(db_file)
+    n = [0]
+
+    def bill():
+        n[0] += 1
+        db.record_bill(f'BENCH-{time.time_ns()}-{n[0]}',
+                       [{'id': 1, 'qty': 1, 'price': 15.0, 'subtotal': 15.0}])
+
+    pages = db.conn.execute('''
+        SELECT SUM(pgsize) / 1024 FROM dbstat
+        WHERE name IN ('sales', 'bills', 'idx_sales_sale_date', 'idx_sales_bill_id',
+                       'idx_bills_bill_date', 'idx_bills_bill_no', 'alerts')
+    ''').fetchone()[0] if _has_dbstat(db.conn) else None
+    result = {
+        'size': os.path.getsize(db_file) / 2 ** 20,
+        'tables': pages / 1024 if pages else float('nan'),
+        'today': timed(db.get_today_sales),
+        '30 days': timed(lambda: db.get_daily_sales(month_ago, today)),
+        'alerts': timed(lambda: db.get_dashboard_stats()),
+        'bill': timed(bill),
+    }
+    db.conn.close()
+    return result
+
+
+def _has_dbstat(conn):
+    try:
+        conn.execute("SELECT 1 FROM dbstat LIMIT 1")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bills', type=int, default=500000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--keep-months', type=int, default=12)
+    args = parser.parse_args()
+
+    today = date.today()
+    days = 365 * args.years
+    first_day = (today - timedelta(days=days)).isoformat()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    workdir = tempfile.mkdtemp(prefix='pragnya-archive-')
+    try:
+        db_file = os.path.join(workdir, 'hot.db')
+        build_db(db_file, args.bills, first_day, days)
+        before = measure(db_file, today.isoformat(), month_ago)
+
+        db = IndianPharmacyDB(db_file)
+        full_before = db.get_daily_sales(first_day, today.isoformat())
+        t0 = time.perf_counter()
+        moved = db.archive.archive_before(months_ago(args.keep_months))
+        alerts = db.archive.archive_alerts()
+        archived_in = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        db.conn.execute("VACUUM")
+        vacuumed_in = time.perf_counter() - t0
+        print(f"Archived {moved['bills']:,} bills / {moved['sales']:,} lines and "
+              f"{alerts['alerts']:,} alerts in {archived_in:.1f}s (VACUUM {vacuumed_in:.1f}s) "
+              f"into {len(db.archive.years())} yearly files")
+
+        t0 = time.perf_counter()
+        full_after = db.get_daily_sales(first_day, today.isoformat())
+        union_ms = (time.perf_counter() - t0) * 1000
+        db.conn.close()
+        after = measure(db_file, today.isoformat(), month_ago)
+
+        print(f"{'':<22}{'before':>10}{'after':>10}")
+        print(f"{'hot db size (MiB)':<22}{before['size']:>10.1f}{after['size']:>10.1f}")
+        print(f"{'sales/bills/alerts MiB':<22}{before['tables']:>10.1f}{after['tables']:>10.1f}")
+        for key in ('today', '30 days', 'alerts', 'bill'):
+            print(f"{key + ' (ms)':<22}{before[key]:>10.2f}{after[key]:>10.2f}")
+        print(f"full-range daily sales through the archive union: {union_ms:.0f} ms")
+
+        checks = [(col, round(full_before[col].sum(), 2), round(full_after[col].sum(), 2))
+                  for col in ('daily_revenue', 'daily_quantity', 'daily_bills')]
+        checks.append(('days', len(full_before), len(full_after)))
+        bad = [c for c in checks if c[1] != c[2]]
+        for name, expected, got in bad:
+            print(f"MISMATCH {name}: before {expected} after {got}")
+        if bad:
+            sys.exit(1)
+        print("OK: archived + hot totals match the original database")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
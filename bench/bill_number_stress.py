@@ -0,0 +1,118 @@
+"""
+Stress the bill number allocator under concurrent billing.
+
+Several processes (separate "counters" sharing one database, or all
+drawing from the same counter series with --shared-counter) record real
+bills through IndianPharmacyDB.record_bill at a target aggregate rate.
+The unique index on bills.bill_no rejects any duplicate, so the run
+reports both duplicates seen by the workers and bills the database
+refused. For comparison it also counts how many numbers the old
+`BILL%Y%m%d%H%M%S` scheme would have duplicated at the same rate. Usage:
+
+    python bench/bill_number_stress.py [--rate 100] [--seconds 10] [--processes 4]
+
+Exits non-zero on any collision.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.billno import BillNumberAllocator  # noqa: E402
+
+ITEMS = [{'id': 1, 'qty': 1, 'price': 15.0, 'subtotal': 15.0}]
+
+
+def worker(db_file, counter, rate, seconds, block_size, start_at, results):
+    db = IndianPharmacyDB(db_file)
+    db.conn.execute("PRAGMA busy_timeout=10000")
+    allocator = BillNumberAllocator(IndianPharmacyDB(db_file), block_size)
+
+    issued, legacy, rejected = [], [], 0
+    interval = 1.0 / rate
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    for i in range(int(rate * seconds)):
+        # Pace against the schedule, not the previous bill, to hold the rate
+        delay = start_at + i * interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        bill_no = allocator.next(counter)
+        legacy.append(f"BILL{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        try:
+            db.record_bill(bill_no, ITEMS)
+        except ValueError:
+            rejected += 1
+        issued.append(bill_no)
+
+    results.put((issued, legacy, rejected, allocator.blocks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rate', type=float, default=100, help='aggregate bills/sec')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--block-size', type=int, default=10)
+    parser.add_argument('--shared-counter', action='store_true',
+                        help='all processes draw from one counter series')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-billno-')
+    try:
+        db_file = os.path.join(workdir, 'stress.db')
+        conn = IndianPharmacyDB(db_file).conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("UPDATE medicines SET quantity = 100000000")
+        conn.commit()
+        conn.close()
+
+        results = multiprocessing.Queue()
+        start_at = time.time() + 1.0
+        procs = [
+            multiprocessing.Process(target=worker, args=(
+                db_file, 'C1' if args.shared_counter else f'C{n + 1}',
+                args.rate / args.processes, args.seconds, args.block_size, start_at, results))
+            for n in range(args.processes)
+        ]
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.time() - start_at
+
+        issued = [b for r in collected for b in r[0]]
+        legacy = [b for r in collected for b in r[1]]
+        rejected = sum(r[2] for r in collected)
+        blocks = sum(r[3] for r in collected)
+        stored = sqlite3.connect(db_file).execute(
+            "SELECT COUNT(*), COUNT(DISTINCT bill_no) FROM bills").fetchone()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    duplicates = len(issued) - len(set(issued))
+    print(f"{len(issued)} bills from {args.processes} processes in {elapsed:.1f}s "
+          f"({len(issued) / elapsed:.0f} bills/sec), {blocks} blocks of {args.block_size}")
+    print(f"  allocator: {duplicates} duplicate numbers, {rejected} rejected by unique index, "
+          f"{stored[0]} bills stored ({stored[1]} distinct)")
+    print(f"  old timestamp scheme at the same rate: "
+          f"{len(legacy) - len(set(legacy))} duplicate numbers")
+
+    if duplicates or rejected or stored[0] != len(issued):
+        print("FAIL")
+        sys.exit(1)
+    print("OK: zero collisions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Chain-wide query latency: sequential vs thread pool vs process pool fan-out.
+
+Creates --stores store databases with --bills bills each (spread over a
+year) and randomised stock, then times ChainView's stock, expiry and
+sales queries run one store at a time and fanned out over a thread and a
+process pool. Also sanity-checks the transfer suggestions. Usage:
+
+    python bench/chain_fanout.py [--stores 8] [--bills 200000]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.stores import ChainView  # noqa: E402
+
+
+class InlineExecutor:
+    """Runs submitted work immediately (the sequential baseline)"""
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:  # noqa: BLE001 - handed to the caller via the future
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def build_store(db_file, bills, seed):
+    IndianPharmacyDB(db_file).conn.close()
+    conn = sqlite3.connect(db_file)
+    first_day = (date.today() - timedelta(days=365)).isoformat()
+    # Stock varies per store so some are short and some have surplus
+    conn.execute("UPDATE medicines SET quantity = (id * 37 + ?) % 160, "
+                 "expiry_date = date('now', '+' || ((id * 53 + ?) % 400) || ' days')",
+                 (seed * 29, seed * 11))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO bills (id, bill_no, bill_date, payment_mode, subtotal, total, item_count)
+        SELECT i, 'BILL-S' || ? || '-' || i, date(?, '+' || (i * 365 / ?) || ' days'),
+               'Cash', 60.0, 70.8, 2
+        FROM n
+    ''', (bills, seed, first_day, bills))
+    conn.execute('''
+        INSERT INTO sales (bill_id, bill_no, medicine_id, quantity, selling_price, total_amount, sale_date)
+        SELECT id, bill_no, id % 10 + 1, 2, 15.0, 30.0, bill_date FROM bills
+        UNION ALL
+        SELECT id, bill_no, (id + 3) % 10 + 1, 2, 15.0, 30.0, bill_date FROM bills
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stores', type=int, default=8)
+    parser.add_argument('--bills', type=int, default=200000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-chain-')
+    try:
+        stores = []
+        t0 = time.perf_counter()
+        for n in range(args.stores):
+            db_file = os.path.join(workdir, f'S{n + 1}.db')
+            build_store(db_file, args.bills, n + 1)
+            stores.append({'code': f'S{n + 1}', 'name': f'Store {n + 1}', 'db_file': db_file})
+        print(f"Built {args.stores} stores x {args.bills:,} bills in {time.perf_counter() - t0:.1f}s")
+
+        start = (date.today() - timedelta(days=365)).isoformat()
+        end = date.today().isoformat()
+        executors = [('sequential', InlineExecutor()),
+                     ('threads', ThreadPoolExecutor(args.stores)),
+                     ('processes', ProcessPoolExecutor(min(args.stores, os.cpu_count() or 1)))]
+        print(f"{'':<12}{'stock':>10}{'expiring':>10}{'sales 1y':>10}   (ms, median of 5)")
+        for name, executor in executors:
+            chain = ChainView(stores, executor)
+            chain.stock()  # warm up pools and the OS page cache
+            print(f"{name:<12}{timed(chain.stock):>10.1f}{timed(lambda: chain.expiring(90)):>10.1f}"
+                  f"{timed(lambda: chain.daily_sales(start, end)):>10.1f}")
+            executor.shutdown()
+
+        chain = ChainView(stores)
+        stock = chain.stock()
+        transfers = chain.transfer_suggestions(stock)
+        by_store = stock.set_index(['brand_name', 'store'])
+        for t in transfers.itertuples(index=False):
+            donor = by_store.loc[(t.brand_name, t.from_store)]
+            assert t.quantity <= donor['transferable'], t
+        moved_in = transfers.groupby(['brand_name', 'to_store'])['quantity'].sum()
+        for (brand, store), qty in moved_in.items():
+            row = by_store.loc[(brand, store)]
+            assert row['quantity'] + qty <= row['min_quantity'], (brand, store)
+        print(f"{len(transfers)} transfer suggestions, {int(transfers['quantity'].sum())} units; "
+              f"OK: no donor over-drawn, no receiver pushed past its minimum")
+        chain.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
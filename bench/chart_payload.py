@@ -0,0 +1,196 @@
+"""
+Dashboard and analytics chart cost: build time and browser payload.
+
+Builds a scratch database with --bills bills over --years years and times
+what one rerun of each page spends on its charts: queries, building the
+figures, and the JSON that st.plotly_chart sends to the browser (with the
+Streamlit plotly template the app's figures carry). Three
+paths are compared over the whole date range:
+
+  legacy   the previous app code (plotly.express, every point, no caching)
+  rebuild  pragnya.charts after a data change (cache miss)
+  cached   a rerun with unchanged data (data_version + serialising only)
+
+It also checks that LTTB keeps the end points and the best and worst days.
+Usage:
+
+    python bench/chart_payload.py [--bills 300000] [--years 3]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly.express as px  # noqa: E402
+import plotly.graph_objects as go  # noqa: E402
+import plotly.io as pio  # noqa: E402
+from streamlit.elements.lib.streamlit_plotly_theme import configure_streamlit_plotly_theme  # noqa: E402
+
+from analytics_snapshot import build_db  # noqa: E402
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.charts import (expiry_timeline, sales_trend, stock_status_pie,  # noqa: E402
+                            top_medicines_bars)
+from pragnya.snapshot import SalesAnalytics  # noqa: E402
+
+
+def payload(figures):
+    """Bytes st.plotly_chart would send for these figures"""
+    return sum(len(pio.to_json(fig.to_dict(), validate=False)) for fig in figures)
+
+
+def fetch(db, analytics, start, end):
+    """Everything both versions query for one rerun of the two pages"""
+    return {'stats': db.get_dashboard_stats(), 'low': db.get_low_stock_medicines(),
+            'expiring': db.get_expiring_medicines(90),
+            'sales': analytics.daily_sales(start, end),
+            'top': analytics.top_medicines(start, end)}
+
+
+def legacy_figures(data):
+    """The dashboard and analytics charts as app.py built them before"""
+    stats = data['stats']
+    stock_data = {
+        'Status': ['Adequate', 'Low Stock', 'Out of Stock'],
+        'Count': [
+            stats['total_medicines'] - stats['low_stock'],
+            stats['low_stock'],
+            len(data['low'][data['low']['quantity'] == 0])
+        ]
+    }
+    figures = [px.pie(stock_data, values='Count', names='Status',
+                      color_discrete_sequence=['#28B463', '#F39C12', '#E74C3C'])]
+    expiring_df = data['expiring'].copy()
+    if not expiring_df.empty:
+        expiring_df['days_left'] = expiring_df['days_left'].astype(int)
+        expiring_df['status'] = expiring_df['days_left'].apply(
+            lambda x: 'Critical (<7)' if x <= 7 else 'Warning (8-30)' if x <= 30 else 'Normal'
+        )
+        figures.append(px.bar(expiring_df.head(10), x='brand_name', y='days_left',
+                              color='status', title='Top 10 Expiring Medicines',
+                              color_discrete_map={'Critical (<7)': '#E74C3C',
+                                                  'Warning (8-30)': '#F39C12',
+                                                  'Normal': '#28B463'}))
+    sales_data = data['sales']
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=sales_data['sale_date'],
+        y=sales_data['daily_revenue'],
+        name='Daily Revenue',
+        line=dict(color='#0A5C36', width=3),
+        fill='tozeroy',
+        fillcolor='rgba(10, 92, 54, 0.1)'
+    ))
+    fig.update_layout(title="Sales Trend", xaxis_title="Date", yaxis_title="Revenue (₹)",
+                      hovermode='x unified')
+    figures.append(fig)
+    top_meds = data['top']
+    figures.append(px.bar(top_meds, x='brand_name', y='total_sold',
+                          title='Top 10 Medicines by Quantity Sold',
+                          color='total_sold', color_continuous_scale='Viridis'))
+    figures.append(px.bar(top_meds, x='brand_name', y='total_revenue',
+                          title='Top 10 Medicines by Revenue',
+                          color='total_revenue', color_continuous_scale='Plasma'))
+    return figures
+
+
+def new_figures(data):
+    """The same charts through pragnya.charts (what the cached functions build)"""
+    stats = data['stats']
+    figures = [stock_status_pie(stats['total_medicines'], stats['low_stock'],
+                                int((data['low']['quantity'] == 0).sum()))]
+    if not data['expiring'].empty:
+        figures.append(expiry_timeline(data['expiring']))
+    figures.append(sales_trend(data['sales']))
+    figures.extend(top_medicines_bars(data['top']))
+    return figures
+
+
+def timed(fn, repeat=5):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bills', type=int, default=300000)
+    parser.add_argument('--years', type=int, default=3)
+    args = parser.parse_args()
+    configure_streamlit_plotly_theme()  # figures carry the template the app sends
+
+    today = date.today()
+    days = 365 * args.years
+    first_day = (today - timedelta(days=days)).isoformat()
+    workdir = tempfile.mkdtemp(prefix='pragnya-charts-')
+    try:
+        db_file = os.path.join(workdir, 'charts.db')
+        build_db(db_file, args.bills, 3, first_day, days)
+        db = IndianPharmacyDB(db_file)
+        # Some batches close to expiry so the expiry chart has bars
+        db.conn.execute("UPDATE medicines SET expiry_date = date('now', '+' || (id * 9) || ' days') "
+                        "WHERE id <= 8")
+        db.conn.commit()
+        analytics = SalesAnalytics(db)
+        start, end = first_day, today.isoformat()
+        query_ms, data = timed(lambda: fetch(db, analytics, start, end), repeat=3)
+        legacy_figures(data)  # warm up plotly's validators
+
+        cache = {}
+
+        def cached():
+            key = (db.data_version(), start, end)
+            if key not in cache:
+                cache[key] = new_figures(fetch(db, analytics, start, end))
+            return cache[key]
+
+        cached()
+        results = []
+        for name, fn, queries in (('legacy', lambda: legacy_figures(data), query_ms),
+                                  ('rebuild', lambda: new_figures(data), query_ms),
+                                  ('cached', cached, 0.0)):
+            build_ms, figures = timed(fn)
+            send_ms, size = timed(lambda: payload(figures))
+            points = max(len(trace.x) for fig in figures for trace in fig.data if trace.type != 'pie')
+            trend = next(fig for fig in figures if (fig.layout.title.text or '').startswith('Sales Trend'))
+            results.append((name, queries, build_ms, send_ms, size, payload([trend]), points))
+
+        print(f"{args.years} years of daily sales ({days} days), {args.bills:,} bills")
+        print(f"{'':<10}{'query ms':>10}{'figs ms':>10}{'json ms':>10}{'total ms':>10}"
+              f"{'payload KiB':>13}{'trend KiB':>11}{'max pts':>9}")
+        for name, queries, build_ms, send_ms, size, trend_size, points in results:
+            print(f"{name:<10}{queries:>10.1f}{build_ms:>10.1f}{send_ms:>10.1f}"
+                  f"{queries + build_ms + send_ms:>10.1f}"
+                  f"{size / 1024:>13.1f}{trend_size / 1024:>11.1f}{points:>9}")
+
+        sales = analytics.daily_sales(start, end)
+        trend = sales_trend(sales)
+        shown = set(trend.data[0].x)
+        must_keep = {sales['sale_date'].iloc[0], sales['sale_date'].iloc[-1],
+                     sales.loc[sales['daily_revenue'].idxmax(), 'sale_date'],
+                     sales.loc[sales['daily_revenue'].idxmin(), 'sale_date']}
+        if not must_keep <= shown:
+            print(f"MISSING from downsampled trend: {sorted(must_keep - shown)}")
+            sys.exit(1)
+        before = db.data_version()
+        db.record_bill('BENCH-1', [{'id': 1, 'qty': 1, 'price': 15.0, 'subtotal': 15.0}])
+        if db.data_version() == before:
+            print("data_version did not change after a commit")
+            sys.exit(1)
+        print(f"OK: trend keeps first/last/best/worst days ({len(shown)} of {len(sales)} points); "
+              f"data_version changes on commit")
+        db.conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+AI Assistant latency per intent: keyword chains vs the compiled router.
+
+Adds --medicines extra medicines to a scratch database (the old router
+scanned the whole medicines table twice per message), then times one
+message per intent three ways:
+
+  legacy  the previous process_query (copied here), nothing cached
+  cold    the compiled router right after a write (cache miss)
+  warm    the same question again with no write in between
+
+and checks that both routers give the same answers. Usage:
+
+    python bench/chatbot_latency.py [--medicines 5000] [--rounds 50]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB, PharmacyChatbot  # noqa: E402
+
+MESSAGES = [
+    ('greeting', 'hello there'),
+    ('medicine', 'tell me about augmentin 625mg'),
+    ('stock (low)', 'show low stock medicines'),
+    ('stock', 'check stock levels'),
+    ('expiry (soon)', 'expiry soon'),
+    ('expiry', 'expiry report'),
+    ('sales', "today's sales report"),
+    ('prescription', 'pending prescriptions'),
+    ('supplier', 'supplier details'),
+    ('help', 'help'),
+    ('default', 'what can you do'),
+]
+
+
+class LegacyChatbot(PharmacyChatbot):
+    """PharmacyChatbot routing before the compiled router, verbatim, uncached"""
+
+    def _cached(self, key, build):
+        return build()
+
+    def process_query(self, user_input):
+        user_input = user_input.lower().strip()
+        self.update_context(user_input)
+        if self.is_greeting(user_input):
+            return self.get_greeting_response()
+        medicine_info = self.extract_medicine_info(user_input)
+        if medicine_info:
+            return self.get_medicine_response(medicine_info)
+        if any(word in user_input for word in ['stock', 'available', 'quantity', 'kitna hai']):
+            return self.get_stock_response(user_input)
+        if any(word in user_input for word in ['expire', 'expiry', 'khatam', 'date']):
+            return self.get_expiry_response(user_input)
+        if any(word in user_input for word in ['sale', 'bikri', 'today sale', 'revenue']):
+            return self.get_sales_response()
+        if any(word in user_input for word in ['prescription', 'doctor', 'patient', 'rx']):
+            return self.get_prescription_response()
+        if any(word in user_input for word in ['supplier', 'company', 'order', 'supply']):
+            return self.get_supplier_response()
+        if 'help' in user_input or 'madad' in user_input:
+            return self.get_help_response()
+        return self.get_default_response()
+
+    def update_context(self, user_input):
+        medicines = self.db.cursor.execute("SELECT brand_name FROM medicines").fetchall()
+        medicine_names = [m[0].lower() for m in medicines]
+        for med in medicine_names:
+            if med in user_input:
+                self.context['last_medicine'] = med
+                break
+
+    def is_greeting(self, text):
+        greetings = ['hello', 'hi', 'hey', 'namaste', 'good morning', 'good afternoon']
+        return any(greet in text for greet in greetings)
+
+    def extract_medicine_info(self, text):
+        medicines = self.db.cursor.execute("SELECT id, brand_name, generic_name FROM medicines").fetchall()
+        for med_id, brand, generic in medicines:
+            if brand.lower() in text or generic.lower() in text:
+                return {'id': med_id, 'brand': brand, 'generic': generic}
+        return None
+
+
+def timed(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--medicines', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-chat-')
+    try:
+        db_file = os.path.join(workdir, 'chat.db')
+        IndianPharmacyDB(db_file).conn.close()
+        conn = sqlite3.connect(db_file)
+        conn.execute('''
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO medicines (brand_name, generic_name, company, expiry_date, quantity,
+                                   min_quantity, mrp, purchase_price, category)
+            SELECT 'Brand' || i || ' ' || (i % 7 * 100 + 50) || 'mg', 'Generic' || (i % 900),
+                   'Co' || (i % 40), date('now', '+' || (i % 400) || ' days'), i % 90, 20,
+                   10 + i % 300, 5 + i % 200, 'General'
+            FROM n
+        ''', (args.medicines,))
+        conn.commit()
+        conn.close()
+
+        db = IndianPharmacyDB(db_file)
+        for i in range(20):
+            db.record_bill(f'BENCH-{i}', [{'id': 3, 'qty': 1, 'price': 180.0, 'subtotal': 180.0}])
+        legacy, chatbot = LegacyChatbot(db), PharmacyChatbot(db)
+
+        def cold(message):
+            # What the first question after a sale sees: answers dropped, names rechecked
+            chatbot._version = chatbot._names_version = None
+            return chatbot.process_query(message)
+
+        print(f"{args.medicines + 10:,} medicines; median ms per message over {args.rounds} rounds")
+        print(f"{'intent':<15}{'legacy':>9}{'cold':>9}{'warm':>9}")
+        mismatches = []
+        for intent, message in MESSAGES:
+            timings = [timed(lambda: legacy.process_query(message), args.rounds),
+                       timed(lambda: cold(message), args.rounds),
+                       timed(lambda: chatbot.process_query(message), args.rounds)]
+            print(f"{intent:<15}" + ''.join(f"{t:>9.3f}" for t in timings))
+            if intent not in ('greeting', 'default'):
+                if legacy.process_query(message) != chatbot.process_query(message):
+                    mismatches.append(intent)
+
+        # Messages the old substring chains misrouted
+        for message in ("which medicines are expiring this week?", "what's expiring soon?"):
+            print(f"  {message!r}: legacy -> {legacy.process_query(message)[:40]!r}, "
+                  f"now -> {chatbot.process_query(message)[:40]!r}")
+        db.conn.close()
+        if mismatches:
+            print(f"MISMATCH in: {', '.join(mismatches)}")
+            sys.exit(1)
+        print("OK: both routers give the same answers for every deterministic intent")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""
+Deterministic synthetic data for a large pharmacy.
+
+Writes a fresh database with --skus medicine rows (several lots/batches
+per product, each with its own expiry), --years of bills and sales lines
+ending on --end, suppliers, stock and expiry alerts (resolved history
+plus open ones) and prescriptions with their items. The same seed,
+sizes and end date always give the same database.
+
+Sales follow an Indian season pattern per category (monsoon infections,
+spring allergies, winter coughs), a weekly cycle, yearly growth and a
+long-tailed popularity curve across products. Usage:
+
+    python bench/datagen.py out.db [--skus 10000] [--years 2] [--bills-per-day 300]
+                            [--seed 42] [--end YYYY-MM-DD]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.billno import format_bill_no  # noqa: E402
+
+# generic -> category; combination products pair two of these
+GENERICS = {
+    'Paracetamol': 'Analgesic', 'Ibuprofen': 'Analgesic', 'Diclofenac': 'Analgesic',
+    'Aceclofenac': 'Analgesic', 'Amoxicillin': 'Antibiotic', 'Azithromycin': 'Antibiotic',
+    'Cefixime': 'Antibiotic', 'Ciprofloxacin': 'Antibiotic', 'Doxycycline': 'Antibiotic',
+    'Ramipril': 'Cardiac', 'Amlodipine': 'Cardiac', 'Telmisartan': 'Cardiac',
+    'Atorvastatin': 'Cardiac', 'Metoprolol': 'Cardiac', 'Metformin': 'Diabetic',
+    'Glimepiride': 'Diabetic', 'Sitagliptin': 'Diabetic', 'Vildagliptin': 'Diabetic',
+    'Pantoprazole': 'GI', 'Omeprazole': 'GI', 'Rabeprazole': 'GI', 'Ondansetron': 'GI',
+    'Dicyclomine': 'GI', 'Loperamide': 'GI', 'Cetirizine': 'Antihistamine',
+    'Levocetirizine': 'Antihistamine', 'Montelukast': 'Antihistamine',
+    'Fexofenadine': 'Antihistamine', 'Dextromethorphan': 'Cough', 'Ambroxol': 'Cough',
+    'Guaifenesin': 'Cough', 'Cholecalciferol': 'Vitamin', 'Methylcobalamin': 'Vitamin',
+    'Folic Acid': 'Vitamin',
+}
+
+# Month multipliers (Jan..Dec) per category
+SEASONALITY = {
+    'Analgesic': (1.1, 1.0, 1.0, 1.0, 1.0, 1.2, 1.4, 1.4, 1.3, 1.1, 1.0, 1.1),
+    'Antibiotic': (1.1, 1.0, 0.9, 0.9, 1.0, 1.3, 1.6, 1.6, 1.4, 1.1, 1.0, 1.1),
+    'Cardiac': (1.0,) * 12,
+    'Diabetic': (1.0,) * 12,
+    'GI': (0.9, 0.9, 1.0, 1.2, 1.3, 1.3, 1.4, 1.3, 1.1, 1.2, 1.1, 0.9),
+    'Antihistamine': (0.9, 1.2, 1.5, 1.6, 1.3, 1.0, 0.9, 0.9, 1.0, 1.2, 1.3, 1.0),
+    'Cough': (1.6, 1.3, 1.0, 0.8, 0.7, 0.8, 1.0, 1.0, 0.9, 1.0, 1.3, 1.6),
+    'Vitamin': (1.1, 1.0, 1.0, 0.9, 0.9, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.1),
+}
+SCHEDULE = {'Antibiotic': 'Schedule H', 'Cardiac': 'Schedule H', 'Diabetic': 'Schedule H'}
+WEEKDAY = (1.05, 1.0, 1.0, 1.0, 1.05, 1.1, 0.8)  # Mon..Sun
+YEARLY_GROWTH = 0.12
+
+COMPANIES = ['Sun Pharma', 'Cipla', 'Lupin', "Dr. Reddy's", 'Mankind', 'Alkem', 'Torrent',
+             'Zydus', 'Glenmark', 'Intas', 'Abbott', 'GSK', 'USV', 'Alembic', 'Micro Labs',
+             'Macleods', 'Ipca', 'Ajanta', 'Emcure', 'Wockhardt']
+CITIES = [('Mumbai', 'Maharashtra', '27'), ('Ahmedabad', 'Gujarat', '24'),
+          ('Hyderabad', 'Telangana', '36'), ('Bengaluru', 'Karnataka', '29'),
+          ('Delhi', 'Delhi', '07'), ('Chennai', 'Tamil Nadu', '33')]
+SYLLABLES = ['ra', 'no', 'vi', 'ta', 'zo', 'mel', 'cor', 'dex', 'lin', 'pra', 'xa', 'ten',
+             'mox', 'cef', 'glu', 'pan', 'sto', 'ami', 'lo', 'tel']
+FORMS = ['', ' Tab', ' SR', ' Forte', ' Plus', ' DSR', ' Syrup']
+STRENGTHS = [5, 10, 20, 40, 50, 100, 250, 500, 625, 650]
+DOCTORS = [f'Dr. {first} {last}' for first in ('Anil', 'Meera', 'Suresh', 'Kavita', 'Rahul',
+                                               'Priya', 'Vikram', 'Neha')
+           for last in ('Sharma', 'Iyer', 'Patel', 'Reddy', 'Gupta')]
+PATIENTS = [f'{first} {last}' for first in ('Ramesh', 'Sunita', 'Arjun', 'Lakshmi', 'Imran',
+                                            'Pooja', 'Harish', 'Fatima', 'Gopal', 'Anita')
+            for last in ('Kumar', 'Nair', 'Singh', 'Joshi', 'Khan', 'Das')]
+
+
+def catalogue(rng, skus):
+    """Medicine rows: products with 1-3 lots each, cut to exactly `skus` rows"""
+    generics = list(GENERICS)
+    rows = []
+    product = 0
+    while len(rows) < skus:
+        generic = generics[rng.integers(len(generics))]
+        if rng.random() < 0.2:
+            other = generics[rng.integers(len(generics))]
+            if other != generic:
+                generic = f'{generic} + {other}'
+        category = GENERICS[generic.split(' + ')[0]]
+        brand = (''.join(SYLLABLES[i] for i in rng.integers(len(SYLLABLES), size=3)).title()
+                 + FORMS[rng.integers(len(FORMS))] + f' {STRENGTHS[rng.integers(len(STRENGTHS))]}mg')
+        company = COMPANIES[rng.integers(len(COMPANIES))]
+        mrp = float(round(rng.lognormal(4.0, 0.8), 1))
+        min_qty = int(rng.choice([10, 20, 30, 50]))
+        for lot in range(int(rng.integers(1, 4))):
+            rows.append({'product': product, 'brand': brand, 'generic': generic,
+                         'company': company, 'category': category, 'mrp': mrp,
+                         'min_qty': min_qty, 'lot': lot})
+        product += 1
+    return rows[:skus]
+
+
+def generate(db_file, skus=10000, years=2, bills_per_day=300, seed=42, end=None):
+    """Write the synthetic pharmacy to db_file (which must not exist); returns row counts"""
+    import numpy as np
+
+    if os.path.exists(db_file):
+        raise FileExistsError(db_file)
+    rng = np.random.default_rng(seed)
+    end = date.fromisoformat(end) if isinstance(end, str) else (end or date.today())
+    first = end - timedelta(days=int(365 * years) - 1)
+    n_days = (end - first).days + 1
+
+    db = IndianPharmacyDB(db_file)
+    db.conn.close()
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    # Replace the ten seeded medicines and three suppliers
+    conn.execute("DELETE FROM medicines")
+    conn.execute("DELETE FROM suppliers")
+
+    # ---------------------------------------------------------- catalogue
+    meds = catalogue(rng, skus)
+    categories = sorted(SEASONALITY)
+    cat_index = np.array([categories.index(m['category']) for m in meds])
+    mrp = np.array([m['mrp'] for m in meds])
+    n_products = meds[-1]['product'] + 1
+    # Long tail: product popularity ~ 1 / rank^0.9, lots of one product split it
+    product_pop = 1.0 / np.arange(1, n_products + 1) ** 0.9
+    rng.shuffle(product_pop)
+    popularity = np.array([product_pop[m['product']] for m in meds])
+    popularity /= popularity.sum()
+
+    # Stock: most lots comfortable, ~6% at or below minimum, ~1% empty
+    min_qty = np.array([m['min_qty'] for m in meds])
+    quantity = (min_qty * rng.uniform(1.6, 6.0, skus)).astype(int)
+    low = rng.random(skus) < 0.06
+    quantity[low] = (min_qty[low] * rng.uniform(0.0, 1.0, low.sum())).astype(int)
+    quantity[rng.random(skus) < 0.01] = 0
+    # Expiry: 5% within 90 days (2% within 30, 0.5% already expired), the rest up to 3 years
+    expiry_days = rng.integers(60, 3 * 365, skus)
+    soon = rng.random(skus)
+    expiry_days[soon < 0.05] = rng.integers(0, 90, (soon < 0.05).sum())
+    expiry_days[soon < 0.02] = rng.integers(0, 30, (soon < 0.02).sum())
+    expiry_days[soon < 0.005] = -rng.integers(1, 60, (soon < 0.005).sum())
+
+    conn.executemany('''
+        INSERT INTO medicines (id, brand_name, generic_name, company, batch_no, mfg_date,
+                               expiry_date, quantity, max_quantity, min_quantity, mrp,
+                               purchase_price, category, schedule, store_location, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ((i + 1, m['brand'], m['generic'], m['company'],
+           f"{m['brand'][:3].upper()}-{m['product']:06d}-{m['lot'] + 1}",
+           (end + timedelta(days=int(expiry_days[i]) - 730)).isoformat(),
+           (end + timedelta(days=int(expiry_days[i]))).isoformat(),
+           int(quantity[i]), int(m['min_qty'] * 8), int(m['min_qty']), m['mrp'],
+           round(m['mrp'] * 0.7, 2), m['category'], SCHEDULE.get(m['category'], 'OTC'),
+           f"Rack {chr(65 + i % 20)}{i % 50 + 1}", f'{end.isoformat()} 09:00:00')
+          for i, m in enumerate(meds)))
+
+    conn.executemany('''
+        INSERT INTO suppliers (name, phone, email, address, city, state, gst_no, payment_terms)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ((f'{company} Distributors', f'0{20 + i}-{5550000 + i * 137}',
+           f"orders@{company.lower().replace(' ', '').replace('.', '').replace(chr(39), '')}.in",
+           f'Plot {i + 1}, Industrial Area', *CITIES[i % len(CITIES)][:2],
+           f'{CITIES[i % len(CITIES)][2]}AABC{i:04d}M1Z{i % 10}', ('Net 30', 'Net 45', 'Net 60')[i % 3])
+          for i, company in enumerate(COMPANIES)))
+
+    # -------------------------------------------------------------- sales
+    days = np.array([first + timedelta(days=d) for d in range(n_days)])
+    month = np.array([d.month - 1 for d in days])
+    weekday = np.array([WEEKDAY[d.weekday()] for d in days])
+    season = np.array([SEASONALITY[c] for c in categories])          # category x month
+    month_mix = popularity @ season[cat_index]                         # demand per month
+    growth = (1 + YEARLY_GROWTH) ** ((np.arange(n_days) - n_days) / 365)
+    bills_on_day = rng.poisson(bills_per_day * weekday * growth * month_mix[month])
+    n_bills = int(bills_on_day.sum())
+    bill_day = np.repeat(np.arange(n_days), bills_on_day)
+    lines = 1 + rng.binomial(3, 0.4, n_bills)
+    line_bill = np.repeat(np.arange(n_bills), lines)
+    line_month = month[bill_day[line_bill]]
+    line_med = np.empty(len(line_bill), dtype=np.int64)
+    for m in range(12):
+        mask = line_month == m
+        if mask.any():
+            p = popularity * season[cat_index, m]
+            line_med[mask] = rng.choice(skus, mask.sum(), p=p / p.sum())
+    qty = np.minimum(rng.geometric(0.55, len(line_bill)), 10)
+    amount = np.round(qty * mrp[line_med], 2)
+
+    subtotal = np.bincount(line_bill, weights=amount, minlength=n_bills)
+    discount = rng.choice([0, 0, 0, 5, 10], n_bills)
+    discount_amount = subtotal * discount / 100
+    gst_amount = (subtotal - discount_amount) * 0.18
+    total = subtotal - discount_amount + gst_amount
+    payment = rng.choice(['Cash', 'UPI', 'Card'], n_bills, p=[0.45, 0.4, 0.15])
+    named = rng.random(n_bills) < 0.3
+    patient = rng.integers(len(PATIENTS), size=n_bills)
+    doctor = np.where(rng.random(n_bills) < 0.25, rng.integers(len(DOCTORS), size=n_bills), -1)
+    bill_date = [d.isoformat() for d in days]
+
+    conn.executemany('''
+        INSERT INTO bills (id, bill_no, bill_date, customer_name, customer_phone, doctor_name,
+                           payment_mode, discount_percent, gst_percent, subtotal,
+                           discount_amount, gst_amount, total, item_count, created_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 18, ?, ?, ?, ?, ?, ?)
+    ''', ((b + 1, format_bill_no('C1', b + 1), bill_date[bill_day[b]],
+           PATIENTS[patient[b]] if named[b] else None,
+           f'98{patient[b]:08d}' if named[b] else None,
+           DOCTORS[doctor[b]] if doctor[b] >= 0 else None, str(payment[b]), int(discount[b]),
+           round(float(subtotal[b]), 2), round(float(discount_amount[b]), 2),
+           round(float(gst_amount[b]), 2), round(float(total[b]), 2), int(lines[b]),
+           f'{bill_date[bill_day[b]]} 10:00:00')
+          for b in range(n_bills)))
+    conn.executemany('''
+        INSERT INTO sales (bill_id, bill_no, medicine_id, quantity, selling_price,
+                           total_amount, sale_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', ((int(line_bill[i]) + 1, format_bill_no('C1', int(line_bill[i]) + 1),
+           int(line_med[i]) + 1, int(qty[i]), float(mrp[line_med[i]]), float(amount[i]),
+           bill_date[bill_day[line_bill[i]]])
+          for i in range(len(line_bill))))
+    conn.execute("INSERT OR REPLACE INTO bill_sequences (counter, next_seq) VALUES ('C1', ?)",
+                 (n_bills + 1,))
+
+    # ------------------------------------------------------------- alerts
+    # Open alerts for what is low or expiring now, plus a resolved history
+    open_low = np.flatnonzero(quantity <= min_qty)
+    open_expiry = np.flatnonzero((expiry_days >= 0) & (expiry_days <= 30))
+    history = int(n_days * max(1, skus // 500))
+    alerts = [(int(i) + 1, 'LOW_STOCK', f'Stock below minimum ({quantity[i]}/{min_qty[i]})',
+               'HIGH', f'{end.isoformat()} 09:00:00', 0) for i in open_low]
+    alerts += [(int(i) + 1, 'EXPIRY', f'Expires in {expiry_days[i]} days',
+                'HIGH' if expiry_days[i] <= 7 else 'MEDIUM', f'{end.isoformat()} 09:00:00', 0)
+               for i in open_expiry]
+    hist_med = rng.integers(skus, size=history)
+    hist_day = rng.integers(n_days, size=history)
+    hist_low = rng.random(history) < 0.7
+    alerts += [(int(hist_med[i]) + 1, 'LOW_STOCK' if hist_low[i] else 'EXPIRY',
+                'Stock below minimum' if hist_low[i] else 'Expiring within 30 days',
+                'HIGH' if hist_low[i] else 'MEDIUM', f'{bill_date[hist_day[i]]} 09:00:00', 1)
+               for i in range(history)]
+    conn.executemany('''
+        INSERT INTO alerts (medicine_id, alert_type, message, severity, created_date, resolved)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', alerts)
+
+    # ------------------------------------------------------ prescriptions
+    # One per doctor-referred bill, items drawn from that bill's lines
+    rx_bills = np.flatnonzero(doctor >= 0)
+    bill_start = np.concatenate(([0], np.cumsum(lines)[:-1]))
+    recent = (end - timedelta(days=7)).isoformat()
+    conn.executemany('''
+        INSERT INTO prescriptions (id, patient_name, patient_age, patient_gender, patient_phone,
+                                   doctor_name, doctor_license, diagnosis, date, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ((r + 1, PATIENTS[patient[b]], int(18 + patient[b] % 60), 'MF'[patient[b] % 2],
+           f'98{patient[b]:08d}', DOCTORS[doctor[b]], f'MCI-{10000 + doctor[b]}',
+           meds[int(line_med[bill_start[b]])]['category'], bill_date[bill_day[b]],
+           'Pending' if bill_date[bill_day[b]] >= recent and r % 3 == 0 else 'Dispensed')
+          for r, b in enumerate(rx_bills)))
+    conn.executemany('''
+        INSERT INTO prescription_items (prescription_id, medicine_name, dosage, frequency,
+                                        duration, instructions)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', ((r + 1, meds[int(line_med[i])]['brand'], '1 tab', ('OD', 'BD', 'TDS')[i % 3],
+           f'{(5, 7, 10, 30)[i % 4]} days', 'After food')
+          for r, b in enumerate(rx_bills)
+          for i in range(bill_start[b], bill_start[b] + lines[b])))
+
+    conn.commit()
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ('medicines', 'bills', 'sales', 'alerts', 'prescriptions',
+                            'prescription_items', 'suppliers')}
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    return counts
+
+
+def upload_frame(upload_type, rows, seed=42, medicines=None):
+    """A DataFrame shaped like the Excel sheets the Upload page takes"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    if upload_type == 'sales':
+        names = medicines or ['Crocin', 'Pantop']
+        picks = rng.integers(len(names), size=rows)
+        qty = rng.integers(1, 4, size=rows)
+        price = np.round(rng.uniform(10, 300, size=rows), 1)
+        return pd.DataFrame({'Medicine': [names[i] for i in picks], 'Quantity': qty,
+                             'Price': price, 'Total': qty * price})
+    generics = list(GENERICS)
+    picks = rng.integers(len(generics), size=rows)
+    return pd.DataFrame({
+        'Brand Name': [f'Upload {seed}-{i}' for i in range(rows)],
+        'Generic Name': [generics[i] for i in picks],
+        'Company': [COMPANIES[i % len(COMPANIES)] for i in range(rows)],
+        'Expiry Date': ['2027-12-31'] * rows,
+        'Quantity': rng.integers(0, 500, size=rows),
+        'MRP': np.round(rng.uniform(10, 500, size=rows), 1),
+        'Category': [GENERICS[generics[i]] for i in picks],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('db_file')
+    parser.add_argument('--skus', type=int, default=10000)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--bills-per-day', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', help='last sales day (default today)')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    counts = generate(args.db_file, args.skus, args.years, args.bills_per_day, args.seed, args.end)
+    print(f"{args.db_file}: " + ', '.join(f'{n:,} {table}' for table, n in counts.items())
+          + f" in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
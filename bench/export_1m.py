@@ -0,0 +1,105 @@
+"""
+Export time and peak memory for a large sales report.
+
+Builds a scratch database with --rows sales lines, then exports the sales
+report with pragnya.export as xlsx (constant_memory), CSV and Parquet, and
+optionally with the old path (pd.read_sql + DataFrame.to_excel through
+openpyxl into a BytesIO). Each case runs in a fresh process so its peak RSS
+is its own; modules are imported before the baseline is taken. Usage:
+
+    python bench/export_1m.py [--rows 1000000] [--legacy]
+"""
+import argparse
+import importlib
+import io
+import multiprocessing
+import os
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+
+
+def build_db(db_file, rows):
+    IndianPharmacyDB(db_file).conn.close()
+    conn = sqlite3.connect(db_file)
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO sales (bill_no, medicine_id, quantity, selling_price, total_amount,
+                           customer_name, sale_date, payment_mode)
+        SELECT 'BILL-C1-' || printf('%07d', i / 3), i % 5 + 1, i % 7 + 1, 12.5,
+               12.5 * (i % 7 + 1), 'Customer ' || (i % 1000),
+               date('2026-01-01', '+' || (i % 300) || ' days'), 'Cash'
+        FROM n
+    ''', (rows,))
+    conn.commit()
+    conn.close()
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(case, db_file, out_file, results):
+    import pandas as pd
+    # Load every writer library up front so the RSS baseline includes its import cost
+    for module in ('pyarrow.parquet', 'xlsxwriter'):
+        importlib.import_module(module)
+    from pragnya.export import export_reports
+
+    conn = sqlite3.connect(db_file)
+    baseline = max_rss_mb()
+    t0 = time.perf_counter()
+    if case == 'legacy xlsx':
+        df = pd.read_sql_query("SELECT * FROM sales", conn)
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False, sheet_name='Data')
+        with open(out_file, 'wb') as f:
+            f.write(output.getvalue())
+        rows = len(df)
+    else:
+        with open(out_file, 'wb') as f:
+            rows = export_reports(conn, ['sales'], case, f)
+    elapsed = time.perf_counter() - t0
+    results.put((case, rows, elapsed, max_rss_mb() - baseline, os.path.getsize(out_file)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--legacy', action='store_true',
+                        help='also time pandas + openpyxl (slow, memory-hungry)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-export-')
+    try:
+        db_file = os.path.join(workdir, 'export.db')
+        t0 = time.perf_counter()
+        build_db(db_file, args.rows)
+        print(f"Built {args.rows:,} sales rows in {time.perf_counter() - t0:.1f}s")
+
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        cases = ['xlsx', 'csv', 'parquet'] + (['legacy xlsx'] if args.legacy else [])
+        for case in cases:
+            out_file = os.path.join(workdir, 'out.' + case.split()[-1])
+            proc = ctx.Process(target=run_case, args=(case, db_file, out_file, results))
+            proc.start()
+            name, rows, elapsed, peak, size = results.get()
+            proc.join()
+            os.remove(out_file)
+            print(f"  {name:<12} {elapsed:7.1f}s  {rows / elapsed:9,.0f} rows/s  "
+                  f"peak +{peak:6.1f} MiB  file {size / 2 ** 20:6.1f} MiB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
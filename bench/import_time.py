@@ -0,0 +1,65 @@
+"""
+Measure cold import time of the UI-free `pragnya` core.
+
+Each sample runs a fresh interpreter so nothing is served from
+sys.modules. Usage:
+
+    python bench/import_time.py [--runs 10] [--target-ms 100]
+
+Exits non-zero when the median exceeds the target.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy UI/reporting modules the core must never pull in at import time
+FORBIDDEN = ('streamlit', 'plotly', 'openpyxl', 'pandas', 'numpy')
+
+PROBE = '''
+import sys, time
+t0 = time.perf_counter()
+import pragnya
+elapsed = (time.perf_counter() - t0) * 1000
+loaded = [m for m in %r if m in sys.modules]
+print(elapsed, ",".join(loaded))
+''' % (FORBIDDEN,)
+
+
+def sample():
+    """Time one cold import in a fresh interpreter"""
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout.split()
+    return float(out[0]), (out[1].split(',') if len(out) > 1 else [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--target-ms', type=float, default=100.0)
+    args = parser.parse_args()
+
+    timings = []
+    leaked = set()
+    for _ in range(args.runs):
+        ms, loaded = sample()
+        timings.append(ms)
+        leaked.update(loaded)
+
+    median = statistics.median(timings)
+    print(f"import pragnya: median {median:.1f} ms, "
+          f"min {min(timings):.1f} ms, max {max(timings):.1f} ms ({args.runs} runs)")
+    if leaked:
+        print(f"heavy modules loaded at import: {', '.join(sorted(leaked))}")
+
+    if median > args.target_ms or leaked:
+        print(f"FAIL (target {args.target_ms:.0f} ms)")
+        sys.exit(1)
+    print(f"OK (target {args.target_ms:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
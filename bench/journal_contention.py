@@ -0,0 +1,109 @@
+"""
+Checkout latency under write contention: direct record_bill vs bill journal.
+
+A background connection repeatedly holds the database write lock (as a long
+Excel import or report would) while a counter takes bills. Direct billing
+waits on (or fails with) "database is locked"; journaled billing stays at
+fsync cost and the drainer catches up when the lock is released. Usage:
+
+    python bench/journal_contention.py [--bills 200] [--hold-ms 300] [--interval-ms 10]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.journal import BillJournal, JournalDrainer  # noqa: E402
+
+ITEMS = [{'id': 1, 'qty': 1, 'price': 15.0, 'subtotal': 15.0}]
+
+
+def hog_writer(db_file, hold, stop, holding):
+    """Hold the write lock for `hold` seconds at a time until stopped"""
+    conn = sqlite3.connect(db_file)
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        holding.set()
+        time.sleep(hold)
+        conn.commit()
+        time.sleep(hold / 10)
+    conn.close()
+
+
+def run(mode, db_file, workdir, bills, hold, interval):
+    stop, holding = threading.Event(), threading.Event()
+    hog = threading.Thread(target=hog_writer, args=(db_file, hold, stop, holding), daemon=True)
+    hog.start()
+    holding.wait()
+
+    latencies, failures = [], 0
+    if mode == 'direct':
+        db = IndianPharmacyDB(db_file)
+        for i in range(bills):
+            t0 = time.perf_counter()
+            try:
+                db.record_bill(f'DIRECT-{i}', ITEMS)
+            except sqlite3.OperationalError:
+                failures += 1
+            latencies.append((time.perf_counter() - t0) * 1000)
+            time.sleep(interval)
+        stop.set()
+        hog.join()
+        return latencies, failures, 0.0
+
+    journal = BillJournal(os.path.join(workdir, 'journal'), 'BENCH')
+    drainer = JournalDrainer(journal, db_file, interval=0.05)
+    drainer.start()
+    for _ in range(bills):
+        t0 = time.perf_counter()
+        journal.append({'items': ITEMS})
+        drainer.kick()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(interval)
+    stop.set()
+    hog.join()
+
+    t0 = time.perf_counter()
+    while journal.pending_count():
+        time.sleep(0.01)
+    catch_up = time.perf_counter() - t0
+    drainer.stop()
+    return latencies, failures, catch_up
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bills', type=int, default=200)
+    parser.add_argument('--hold-ms', type=float, default=300)
+    parser.add_argument('--interval-ms', type=float, default=10,
+                        help='pause between bills at the counter')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-journal-')
+    try:
+        for mode in ('direct', 'journal'):
+            db_file = os.path.join(workdir, f'{mode}.db')
+            IndianPharmacyDB(db_file).conn.close()
+            sqlite3.connect(db_file).execute(
+                "UPDATE medicines SET quantity = 1000000").connection.commit()
+            latencies, failures, catch_up = run(mode, db_file, workdir, args.bills,
+                                                args.hold_ms / 1000, args.interval_ms / 1000)
+            ordered = sorted(latencies)
+            print(f"{mode:<8} p50 {statistics.median(ordered):8.2f} ms   "
+                  f"p99 {ordered[int(0.99 * (len(ordered) - 1))]:8.2f} ms   "
+                  f"max {ordered[-1]:8.2f} ms   failed {failures}"
+                  + (f"   drained {catch_up * 1000:.0f} ms after release" if mode == 'journal' else ''))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Catalogue-wide liquidation plan (pragnya.liquidation) against a per-lot loop.
+
+On a datagen.py pharmacy (cached in --data-dir when given) plus a second
+store copied from it with half its medicines sold out, so transfers have
+somewhere to go: times the daily run (risk assessment, the other store's
+demand, the plan) cold and cached and the planning step on its own, then
+replans every lot one at a time in plain Python from the same inputs and
+checks each lot's action, units and recovered value match. Usage:
+
+    python bench/liquidation_plan.py [--skus 10000] [--data-dir DIR]
+"""
+import argparse
+import math
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import generate  # noqa: E402
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya import liquidation as liq  # noqa: E402
+from pragnya.risk import ExpiryRiskEngine  # noqa: E402
+from pragnya.stores import ChainView  # noqa: E402
+
+
+def scalar_plan(lots, demand):
+    """{lot id: (action, action_units, return_units, recovered)} one lot at a time"""
+    best_store = {}
+    for row in demand.itertuples(index=False):
+        if row.daily > 0 and row.daily > best_store.get(row.brand_name, (None, 0, 0))[1]:
+            best_store[row.brand_name] = (row.store, row.daily, row.stock)
+    asked = {}
+    plan = {}
+    near = lots[(lots['expected_unsold'] > 0) & (lots['days_left'] <= liq.PLAN_HORIZON_DAYS)]
+    for lot in near.sort_values(['brand_name', 'days_left'], kind='stable').to_dict('records'):
+        days, unsold, cost = lot['days_left'], lot['expected_unsold'], lot['purchase_price']
+        price = lot['mrp'] if lot['mrp'] > 0 else cost
+
+        discount = (0, 0.0)
+        for tier in liq.DISCOUNT_TIERS:
+            selling = days if days >= liq.MIN_DISCOUNT_DAYS else 0
+            cleared = min(unsold, math.floor(lot['daily_demand'] * liq.ELASTICITY * tier * selling + 1e-9))
+            takings = cleared * price * (1 - tier)
+            if cleared >= unsold:
+                discount = (cleared, takings)
+                break
+            if takings > discount[1]:
+                discount = (cleared, takings)
+
+        transfer = 0
+        store, t_daily, t_stock = best_store.get(lot['brand_name'], (None, 0, 0))
+        window = days - liq.TRANSIT_DAYS
+        if t_daily > 0 and window >= liq.MIN_TRANSFER_SELL_DAYS:
+            spare = math.floor(t_daily * window - t_stock)
+            before = asked.get(lot['brand_name'], 0)
+            transfer = max(0, min(spare - before, unsold))
+            asked[lot['brand_name']] = before + unsold
+
+        if transfer * price >= discount[1]:
+            action, units, value = 'Transfer', transfer, transfer * price
+        else:
+            action, units, value = 'Discount', discount[0], discount[1]
+        returned = unsold - units if days >= -liq.RETURN_GRACE_DAYS else 0
+        if units == 0:
+            action = 'Return' if returned else 'Write-off'
+        plan[lot['id']] = (action, int(units), int(returned), round(value + returned * cost * liq.RETURN_CREDIT, 2))
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--skus', type=int, default=10000)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--bills-per-day', type=int, default=300)
+    parser.add_argument('--data-dir', help='keep the generated database here between runs')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-liquidation-')
+    try:
+        source = os.path.join(args.data_dir or workdir,
+                              f"risk-{args.skus}-{args.years}-{args.bills_per_day}.db")
+        if not os.path.exists(source):
+            generate(source, skus=args.skus, years=args.years, bills_per_day=args.bills_per_day)
+        home, other = os.path.join(workdir, 'home.db'), os.path.join(workdir, 'other.db')
+        shutil.copy(source, home)
+        shutil.copy(source, other)
+        conn = sqlite3.connect(other)
+        conn.execute("UPDATE medicines SET quantity = 0 WHERE id % 2 = 0")
+        conn.commit()
+        conn.close()
+
+        db = IndianPharmacyDB(home)
+        chain = ChainView([{'code': 'HOME', 'name': 'Home', 'db_file': home},
+                           {'code': 'OTHER', 'name': 'Other', 'db_file': other}])
+        engine = ExpiryRiskEngine()
+        planner = liq.LiquidationPlanner(engine, chain, 'HOME')
+        t0 = time.perf_counter()
+        result = planner.plan(db)
+        cold = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        for _ in range(100):
+            planner.plan(db)
+        cached = (time.perf_counter() - t0) * 10
+
+        lots = engine.assess(db)['lots']
+        demand = planner.chain_demand()
+        t0 = time.perf_counter()
+        liq.plan_liquidation(lots, demand)
+        step = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        expected = scalar_plan(lots, demand)
+        loop = (time.perf_counter() - t0) * 1000
+        db.conn.close()
+        chain.close()
+
+        plan = result['plan']
+        got = {row.id: (row.action, row.action_units, row.return_units, row.recovered_value)
+               for row in plan.itertuples(index=False)}
+        mismatches = [(key, got.get(key), want) for key, want in expected.items()
+                      if got.get(key) is None or got[key][:3] != want[:3] or abs(got[key][3] - want[3]) > 0.02]
+        if len(got) != len(expected):
+            mismatches.append(('lots', len(got), len(expected)))
+
+        print(f"{len(lots):,} lots, {len(plan):,} planned: daily run {cold:.0f} ms cold, "
+              f"{cached:.3f} ms cached; planning step alone {step:.0f} ms, per-lot reference {loop:.0f} ms")
+        for name, totals in result['summary'].items():
+            print(f"  {name:<10}{totals['lots']:>7} lots  at risk {totals['unsold_value']:>13,.0f}"
+                  f"  recovered {totals['recovered_value']:>13,.0f}")
+        if mismatches:
+            print(f"MISMATCH on {len(mismatches)} lots, e.g. {mismatches[:3]}")
+            sys.exit(1)
+        print(f"OK: all {len(expected)} planned lots match the per-lot computation")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
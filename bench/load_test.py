@@ -0,0 +1,185 @@
+"""
+Load-test the local POS API (pragnya.api) against a local database.
+
+Starts the API in a background thread on a scratch copy of the database
+(or a freshly seeded one), then drives it with N concurrent keep-alive
+clients issuing a mix of stock lookups, searches and bills. Reports
+p50/p99 latency per endpoint and bills/sec. Usage:
+
+    python bench/load_test.py [--db pharmacy.db] [--clients 16] [--seconds 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.api import PharmacyAPI  # noqa: E402
+
+
+def prepare_db(source, workdir):
+    """Copy (or seed) a scratch database with plenty of stock to sell"""
+    path = os.path.join(workdir, 'loadtest.db')
+    if source:
+        shutil.copy(source, path)
+    IndianPharmacyDB(path).conn.close()
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE medicines SET quantity = 1000000000")
+    conn.commit()
+    ids = [row[0] for row in conn.execute("SELECT id FROM medicines")]
+    conn.close()
+    return path, ids
+
+
+def start_server(db_file, pool_size, batch_size, batch_delay):
+    """Run the API on its own event loop thread; returns (port, stop)"""
+    loop = asyncio.new_event_loop()
+    api = PharmacyAPI(db_file, pool_size, batch_size, batch_delay)
+    ready = threading.Event()
+    port = []
+
+    def run():
+        asyncio.set_event_loop(loop)
+        port.append(loop.run_until_complete(api.start('127.0.0.1', 0)))
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(api.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return port[0], api, stop
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                  f"Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, ids, deadline, bill_ratio, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < bill_ratio:
+                kind = 'bill'
+                items = [{'id': rng.choice(ids), 'qty': rng.randint(1, 3)}
+                         for _ in range(rng.randint(1, 4))]
+                args = ('POST', '/bills', {'items': items, 'payment_mode': 'Cash'})
+            elif roll < bill_ratio + (1 - bill_ratio) * 0.8:
+                kind = 'stock'
+                args = ('GET', f'/stock/{rng.choice(ids)}')
+            else:
+                kind = 'search'
+                args = ('GET', '/medicines?q=' + rng.choice(['cro', 'pan', 'sun', 'gly']))
+
+            t0 = time.perf_counter()
+            status = await request(reader, writer, *args)
+            latencies[kind].append((time.perf_counter() - t0) * 1000)
+            if status >= 400:
+                errors[kind] = errors.get(kind, 0) + 1
+    finally:
+        writer.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(port, ids, clients, seconds, bill_ratio):
+    latencies = {'bill': [], 'stock': [], 'search': []}
+    errors = {}
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(client(port, ids, deadline, bill_ratio, latencies, errors)
+                           for _ in range(clients)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', help='database to copy (default: freshly seeded)')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--bill-ratio', type=float, default=0.3)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--batch-delay-ms', type=float, default=2.0)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-load-')
+    try:
+        db_file, ids = prepare_db(args.db, workdir)
+        port, api, stop = start_server(db_file, args.pool_size, args.batch_size,
+                                       args.batch_delay_ms / 1000)
+        try:
+            latencies, errors = asyncio.run(
+                drive(port, ids, args.clients, args.seconds, args.bill_ratio))
+        finally:
+            stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'clients': args.clients,
+        'seconds': args.seconds,
+        'bills_per_sec': round(len(latencies['bill']) / args.seconds, 1),
+        'bill_batches': api.batcher.batches,
+        'errors': errors,
+        'endpoints': {
+            kind: {
+                'requests': len(values),
+                'p50_ms': round(statistics.median(values), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+            }
+            for kind, values in latencies.items() if values
+        },
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.clients} clients for {args.seconds:.0f}s "
+          f"(pool {args.pool_size}, batch {args.batch_size}/{args.batch_delay_ms}ms)")
+    for kind, row in results['endpoints'].items():
+        print(f"  {kind:<7} {row['requests']:>7} req   p50 {row['p50_ms']:>7.2f} ms   "
+              f"p99 {row['p99_ms']:>7.2f} ms")
+    print(f"  bills/sec: {results['bills_per_sec']}  "
+          f"(avg {len(latencies['bill']) / max(api.batcher.batches, 1):.1f} bills per commit)")
+    if errors:
+        print(f"  errors: {errors}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Check the Prometheus metrics endpoint (pragnya.metrics) end to end.
+
+On a scratch database: records bills (one of them rejected), takes stock
+below minimum so an alert and a reorder entry are raised, processes a
+sales upload and scans barcodes. Then scrapes the exporter's /metrics and
+the POS API's GET /metrics, validates the exposition format (HELP/TYPE per
+family, cumulative buckets ending in +Inf == _count) and checks the values
+against what was done. Reports the scrape time. Usage:
+
+    python bench/metrics_check.py [--bills 200]
+"""
+import argparse
+import http.client
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import upload_frame  # noqa: E402
+from load_test import start_server  # noqa: E402
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.metrics import REGISTRY, start_http_server, watch_database  # noqa: E402
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? '
+                    r'(-?[0-9.e+-]+|\+Inf|NaN)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text):
+    """{(name, ((label, value), ...)): value}, raising ValueError on a malformed line"""
+    samples = {}
+    types = {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ', 3)
+            types[name] = kind
+            continue
+        if line.startswith('#') or not line:
+            continue
+        match = SAMPLE.match(line)
+        if not match:
+            raise ValueError(f"malformed sample: {line!r}")
+        name, labels, value = match.groups()
+        family = re.sub(r'_(bucket|sum|count)$', '', name) if name not in types else name
+        if family not in types:
+            raise ValueError(f"sample without # TYPE: {line!r}")
+        samples[(name, tuple(LABEL.findall(labels or '')))] = float(value)
+    return samples, types
+
+
+def check_histograms(samples, types):
+    problems = []
+    for family, kind in types.items():
+        if kind != 'histogram':
+            continue
+        series = {}
+        for (name, labels), value in samples.items():
+            if name == family + '_bucket':
+                rest = tuple(kv for kv in labels if kv[0] != 'le')
+                series.setdefault(rest, []).append((dict(labels)['le'], value))
+        for rest, buckets in series.items():
+            counts = [v for _, v in buckets]
+            if counts != sorted(counts) or buckets[-1][0] != '+Inf':
+                problems.append(f"{family}{rest}: buckets not cumulative or no +Inf")
+            if samples.get((family + '_count', rest)) != counts[-1]:
+                problems.append(f"{family}{rest}: +Inf bucket != _count")
+    return problems
+
+
+def scrape(url):
+    with urllib.request.urlopen(url) as response:
+        return response.headers['Content-Type'], response.read().decode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bills', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-metrics-')
+    try:
+        db_file = os.path.join(workdir, 'metrics.db')
+        db = IndianPharmacyDB(db_file)
+        db.conn.execute("UPDATE medicines SET quantity = 1000000, min_quantity = 10")
+        db.conn.execute("UPDATE medicines SET quantity = 12 WHERE id = 2")
+        db.conn.commit()
+        db.set_barcode(1, '8901234567894')
+        for _ in range(9):
+            db.scan_barcode('8901234567894')  # warms the index: all hits
+
+        for i in range(args.bills):
+            db.record_bill(db.next_bill_no('MET'), [{'id': 1, 'qty': 1, 'price': 15.0, 'subtotal': 15.0},
+                                                    {'id': 3, 'qty': 2, 'price': 9.0, 'subtotal': 18.0}])
+        db.record_bill(db.next_bill_no('MET'), [{'id': 2, 'qty': 5, 'price': 9.0, 'subtotal': 45.0}])
+        try:
+            db.record_bill(db.next_bill_no('MET'), [{'id': 999999, 'qty': 1, 'price': 1.0, 'subtotal': 1.0}])
+        except ValueError:
+            pass
+        names = [row[0] for row in db.cursor.execute("SELECT brand_name FROM medicines LIMIT 5")]
+        db.process_excel_upload(upload_frame('sales', 50, 7, names), 'sales')
+        db.scan_barcode('8901234567894')  # stock is read live: still a hit
+        db.scan_barcode('0000000000000')  # unknown code: a miss
+        open_alerts = db.cursor.execute("SELECT COUNT(*) FROM alerts WHERE resolved = 0").fetchone()[0]
+        pending = db.cursor.execute(
+            "SELECT COUNT(*) FROM reorder_queue WHERE status = 'Pending'").fetchone()[0]
+        db.conn.close()
+
+        watch_database(db_file)
+        server = start_http_server(0)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        content_type, text = scrape(url)
+        times = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            scrape(url)
+            times.append((time.perf_counter() - t0) * 1000)
+        server.shutdown()
+
+        problems = []
+        try:
+            samples, types = parse(text)
+        except ValueError as e:
+            print(f"MISMATCH: {e}")
+            sys.exit(1)
+        problems += check_histograms(samples, types)
+        if not content_type.startswith('text/plain; version=0.0.4'):
+            problems.append(f"content type {content_type}")
+
+        expected = {
+            ('pragnya_bills_total', (('result', 'recorded'),)): args.bills + 1,
+            ('pragnya_bills_total', (('result', 'rejected'),)): 1,
+            ('pragnya_bill_seconds_count', ()): args.bills + 1,
+            ('pragnya_bill_lines_total', ()): args.bills * 2 + 1,
+            ('pragnya_imports_total', (('type', 'sales'), ('result', 'ok'))): 1,
+            ('pragnya_import_rows_total', (('type', 'sales'),)): 50,
+            ('pragnya_cache_lookups_total', (('cache', 'barcode'), ('result', 'hit'))): 10,
+            ('pragnya_cache_lookups_total', (('cache', 'barcode'), ('result', 'miss'))): 1,
+            ('pragnya_reorder_queue_pending', ()): pending,
+        }
+        for key, want in expected.items():
+            if samples.get(key) != want:
+                problems.append(f"{key[0]}{dict(key[1])} = {samples.get(key)}, expected {want}")
+        alerts = sum(v for (name, _), v in samples.items() if name == 'pragnya_alerts_open')
+        if alerts != open_alerts or not samples.get(('pragnya_alerts_created_total',
+                                                      (('type', 'LOW_STOCK'), ('severity', 'HIGH')))):
+            problems.append(f"open alerts {alerts}, expected {open_alerts} with a LOW_STOCK/HIGH created")
+        if not samples.get(('pragnya_db_size_bytes', (('file', 'db'),))):
+            problems.append("database size missing")
+        if not samples.get(('pragnya_db_statements_total', ())):
+            problems.append("query stats missing")
+
+        port, _, stop = start_server(db_file, 2, 32, 0.002)
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            conn.request('GET', '/metrics')
+            response = conn.getresponse()
+            api_text = response.read().decode()
+            if response.status != 200 or 'pragnya_reorder_queue_pending ' not in api_text:
+                problems.append(f"API /metrics: {response.status} {api_text[:200]!r}")
+            conn.close()
+        finally:
+            stop()
+
+        print(f"{len(types)} families, {len(samples)} samples, "
+              f"scrape p50 {statistics.median(times):.2f} ms, max {max(times):.2f} ms")
+        if problems:
+            print("MISMATCH: " + '; '.join(problems))
+            sys.exit(1)
+        print("OK: exposition format valid and every metric matches the work done")
+    finally:
+        REGISTRY.remove_collector('database')
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
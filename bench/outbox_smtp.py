@@ -0,0 +1,206 @@
+"""
+Background outbox sender (pragnya.outbox) against a local SMTP server.
+
+Runs a small SMTP server on 127.0.0.1 in this process (stdlib socketserver,
+--latency ms before every reply, like a server across the network) that
+can misbehave: every --drop-every'th MAIL gets "421 closing" and a dropped
+connection, every --defer-every'th RCPT a temporary 451, and addresses of
+every --bounce-every'th supplier a permanent 550. Queues --messages
+purchase-order emails for --suppliers suppliers in a fresh database and
+times OutboxSender draining them, then sends --baseline messages one SMTP
+connection each, as a page calling smtplib directly would.
+
+Checks every message to a good address was delivered exactly once and
+marked Sent, every bounce marked Failed after one attempt without being
+delivered, and that the sender opened one connection per drop rather than
+one per message. Usage:
+
+    python bench/outbox_smtp.py [--messages 2000] [--suppliers 40] [--latency 1]
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import smtplib
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.outbox import OutboxSender  # noqa: E402
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib, recording each delivered Message-ID"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0, drop_every=0, defer_every=0, bounce=lambda address: False):
+        super().__init__(('127.0.0.1', 0), SmtpHandler)
+        self.latency = latency
+        self.drop_every, self.defer_every, self.bounce = drop_every, defer_every, bounce
+        self.lock = threading.Lock()
+        self.connections = self.mails = self.rcpts = 0
+        self.delivered = []
+
+    def count(self, name):
+        with self.lock:
+            value = getattr(self, name) + 1
+            setattr(self, name, value)
+            return value
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].upper()
+            if verb == b'EHLO':
+                self.reply('250-stand-in\r\n250 8BITMIME')
+            elif verb in (b'HELO', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            elif verb == b'MAIL':
+                if server.drop_every and server.count('mails') % server.drop_every == 0:
+                    self.reply('421 closing connection')
+                    return
+                self.reply('250 OK')
+            elif verb == b'RCPT':
+                address = line.decode().partition(':')[2].strip(' <>\r\n')
+                if server.bounce(address):
+                    self.reply('550 no such user')
+                elif server.defer_every and server.count('rcpts') % server.defer_every == 0:
+                    self.reply('451 try again later')
+                else:
+                    self.reply('250 OK')
+            elif verb == b'DATA':
+                self.reply('354 end with .')
+                data = []
+                while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(line)
+                match = re.search(rb'^Message-ID: (\S+)', b''.join(data), re.M | re.I)
+                with server.lock:
+                    server.delivered.append(match.group(1).decode() if match else None)
+                self.reply('250 queued')
+            elif verb == b'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--suppliers', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=1.0, help='ms before every server reply')
+    parser.add_argument('--drop-every', type=int, default=250)
+    parser.add_argument('--defer-every', type=int, default=97)
+    parser.add_argument('--bounce-every', type=int, default=20)
+    parser.add_argument('--baseline', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    def bounces(address):
+        number = address.split('@')[0][len('supplier'):]
+        return number.isdigit() and int(number) % args.bounce_every == 0
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-outbox-')
+    server = SmtpStandIn(args.latency / 1000, args.drop_every, args.defer_every, bounces)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    try:
+        db_file = os.path.join(workdir, 'outbox.db')
+        db = IndianPharmacyDB(db_file)
+        rng = random.Random(7)
+        recipients = [f"supplier{rng.randrange(1, args.suppliers + 1)}@example.com"
+                      for _ in range(args.messages)]
+        t0 = time.perf_counter()
+        ids = {db.outbox.enqueue(to, f"Purchase order {n}", f"Please supply order {n}.\n",
+                                 kind='purchase_order', dedupe_key=f"bench:{n}", commit=False): to
+               for n, to in enumerate(recipients)}
+        db.conn.commit()
+        enqueue_ms = (time.perf_counter() - t0) * 1000
+        if db.outbox.enqueue(recipients[0], 'again', '', dedupe_key='bench:0') is not None:
+            print("MISMATCH: a duplicate dedupe_key was queued")
+            sys.exit(1)
+
+        sender = OutboxSender(db_file, host, port, sender='orders@pragnya.example', batch_size=100,
+                              interval=0.01, backoff_seconds=0.05)
+        t0 = time.perf_counter()
+        sender.start()
+        while db.outbox.counts()['Pending'] and time.perf_counter() - t0 < args.timeout:
+            time.sleep(0.02)
+        drained = time.perf_counter() - t0
+        sender.stop()
+        stats = dict(sender.stats)
+
+        server_connections = server.connections
+        clean = SmtpStandIn(args.latency / 1000)
+        threading.Thread(target=clean.serve_forever, daemon=True).start()
+        t0 = time.perf_counter()
+        for n in range(args.baseline):
+            message = EmailMessage()
+            message['From'], message['To'], message['Subject'] = 'orders@pragnya.example', 'baseline@example.com', 'x'
+            message.set_content(f"Please supply order {n}.\n")
+            with smtplib.SMTP(*clean.server_address, timeout=10) as smtp:
+                smtp.send_message(message)
+        baseline_rate = args.baseline / (time.perf_counter() - t0)
+        clean.shutdown()
+        clean.server_close()
+
+        problems = []
+        delivered = {}
+        for message_id in server.delivered:
+            delivered[message_id] = delivered.get(message_id, 0) + 1
+        rows = db.cursor.execute("SELECT id, status, attempts FROM outbox").fetchall()
+        for message_id, status, attempts in rows:
+            count = delivered.get(f"<outbox-{message_id}@pragnya.example>", 0)
+            if bounces(ids[message_id]):
+                if status != 'Failed' or attempts != 1 or count:
+                    problems.append(f"bounce {message_id}: {status}, {attempts} attempts, delivered {count}x")
+            elif status != 'Sent' or count != 1:
+                problems.append(f"message {message_id}: {status}, delivered {count}x")
+        drops = (server.mails // args.drop_every) if args.drop_every else 0
+        if stats['connections'] != server_connections or stats['connections'] > drops + 1:
+            problems.append(f"{stats['connections']} connections for {drops} drops "
+                            f"(server saw {server_connections})")
+        db.conn.close()
+
+        good = sum(1 for to in recipients if not bounces(to))
+        rate = stats['sent'] / drained
+        print(f"queued {args.messages:,} messages for {len(set(recipients))} suppliers in {enqueue_ms:.0f} ms")
+        print(f"outbox: {stats['sent']:,} sent, {stats['failed']} bounced, {stats['retried']} retried, "
+              f"{stats['batches']} batches over {stats['connections']} connections "
+              f"({drops} dropped by the server)")
+        print(f"drained in {drained:.2f} s: {rate:,.0f} msg/s wall clock, "
+              f"{stats['sent'] / stats['busy_seconds']:,.0f} msg/s while sending; "
+              f"one connection per message {baseline_rate:,.0f} msg/s ({rate / baseline_rate:.1f}x)")
+        if problems or stats['sent'] != good:
+            print(f"MISMATCH: {stats['sent']} of {good} sent; " + '; '.join(problems[:5]))
+            sys.exit(1)
+        print("OK: every message delivered exactly once, bounces failed, one connection per drop")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
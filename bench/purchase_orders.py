@@ -0,0 +1,141 @@
+"""
+Purchase orders from the reorder queue and supplier lead-time statistics.
+
+On a copy of a datagen.py pharmacy (cached in --data-dir when given):
+maps every company's medicines to its distributor, queues every medicine
+at or below minimum twice (as repeated low-stock sales do) and times
+SupplierBook.generate_purchase_orders(). Checks there is one order per
+supplier, that every line is the largest quantity asked at the medicine's
+purchase price, that the totals add up and that nothing mapped is left
+Pending. Then records --deliveries random lead times per supplier, and
+checks lead_time_stats() against statistics.mean / stdev over each
+supplier's last LEAD_TIME_WINDOW deliveries. Usage:
+
+    python bench/purchase_orders.py [--skus 10000] [--deliveries 50] [--data-dir DIR]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import COMPANIES, generate  # noqa: E402
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.suppliers import LEAD_TIME_WINDOW  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--skus', type=int, default=10000)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--bills-per-day', type=int, default=300)
+    parser.add_argument('--deliveries', type=int, default=50)
+    parser.add_argument('--data-dir', help='keep the generated database here between runs')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-po-')
+    try:
+        source = os.path.join(args.data_dir or workdir,
+                              f"risk-{args.skus}-{args.years}-{args.bills_per_day}.db")
+        if not os.path.exists(source):
+            generate(source, skus=args.skus, years=args.years, bills_per_day=args.bills_per_day)
+        db_file = os.path.join(workdir, 'po.db')
+        shutil.copy(source, db_file)
+        db = IndianPharmacyDB(db_file)
+        book = db.suppliers
+        problems = []
+
+        suppliers = dict(db.cursor.execute("SELECT name, id FROM suppliers").fetchall())
+        t0 = time.perf_counter()
+        for company in COMPANIES:
+            book.map_company(company, suppliers[f'{company} Distributors'])
+        mapping_ms = (time.perf_counter() - t0) * 1000
+        # One company left unmapped: its medicines must stay Pending
+        db.cursor.execute("DELETE FROM medicine_suppliers WHERE supplier_id = ?",
+                          (suppliers[f'{COMPANIES[-1]} Distributors'],))
+        db.conn.commit()
+
+        low = [row[0] for row in db.cursor.execute(
+            "SELECT id FROM medicines WHERE quantity <= min_quantity").fetchall()]
+        db.queue_reorders(low, 'bench')
+        db.queue_reorders(low[::2], 'bench again')
+        wanted = {medicine_id: (supplier_id, quantity, cost) for medicine_id, supplier_id, quantity, cost in
+                  db.cursor.execute('''
+                      SELECT r.medicine_id, ms.supplier_id, MAX(r.quantity),
+                             COALESCE(m.purchase_price, m.mrp * 0.6, 0)
+                      FROM reorder_queue r JOIN medicines m ON m.id = r.medicine_id
+                      LEFT JOIN medicine_suppliers ms ON ms.medicine_id = m.id AND ms.preferred = 1
+                      WHERE r.status = 'Pending' GROUP BY r.medicine_id HAVING MAX(r.quantity) > 0
+                  ''').fetchall()}
+
+        t0 = time.perf_counter()
+        orders, unassigned = book.generate_purchase_orders()
+        generate_ms = (time.perf_counter() - t0) * 1000
+
+        expected = {}
+        for supplier_id, quantity, cost in wanted.values():
+            if supplier_id is not None:
+                lines, total = expected.get(supplier_id, (0, 0.0))
+                expected[supplier_id] = (lines + 1, total + quantity * cost)
+        got = {order['supplier_id']: (order['lines'], order['total']) for order in orders}
+        if len(orders) != len(expected) or set(got) != set(expected):
+            problems.append(f"{len(orders)} orders for {len(expected)} suppliers")
+        for supplier_id, (lines, total) in expected.items():
+            if supplier_id in got and (got[supplier_id][0] != lines or abs(got[supplier_id][1] - total) > 0.05):
+                problems.append(f"supplier {supplier_id}: {got[supplier_id]} != {(lines, round(total, 2))}")
+        lines = db.cursor.execute(
+            "SELECT medicine_id, quantity, unit_cost FROM purchase_order_lines").fetchall()
+        for medicine_id, quantity, cost in lines:
+            if wanted[medicine_id][1:] != (quantity, cost):
+                problems.append(f"medicine {medicine_id}: line {(quantity, cost)} != {wanted[medicine_id][1:]}")
+                break
+        left = db.cursor.execute('''
+            SELECT COUNT(DISTINCT r.medicine_id) FROM reorder_queue r
+            LEFT JOIN medicine_suppliers ms ON ms.medicine_id = r.medicine_id AND ms.preferred = 1
+            WHERE r.status = 'Pending' AND ms.supplier_id IS NOT NULL
+        ''').fetchone()[0]
+        if left or unassigned != sum(1 for s, _, _ in wanted.values() if s is None):
+            problems.append(f"{left} mapped medicines still Pending, {unassigned} reported unassigned")
+
+        rng = random.Random(42)
+        history = {}
+        start = date.today() - timedelta(days=args.deliveries * 3)
+        for supplier_id in suppliers.values():
+            for i in range(args.deliveries):
+                ordered = start + timedelta(days=i * 3)
+                received = ordered + timedelta(days=max(0, round(rng.gauss(6 + supplier_id % 5, 2))))
+                book.record_lead_time(supplier_id, ordered.isoformat(), received.isoformat(), commit=False)
+                history.setdefault(supplier_id, []).append((received, i, (received - ordered).days))
+        db.conn.commit()
+        t0 = time.perf_counter()
+        stats = book.lead_time_stats()
+        stats_ms = (time.perf_counter() - t0) * 1000
+        for supplier_id, deliveries in history.items():
+            recent = [days for _, _, days in sorted(deliveries, reverse=True)[:LEAD_TIME_WINDOW]]
+            mean, std = statistics.mean(recent), statistics.stdev(recent)
+            got = stats[supplier_id]
+            if abs(got['mean_days'] - mean) > 0.01 or abs(got['std_days'] - std) > 0.01:
+                problems.append(f"supplier {supplier_id}: {got['mean_days']}/{got['std_days']} "
+                                f"!= {mean:.2f}/{std:.2f}")
+        db.conn.close()
+
+        print(f"mapped {len(COMPANIES)} companies in {mapping_ms:.0f} ms; {len(low):,} low-stock medicines "
+              f"-> {len(orders)} purchase orders, {len(lines):,} lines in {generate_ms:.0f} ms "
+              f"({unassigned} unassigned)")
+        print(f"lead-time stats for {len(stats)} suppliers x {args.deliveries} deliveries in {stats_ms:.1f} ms")
+        if problems:
+            print("MISMATCH: " + '; '.join(problems[:5]))
+            sys.exit(1)
+        print("OK: orders, lines, totals and lead-time statistics match")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
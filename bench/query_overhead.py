@@ -0,0 +1,110 @@
+"""
+Cost of the query instrumentation (pragnya.querylog) per statement.
+
+Runs the same work on a scratch database with STATS.enabled off and on:
+point lookups through db.cursor, a pd.read_sql_query page query, and
+full bill commits. Also checks that the instrumented run recorded every
+statement with the right row counts, including throwaway cursors that
+are iterated or read with a single fetchone(). Usage:
+
+    python bench/query_overhead.py [--lookups 20000] [--bills 300]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.querylog import STATS, normalize  # noqa: E402
+
+LOOKUP = "SELECT quantity FROM medicines WHERE id = ?"
+# statement -> (how a throwaway cursor reads it, rows read)
+THROWAWAY = {
+    "SELECT id FROM medicines WHERE id <= 3": (lambda cur: [row for row in cur], 3),
+    "SELECT id, brand_name FROM medicines WHERE id <= 4": (dict, 4),
+    "SELECT brand_name FROM medicines WHERE id >= 2": (lambda cur: cur.fetchone(), 1),
+}
+
+
+def workload(db, lookups, bills, tag):
+    """ms per point lookup, per page query and per bill"""
+    t0 = time.perf_counter()
+    for i in range(lookups):
+        db.cursor.execute(LOOKUP, (i % 10 + 1,)).fetchone()
+    lookup = (time.perf_counter() - t0) * 1000 / lookups
+    t0 = time.perf_counter()
+    for _ in range(50):
+        db.get_low_stock_medicines()
+    page = (time.perf_counter() - t0) * 1000 / 50
+    t0 = time.perf_counter()
+    for i in range(bills):
+        db.record_bill(f'OVH-{tag}-{i}', [{'id': 1, 'qty': 1, 'price': 15.0, 'subtotal': 15.0},
+                                          {'id': 9, 'qty': 1, 'price': 45.0, 'subtotal': 45.0}])
+    bill = (time.perf_counter() - t0) * 1000 / bills
+    return lookup, page, bill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--bills', type=int, default=300)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-querylog-')
+    try:
+        db = IndianPharmacyDB(os.path.join(workdir, 'overhead.db'))
+        db.conn.execute("UPDATE medicines SET quantity = 1000000")
+        db.conn.commit()
+        results = {}
+        for rnd in range(3):
+            for enabled in (False, True):
+                STATS.enabled = enabled
+                STATS.reset()
+                results.setdefault(enabled, []).append(
+                    workload(db, args.lookups, args.bills, f'{rnd}{int(enabled)}'))
+        STATS.enabled = True
+
+        print(f"{'':<12}{'lookup us':>11}{'page ms':>10}{'bill ms':>10}")
+        for enabled, runs in results.items():
+            lookup, page, bill = (statistics.median(col) for col in zip(*runs))
+            print(f"{'on' if enabled else 'off':<12}{lookup * 1000:>11.1f}{page:>10.3f}{bill:>10.3f}")
+        off = [statistics.median(col) for col in zip(*results[False])]
+        on = [statistics.median(col) for col in zip(*results[True])]
+        print(f"{'overhead':<12}{(on[0] - off[0]) * 1000:>11.1f}{on[1] - off[1]:>10.3f}"
+              f"{on[2] - off[2]:>10.3f}")
+
+        # The last (instrumented) round is what STATS holds now
+        stats = {q['sql']: q for q in STATS.top(None)}
+        lookup = stats.get(normalize(LOOKUP))
+        commits = stats.get('COMMIT')
+        problems = []
+        if not lookup or lookup['calls'] < args.lookups or lookup['rows'] < args.lookups:
+            problems.append(f"point lookups recorded: {lookup and (lookup['calls'], lookup['rows'])}")
+        if not commits or commits['calls'] < args.bills:
+            problems.append(f"commits recorded: {commits and commits['calls']}")
+        if not any('get_low_stock_medicines' in site for q in stats.values() for site, _ in q['sites']):
+            problems.append("read_sql_query call site missing")
+        STATS.reset()
+        for sql, (read, _) in THROWAWAY.items():
+            read(db.conn.execute(sql))
+        stats = {q['sql']: q for q in STATS.top(None)}
+        for sql, (_, rows) in THROWAWAY.items():
+            got = stats.get(normalize(sql))
+            if not got or (got['calls'], got['rows']) != (1, rows):
+                problems.append(f"throwaway cursor {sql!r}: {got and (got['calls'], got['rows'])}")
+        db.conn.close()
+        if problems:
+            print("MISMATCH: " + '; '.join(problems))
+            sys.exit(1)
+        print("OK: every statement, row and commit recorded with its call site")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
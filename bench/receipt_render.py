@@ -0,0 +1,173 @@
+"""
+Receipt rendering cost per format, and batch reprint throughput.
+
+Times the old concatenating `generate_receipt` (copied here as the
+baseline) against pragnya.receipts for HTML, ESC/POS and PDF, then streams
+a day of bills from a scratch database into one file per format. The HTML
+case includes make_receipt(), as app.generate_receipt does, since the old
+function also formatted the date. The cases take turns, and each reports
+its best of --repeat rounds, so load on a shared machine hits them alike.
+Usage:
+
+    python bench/receipt_render.py [--items 8] [--rounds 1000] [--repeat 15] [--bills 500]
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.receipts import (FORMATS, make_receipt, render_escpos, render_html,  # noqa: E402
+                              render_pdf, reprint_day)
+
+
+def legacy_generate_receipt(bill_no, items, subtotal, discount, gst, total, customer_name):
+    """app.generate_receipt before the template engine, verbatim"""
+    receipt_html = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; }}
+            .header {{ text-align: center; margin-bottom: 20px; }}
+            .logo {{ font-size: 24px; font-weight: bold; color: #0A5C36; }}
+            .bill-info {{ margin: 10px 0; }}
+            .item-table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
+            .item-table th, .item-table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+            .item-table th {{ background-color: #0A5C36; color: white; }}
+            .total {{ font-size: 18px; font-weight: bold; margin-top: 20px; }}
+            .footer {{ margin-top: 30px; text-align: center; font-size: 12px; color: #666; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <div class="logo">PRAGNYA PHARM</div>
+            <div>Smart Pharmacy Management</div>
+        </div>
+        
+        <div class="bill-info">
+            <strong>Bill No:</strong> {bill_no}<br>
+            <strong>Date:</strong> {datetime.now().strftime('%d/%m/%Y %I:%M %p')}<br>
+            <strong>Customer:</strong> {customer_name if customer_name else 'Walk-in Customer'}<br>
+        </div>
+        
+        <table class="item-table">
+            <tr>
+                <th>Medicine</th>
+                <th>Qty</th>
+                <th>Price</th>
+                <th>Total</th>
+            </tr>
+    """
+    
+    for item in items:
+        receipt_html += f"""
+            <tr>
+                <td>{item['name']}</td>
+                <td>{item['qty']}</td>
+                <td>₹{item['price']:.2f}</td>
+                <td>₹{item['subtotal']:.2f}</td>
+            </tr>
+        """
+    
+    receipt_html += f"""
+        </table>
+        
+        <div class="bill-info">
+            Subtotal: ₹{subtotal:.2f}<br>
+            Discount: -₹{discount:.2f}<br>
+            GST: +₹{gst:.2f}<br>
+        </div>
+        
+        <div class="total">
+            Grand Total: ₹{total:.2f}
+        </div>
+        
+        <div class="footer">
+            Thank you for visiting Pragnya Pharm!<br>
+            Contact: +91 98765 43210 | Email: info@pragnyapharm.com<br>
+            GST No: 27AAACP1234M1Z5
+        </div>
+    </body>
+    </html>
+    """
+    
+    return receipt_html
+
+
+def per_receipt_us(cases, rounds, repeat):
+    """Best us per call of each case, timing the cases in turn"""
+    best = dict.fromkeys(name for name, _ in cases)
+    for _ in range(repeat):
+        for name, fn in cases:
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                fn()
+            elapsed = (time.perf_counter() - t0) / rounds * 1e6
+            best[name] = elapsed if best[name] is None else min(best[name], elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=8, help='lines per receipt')
+    parser.add_argument('--rounds', type=int, default=1000, help='calls per timed round')
+    parser.add_argument('--repeat', type=int, default=15, help='timed rounds per case')
+    parser.add_argument('--bills', type=int, default=500, help='bills in the batch reprint')
+    args = parser.parse_args()
+
+    items = [{'name': f'Medicine {i} 500mg', 'qty': i + 1, 'price': 12.5, 'subtotal': 12.5 * (i + 1)}
+             for i in range(args.items)]
+    subtotal = sum(item['subtotal'] for item in items)
+    receipt = make_receipt('BILL-C1-0000001', items, subtotal, 0.0, subtotal * 0.18,
+                           subtotal * 1.18, 'Ravi Kumar')
+
+    print(f"Per receipt ({args.items} lines, {args.rounds} rounds):")
+    def html():
+        return render_html(make_receipt('BILL-C1-0000001', items, subtotal, 0.0, subtotal * 0.18,
+                                        subtotal * 1.18, 'Ravi Kumar'))
+
+    cases = [
+        ('legacy html', lambda: legacy_generate_receipt('BILL-C1-0000001', items, subtotal, 0.0,
+                                                        subtotal * 0.18, subtotal * 1.18, 'Ravi Kumar')),
+        ('html', html),
+        ('escpos', lambda: render_escpos(receipt)),
+        ('pdf', lambda: render_pdf(receipt)),
+    ]
+    timings = per_receipt_us(cases, args.rounds, args.repeat)
+    for name, us in timings.items():
+        print(f"  {name:<12} {us:8.1f} us")
+    print(f"  html is {timings['legacy html'] / timings['html']:.2f}x the old generate_receipt")
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-receipts-')
+    try:
+        db = IndianPharmacyDB(os.path.join(workdir, 'receipts.db'))
+        db.conn.execute("UPDATE medicines SET quantity = 100000000")
+        db.conn.commit()
+        lines = [{'id': (i % 5) + 1, 'qty': 1, 'price': 10.0, 'subtotal': 10.0}
+                 for i in range(args.items)]
+        db.cursor.execute("BEGIN IMMEDIATE")
+        for n in range(args.bills):
+            db.record_bill(f'BENCH-{n:06d}', lines, f'Customer {n}', commit=False)
+        db.conn.commit()
+        day = datetime.now().strftime('%Y-%m-%d')
+
+        print(f"Batch reprint of {args.bills} bills into one file:")
+        for fmt in FORMATS:
+            out = io.BytesIO()
+            t0 = time.perf_counter()
+            count = reprint_day(db, day, fmt, out)
+            elapsed = time.perf_counter() - t0
+            print(f"  {fmt:<12} {elapsed * 1000:8.1f} ms  ({count} receipts, "
+                  f"{len(out.getvalue()) / 1024:.0f} KiB, {elapsed / max(count, 1) * 1e6:.0f} us each)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Store -> head office replication: lag, bytes shipped and convergence.
+
+Several store databases take bills at --rate bills/sec each (every bill
+inserts lines and updates stock, so medicines, bills and sales all
+change) while a SyncAgent per store ships the change log to one
+CentralStore through LocalTransport. Reports replication lag (oldest
+change in a batch to its acknowledgement), bytes per change against
+copying the whole database file, and checks that head office converged
+to each store's rows. Usage:
+
+    python bench/replication_lag.py [--stores 3] [--rate 20] [--seconds 10] [--interval 0.5]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.replication import CentralStore, LocalTransport, SyncAgent  # noqa: E402
+
+ITEMS = [{'id': 1, 'qty': 1, 'price': 15.0, 'subtotal': 15.0},
+         {'id': 4, 'qty': 2, 'price': 85.0, 'subtotal': 170.0}]
+
+
+def take_bills(db_file, code, rate, seconds, agent):
+    db = IndianPharmacyDB(db_file)
+    db.conn.execute("PRAGMA busy_timeout=5000")
+    start = time.time()
+    for i in range(int(rate * seconds)):
+        delay = start + i / rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        db.record_bill(f'BILL-{code}-{i:07d}', ITEMS, f'Customer {i}')
+        if i % 25 == 0:
+            db.create_alert(1, 'LOW_STOCK', f'Check stock {i}', 'LOW')
+        agent.kick()
+    db.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stores', type=int, default=3)
+    parser.add_argument('--rate', type=float, default=20, help='bills/sec per store')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=0.5, help='agent poll interval')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-sync-')
+    try:
+        central = CentralStore(os.path.join(workdir, 'central.db'))
+        stores, agents, writers = [], [], []
+        for n in range(args.stores):
+            code = f'S{n + 1}'
+            db_file = os.path.join(workdir, f'{code}.db')
+            conn = IndianPharmacyDB(db_file).conn
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("UPDATE medicines SET quantity = 1000000")
+            conn.commit()
+            conn.close()
+            agent = SyncAgent(db_file, code, LocalTransport(central), interval=args.interval)
+            agent.start()
+            stores.append((code, db_file))
+            agents.append(agent)
+            writers.append(threading.Thread(target=take_bills, args=(
+                db_file, code, args.rate, args.seconds, agent)))
+
+        t0 = time.time()
+        for w in writers:
+            w.start()
+        for w in writers:
+            w.join()
+        # Let the agents drain what is left
+        deadline = time.time() + 30
+        while time.time() < deadline and any(
+                sqlite3.connect(f).execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+                for _, f in stores):
+            time.sleep(0.05)
+        elapsed = time.time() - t0
+        for agent in agents:
+            agent.stop()
+
+        lags = sorted(lag for a in agents for lag in a.stats['lags'])
+        changes = sum(a.stats['changes'] for a in agents)
+        shipped = sum(a.stats['bytes'] for a in agents)
+        file_bytes = sum(os.path.getsize(f) for _, f in stores)
+        print(f"{args.stores} stores x {args.rate:g} bills/s for {args.seconds:g}s "
+              f"({elapsed:.1f}s incl. drain)")
+        print(f"  {changes:,} changes in {sum(a.stats['batches'] for a in agents)} batches, "
+              f"{shipped / 1024:.1f} KiB shipped ({shipped / max(changes, 1):.1f} B/change)")
+        print(f"  whole-file copy of the stores once: {file_bytes / 1024:.0f} KiB")
+        print(f"  lag p50 {statistics.median(lags) * 1000:.0f} ms  "
+              f"p99 {lags[int(0.99 * (len(lags) - 1))] * 1000:.0f} ms  max {lags[-1] * 1000:.0f} ms")
+
+        bad = []
+        for code, db_file in stores:
+            local = sqlite3.connect(db_file)
+            for table in ('medicines', 'bills', 'sales', 'alerts'):
+                mine = local.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall()
+                theirs = central.conn.execute(
+                    f"SELECT * FROM {table} WHERE store = ? ORDER BY row_id", (code,)).fetchall()
+                if mine != [row[2:] for row in theirs]:
+                    bad.append(f"{code}.{table}")
+        if bad:
+            print(f"MISMATCH: {', '.join(bad)}")
+            sys.exit(1)
+        print("OK: head office matches every store row for row")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
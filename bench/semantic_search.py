@@ -0,0 +1,138 @@
+"""
+Catalogue semantic search at chain scale: build, query and update cost.
+
+Fills a scratch database with --skus medicines (real generics and
+categories under synthetic brand names), builds MedicineSearch, then
+times symptom-style queries against the LIKE search they replace, an
+edit picked up through invalidate(), and SKUs added by another
+connection. Checks that every hit for a symptom carries a matching use.
+Usage:
+
+    python bench/semantic_search.py [--skus 50000] [--rounds 200]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pragnya import IndianPharmacyDB  # noqa: E402
+from pragnya.search import INDICATIONS_BY_GENERIC, MedicineSearch, default_indications  # noqa: E402
+
+QUERIES = ['something for acidity', 'bp tablet', 'sugar', 'fever and headache',
+           'allergy sneezing', 'loose motion', 'cholesterol', 'throat infection',
+           'pantopr', 'vomiting']
+
+GENERIC_CATEGORY = {
+    'paracetamol': 'Analgesic', 'ibuprofen': 'Analgesic', 'diclofenac': 'Analgesic',
+    'amoxicillin': 'Antibiotic', 'azithromycin': 'Antibiotic', 'ramipril': 'Cardiac',
+    'amlodipine': 'Cardiac', 'telmisartan': 'Cardiac', 'atorvastatin': 'Cardiac',
+    'metformin': 'Diabetic', 'glimepiride': 'Diabetic', 'sitagliptin': 'Diabetic',
+    'pantoprazole': 'GI', 'omeprazole': 'GI', 'ranitidine': 'GI', 'dicyclomine': 'GI',
+    'cetirizine': 'Antihistamine', 'levocetirizine': 'Antihistamine',
+    'ondansetron': 'GI', 'loperamide': 'GI',
+}
+
+
+def build_db(db_file, skus, seed=7):
+    IndianPharmacyDB(db_file).conn.close()
+    rng = random.Random(seed)
+    generics = sorted(INDICATIONS_BY_GENERIC)
+    syllables = ['ra', 'no', 'vi', 'ta', 'zo', 'mel', 'cor', 'dex', 'lin', 'pra', 'xa', 'ten']
+    rows = []
+    for i in range(skus):
+        generic = rng.choice(generics)
+        if rng.random() < 0.2:
+            generic += ' + ' + rng.choice(generics)
+        brand = ''.join(rng.choice(syllables) for _ in range(3)).title() + f' {rng.choice([5, 10, 40, 250, 500, 650])}mg'
+        rows.append((brand, generic.title(), GENERIC_CATEGORY[generic.split(' + ')[0]],
+                     rng.randint(0, 300), 'Co' + str(i % 60)))
+    conn = sqlite3.connect(db_file)
+    conn.executemany("INSERT INTO medicines (brand_name, generic_name, category, quantity, company) "
+                     "VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return statistics.median(times) * 1000, times[int(0.99 * (len(times) - 1))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--skus', type=int, default=50000)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-search-')
+    try:
+        db_file = os.path.join(workdir, 'catalogue.db')
+        build_db(db_file, args.skus)
+        db = IndianPharmacyDB(db_file)
+        index = db.search_index = MedicineSearch()
+        t0 = time.perf_counter()
+        index.warm(db)
+        print(f"{len(index):,} SKUs indexed in {time.perf_counter() - t0:.2f}s "
+              f"({len(index._postings):,} terms)")
+
+        print(f"{'query':<24}{'hits':>6}{'p50 ms':>9}{'p99 ms':>9}{'LIKE ms':>9}{'LIKE hits':>11}")
+        bad = []
+        for query in QUERIES:
+            hits = db.semantic_search(query)
+            p50, p99 = timed(lambda: db.semantic_search(query), args.rounds)
+            like_ms, _ = timed(lambda: db.search_medicine_records(query), 20)
+            like_hits = len(db.search_medicine_records(query))
+            print(f"{query:<24}{len(hits):>6}{p50:>9.2f}{p99:>9.2f}{like_ms:>9.2f}{like_hits:>11}")
+            wanted = [w for w in query.split() if w in ('acidity', 'bp', 'sugar', 'allergy', 'cholesterol',
+                                                         'vomiting', 'fever')]
+            for hit in hits:
+                uses = f"{hit['generic_name']} {default_indications(hit['category'], hit['generic_name'])}"
+                if wanted and not any(w in uses.lower() for w in wanted):
+                    bad.append((query, hit['brand_name'], uses))
+
+        # Edit one medicine and add some from another connection
+        mid = db.semantic_search('cholesterol', 1)[0]['id']
+        db.conn.execute("UPDATE medicines SET indications = 'hangover remedy' WHERE id = ?", (mid,))
+        db.conn.commit()
+        t0 = time.perf_counter()
+        index.invalidate(mid)
+        edited = db.semantic_search('hangover')
+        edit_ms = (time.perf_counter() - t0) * 1000
+        other = sqlite3.connect(db_file)
+        other.executemany("INSERT INTO medicines (brand_name, generic_name, category) VALUES (?, ?, ?)",
+                          [(f'Newbrand {i}', 'Ondansetron', 'GI') for i in range(100)])
+        other.commit()
+        other.close()
+        t0 = time.perf_counter()
+        added = db.semantic_search('newbrand', 200)
+        add_ms = (time.perf_counter() - t0) * 1000
+        print(f"edit via invalidate(): {edit_ms:.1f} ms; 100 SKUs added elsewhere picked up in {add_ms:.1f} ms")
+
+        if [h['id'] for h in edited] != [mid]:
+            bad.append(('hangover', edited, 'edit not picked up'))
+        if len(added) != 100:
+            bad.append(('newbrand', len(added), 'added SKUs not picked up'))
+        for item in bad[:10]:
+            print("BAD:", item)
+        if bad:
+            sys.exit(1)
+        print("OK: every symptom hit carries that use; edits and new SKUs are searchable")
+        db.conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Benchmark suite: the core operations at several data scales, against a baseline.
+
+For each scale, datagen.py builds a deterministic pharmacy (cached in
+--data-dir when given) and every operation runs on a scratch copy:
+
+  dashboard_stats         IndianPharmacyDB.get_dashboard_stats()
+  expiring_medicines      get_expiring_medicines(30)
+  search_medicine         search_medicine() for a common and a rare term
+  forecast_demand         DemandForecaster.forecast_demand() of the best seller
+  reorder_recommendations DemandForecaster.get_reorder_recommendations()
+  excel_upload_sales      process_excel_upload() of a 200-row sales sheet
+  excel_upload_inventory  process_excel_upload() of a 200-row inventory sheet
+  bill_commit             next_bill_no() + record_bill() of a 3-line bill
+
+Each operation is repeated until --budget seconds or 25 runs (at least 3,
+after one warm-up; a single run when the warm-up alone exceeds the
+budget). Results go to --out as JSON and are compared per scale and
+operation with the baseline: a median more than --tolerance slower, and by
+more than --min-delta-ms, is a regression and makes the exit status 1.
+Baselines are only comparable on the same machine; --update-baseline
+stores this run as the new one. Usage:
+
+    python bench/suite.py [--scales small,medium] [--data-dir DIR] [--out bench_results.json]
+                          [--baseline bench/baseline.json] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import generate, upload_frame  # noqa: E402
+from pragnya import DemandForecaster, IndianPharmacyDB  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCALES = {
+    'small': {'skus': 1000, 'years': 1, 'bills_per_day': 80},
+    'medium': {'skus': 10000, 'years': 2, 'bills_per_day': 300},
+    'large': {'skus': 50000, 'years': 3, 'bills_per_day': 1000},
+}
+MAX_RUNS = 25
+MIN_RUNS = 3
+
+
+def operations(db, forecaster, seed):
+    """(name, callable) pairs in run order; the ones that write come last"""
+    best_seller = db.cursor.execute('''
+        SELECT medicine_id FROM sales WHERE sale_date >= date('now', '-90 days')
+        GROUP BY medicine_id ORDER BY SUM(quantity) DESC LIMIT 1
+    ''').fetchone()[0]
+    in_stock = [row[0] for row in db.cursor.execute(
+        "SELECT id FROM medicines ORDER BY quantity DESC, id LIMIT 3")]
+    names = [row[0] for row in db.cursor.execute(
+        "SELECT brand_name FROM medicines ORDER BY id LIMIT 50")]
+    sales_sheet = upload_frame('sales', 200, seed, names)
+    inventory_sheet = upload_frame('inventory', 200, seed)
+
+    def bill_commit():
+        db.record_bill(db.next_bill_no('BENCH'),
+                       [{'id': mid, 'qty': 1, 'price': 10.0, 'subtotal': 10.0} for mid in in_stock])
+
+    return [
+        ('dashboard_stats', db.get_dashboard_stats),
+        ('expiring_medicines', lambda: db.get_expiring_medicines(30)),
+        ('search_medicine', lambda: (db.search_medicine('para'), db.search_medicine('zzq'))),
+        ('forecast_demand', lambda: forecaster.forecast_demand(best_seller, 3)),
+        ('reorder_recommendations', forecaster.get_reorder_recommendations),
+        ('excel_upload_sales', lambda: db.process_excel_upload(sales_sheet, 'sales')),
+        ('excel_upload_inventory', lambda: db.process_excel_upload(inventory_sheet, 'inventory')),
+        ('bill_commit', bill_commit),
+    ]
+
+
+def measure(fn, budget):
+    """Timings in ms of repeated calls, after one warm-up"""
+    t0 = time.perf_counter()
+    fn()
+    first = time.perf_counter() - t0
+    if first > budget:
+        return [first * 1000]
+    times = []
+    started = time.perf_counter()
+    while len(times) < MAX_RUNS and (len(times) < MIN_RUNS or time.perf_counter() - started < budget):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def dataset(scale, seed, end, data_dir):
+    """Path to the pristine generated database for a scale (built when missing)"""
+    params = SCALES[scale]
+    path = os.path.join(data_dir, f"{scale}-{seed}-{end}.db")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        counts = generate(path + '.tmp', seed=seed, end=end, **params)
+        os.replace(path + '.tmp', path)
+        print(f"[{scale}] generated {counts['medicines']:,} SKUs, {counts['bills']:,} bills, "
+              f"{counts['sales']:,} lines in {time.perf_counter() - t0:.1f}s")
+    return path
+
+
+def run_scale(scale, seed, end, data_dir, workdir, budget):
+    source = dataset(scale, seed, end, data_dir)
+    db_file = os.path.join(workdir, f'{scale}.db')
+    shutil.copy(source, db_file)
+    db = IndianPharmacyDB(db_file)
+    try:
+        rows = {table: db.cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('medicines', 'bills', 'sales', 'alerts', 'prescriptions')}
+        ops = {}
+        for name, fn in operations(db, DemandForecaster(db), seed):
+            times = measure(fn, budget)
+            ops[name] = {'median_ms': round(statistics.median(times), 3),
+                         'min_ms': round(min(times), 3), 'max_ms': round(max(times), 3),
+                         'runs': len(times)}
+            print(f"[{scale}] {name:<24}{ops[name]['median_ms']:>11.2f} ms  ({len(times)} runs)")
+    finally:
+        db.conn.close()
+        os.remove(db_file)
+    return {'params': SCALES[scale], 'rows': rows, 'ops': ops}
+
+
+def machine():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(), 'machine': platform.node(),
+            'cpus': os.cpu_count()}
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Print current vs baseline per operation; returns the regressions"""
+    regressions = []
+    if baseline['meta'].get('machine') != results['meta']['machine']:
+        print(f"note: baseline is from {baseline['meta'].get('machine')}, "
+              f"not this machine; differences may be the hardware")
+    print(f"\n{'scale':<8}{'operation':<26}{'baseline ms':>12}{'now ms':>10}{'change':>9}")
+    for scale, current in results['scales'].items():
+        base_ops = baseline['scales'].get(scale, {}).get('ops', {})
+        for name, stats in current['ops'].items():
+            base = base_ops.get(name)
+            if base is None:
+                print(f"{scale:<8}{name:<26}{'-':>12}{stats['median_ms']:>10.2f}{'new':>9}")
+                continue
+            now, before = stats['median_ms'], base['median_ms']
+            change = now / before - 1 if before else 0.0
+            flag = ''
+            if now > before * (1 + tolerance) and now - before > min_delta_ms:
+                flag = '  REGRESSION'
+                regressions.append((scale, name, before, now))
+            elif before > now * (1 + tolerance) and before - now > min_delta_ms:
+                flag = '  faster'
+            print(f"{scale:<8}{name:<26}{before:>12.2f}{now:>10.2f}{change:>+9.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='small,medium',
+                        help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', default=date.today().isoformat(), help='last sales day')
+    parser.add_argument('--data-dir', help='keep generated databases here between runs')
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds per operation')
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', default=os.path.join(ROOT, 'bench', 'baseline.json'))
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.3)
+    parser.add_argument('--min-delta-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix='pragnya-suite-')
+    data_dir = args.data_dir or workdir
+    os.makedirs(data_dir, exist_ok=True)
+    try:
+        results = {'meta': dict(machine(), seed=args.seed, end=args.end), 'scales': {}}
+        for scale in scales:
+            results['scales'][scale] = run_scale(scale, args.seed, args.end, data_dir,
+                                                 workdir, args.budget)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.out}")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    else:
+        baseline = {'meta': results['meta'], 'scales': {}}
+        print(f"no baseline at {args.baseline}")
+
+    if args.update_baseline:
+        baseline['meta'] = results['meta']
+        baseline['scales'].update(results['scales'])
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+            f.write('\n')
+        print(f"baseline updated: {args.baseline}")
+    elif regressions:
+        print(f"REGRESSION in {len(regressions)} operation(s): "
+              + ', '.join(f'{scale}/{name}' for scale, name, _, _ in regressions))
+        sys.exit(1)
+    elif os.path.exists(args.baseline):
+        print("OK: no operation slower than the baseline beyond tolerance")
+
+
+if __name__ == '__main__':
+    main()
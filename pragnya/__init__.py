@@ -0,0 +1,11 @@
+# ============================================================================
+# PRAGNYA PHARM - Core (UI-free) package
+# ============================================================================
+# The Streamlit app in app.py is only one front end over this package.
+# Keep imports here cheap: no streamlit, plotly, openpyxl or pandas at
+# module level, so `import pragnya` stays well under 100 ms.
+from pragnya.db import IndianPharmacyDB, bill_totals
+from pragnya.chatbot import PharmacyChatbot
+from pragnya.forecast import DemandForecaster
+
+__all__ = ['IndianPharmacyDB', 'PharmacyChatbot', 'DemandForecaster', 'bill_totals']
@@ -0,0 +1,360 @@
+# ============================================================================
+# PRAGNYA PHARM - Local HTTP/JSON API for POS terminals and scanners
+# ============================================================================
+# A small asyncio HTTP/1.1 server (stdlib only, keep-alive) over the
+# IndianPharmacyDB operations, for billing counters that cannot wait on a
+# Streamlit rerun per keypress.
+#
+#   GET  /health                     -> {"status": "ok"}
+#   GET  /metrics                    -> Prometheus text (see pragnya.metrics)
+#   GET  /stock/<medicine_id>        -> stock, price and expiry of one item
+#   GET  /scan/<barcode>             -> {"id", "mrp", "stock"} via BarcodeIndex
+#   GET  /medicines?q=<term>&limit=N -> name/generic/company search
+#                                       (1 <= N <= MAX_SEARCH_LIMIT)
+#   POST /bills                      -> create a bill (see BillBatcher); an
+#                                       optional "counter" picks the bill
+#                                       number series (default "API")
+#
+# Reads run on a thread pool over a ConnectionPool. Bill writes are queued
+# and group-committed: every bill that arrives within `batch_delay` seconds
+# (up to `batch_size` bills) shares one transaction, each inside its own
+# savepoint so a bad bill (short stock, unpriced medicine, ...) fails alone.
+#
+# Run with:  python -m pragnya.api --db pharmacy.db --port 8765
+import argparse
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from pragnya.billno import BillNumberAllocator
+from pragnya.db import IndianPharmacyDB, bill_totals
+from pragnya.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, watch_database
+from pragnya.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 500: 'Internal Server Error'}
+MAX_SEARCH_LIMIT = 200
+MAX_GST_PERCENT = 100
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BillBatcher:
+    """Group-commit bill writes: one transaction per batch of queued bills"""
+
+    def __init__(self, pool, executor, allocator, batch_size=32, batch_delay=0.002):
+        self.pool = pool
+        self.executor = executor
+        self.allocator = allocator
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._queue = asyncio.Queue()
+        self._task = None
+        self.batches = 0
+        self.bills = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, bill):
+        """Queue a bill request and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((bill, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            bills = [bill for bill, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self._commit, bills)
+            except Exception as e:
+                logger.exception("Bill batch failed")
+                results = [e] * len(batch)
+
+            self.batches += 1
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    self.bills += 1
+                    future.set_result(result)
+
+    def _commit(self, bills):
+        """Write a batch of bills in one transaction (runs on a worker thread)"""
+        # Number the bills before taking the write lock: the allocator
+        # reserves blocks on its own connection
+        for bill in bills:
+            if not bill.get('bill_no'):
+                bill['bill_no'] = self.allocator.next(bill.get('counter') or 'API')
+
+        results = []
+        with self.pool.connection() as db:
+            db.cursor.execute("BEGIN IMMEDIATE")
+            for bill in bills:
+                db.cursor.execute("SAVEPOINT api_bill")
+                try:
+                    results.append(self._record(db, bill))
+                except Exception as e:
+                    db.cursor.execute("ROLLBACK TO SAVEPOINT api_bill")
+                    if not isinstance(e, ValueError):
+                        logger.exception("Bill %s failed", bill.get('bill_no'))
+                    results.append(e)
+                db.cursor.execute("RELEASE SAVEPOINT api_bill")
+            db.conn.commit()
+        return results
+
+    @staticmethod
+    def _record(db, bill):
+        items = []
+        for line in bill['items']:
+            med = db.get_stock(line['id'])
+            if med is None:
+                raise ValueError(f"Unknown medicine id {line['id']}")
+            if med['mrp'] is None:
+                raise ValueError(f"Medicine id {line['id']} has no MRP")
+            items.append({
+                'id': med['id'],
+                'name': med['brand_name'],
+                'qty': line['qty'],
+                'price': med['mrp'],
+                'subtotal': med['mrp'] * line['qty']
+            })
+
+        subtotal = sum(item['subtotal'] for item in items)
+        discount = bill.get('discount', 0)
+        gst_percent = bill.get('gst_percent', 18)
+        discount_amount, gst_amount, final_total = bill_totals(subtotal, discount, gst_percent)
+
+        bill_no = bill['bill_no']
+        db.record_bill(bill_no, items, bill.get('customer_name'), bill.get('customer_phone'),
+                       bill.get('doctor_name'), discount, gst_percent,
+                       bill.get('payment_mode', 'Cash'), commit=False)
+        return {
+            'bill_no': bill_no,
+            'items': items,
+            'subtotal': round(subtotal, 2),
+            'discount_amount': round(discount_amount, 2),
+            'gst_amount': round(gst_amount, 2),
+            'total': round(final_total, 2)
+        }
+
+
+class PharmacyAPI:
+    """asyncio HTTP/JSON front end over a ConnectionPool"""
+
+    def __init__(self, db_file='pharmacy.db', pool_size=4, batch_size=32, batch_delay=0.002):
+        self.pool = ConnectionPool(db_file, size=pool_size)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='pragnya-api')
+        self.allocator = BillNumberAllocator(IndianPharmacyDB(db_file))
+        self.batcher = BillBatcher(self.pool, self.executor, self.allocator,
+                                   batch_size, batch_delay)
+        self.server = None
+        watch_database(db_file)
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+        self.allocator.db.conn.close()
+
+    async def _read(self, fn, *args):
+        """Run a read-only DB method on a pooled connection off the event loop"""
+        def call():
+            with self.pool.connection() as db:
+                return getattr(db, fn)(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split('/') if p]
+
+        if parts == ['health']:
+            return 200, {'status': 'ok'}
+
+        if parts == ['metrics']:
+            if method != 'GET':
+                raise HTTPError(405, 'Use GET')
+            # The database gauges read the file: keep them off the event loop
+            return 200, await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                         REGISTRY.render)
+
+        if len(parts) == 2 and parts[0] == 'stock':
+            if method != 'GET':
+                raise HTTPError(405, 'Use GET')
+            try:
+                medicine_id = int(parts[1])
+            except ValueError:
+                raise HTTPError(400, 'Medicine id must be an integer')
+            med = await self._read('get_stock', medicine_id)
+            if med is None:
+                raise HTTPError(404, f'Unknown medicine id {medicine_id}')
+            return 200, med
+
+        if len(parts) == 2 and parts[0] == 'scan':
+            if method != 'GET':
+                raise HTTPError(405, 'Use GET')
+            hit = await self._read('scan_barcode', parts[1])
+            if hit is None:
+                raise HTTPError(404, f'Unknown barcode {parts[1]}')
+            return 200, dict(zip(('id', 'mrp', 'stock'), hit))
+
+        if parts == ['medicines']:
+            if method != 'GET':
+                raise HTTPError(405, 'Use GET')
+            query = parse_qs(url.query)
+            term = query.get('q', [''])[0]
+            try:
+                limit = int(query.get('limit', ['20'])[0])
+            except ValueError:
+                raise HTTPError(400, 'limit must be an integer')
+            if not 1 <= limit <= MAX_SEARCH_LIMIT:
+                raise HTTPError(400, f'limit must be between 1 and {MAX_SEARCH_LIMIT}')
+            return 200, {'results': await self._read('search_medicine_records', term, limit)}
+
+        if parts == ['bills']:
+            if method != 'POST':
+                raise HTTPError(405, 'Use POST')
+            bill = self._parse_bill(body)
+            try:
+                return 201, await self.batcher.submit(bill)
+            except ValueError as e:
+                raise HTTPError(409, str(e))
+
+        raise HTTPError(404, f'No route for {url.path}')
+
+    @staticmethod
+    def _parse_bill(body):
+        try:
+            bill = json.loads(body or b'{}')
+            items = bill['items']
+            bill['items'] = [{'id': int(i['id']), 'qty': int(i['qty'])} for i in items]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'Expected JSON body {"items": [{"id": ..., "qty": ...}], ...}')
+        if not bill['items'] or any(i['qty'] <= 0 for i in bill['items']):
+            raise HTTPError(400, 'A bill needs at least one item with qty > 0')
+        for key, default, high in (('discount', 0, 100), ('gst_percent', 18, MAX_GST_PERCENT)):
+            try:
+                value = float(bill.get(key, default))
+            except (ValueError, TypeError):
+                raise HTTPError(400, f'{key} must be a number')
+            if not 0 <= value <= high:  # also rejects NaN
+                raise HTTPError(400, f'{key} must be between 0 and {high}')
+            bill[key] = value
+        return bill
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    logger.exception("Unhandled API error")
+                    status, payload = 500, {'error': str(e)}
+
+                keep_alive = (version == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+                if isinstance(payload, str):
+                    data, content_type = payload.encode(), METRICS_CONTENT_TYPE
+                else:
+                    data, content_type = json.dumps(payload).encode(), 'application/json'
+                head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Type: {content_type}\r\n"
+                        f"Content-Length: {len(data)}\r\n")
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write(head.encode('latin-1') + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(db_file, host, port, pool_size, batch_size, batch_delay):
+    api = PharmacyAPI(db_file, pool_size, batch_size, batch_delay)
+    port = await api.start(host, port)
+    logger.info("Pragnya Pharm API listening on http://%s:%d", host, port)
+    try:
+        await api.server.serve_forever()
+    finally:
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pragnya Pharm local POS API")
+    parser.add_argument('--db', default='pharmacy.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--batch-delay-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.pool_size,
+                          args.batch_size, args.batch_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+# ============================================================================
+# PRAGNYA PHARM - Archival of closed sales periods and resolved alerts
+# ============================================================================
+# Bills and sales lines dated before a cutoff move to one SQLite file per
+# year (archive/sales_2024.db). The file is attached as `archive_2024` only
+# while a query needs it. The hot database keeps the current period, so its
+# tables and indexes stay small enough to live in the page cache.
+#
+# A move is one BEGIN IMMEDIATE transaction:
+#   1. copy into the archive (INSERT OR IGNORE on the original ids)
+#   2. delete from main
+#   3. advance `archive_state.sales_cutoff`
+# Reads take archive rows only from before the recorded cutoff. If a crash
+# leaves rows copied but not yet deleted, they are therefore never counted
+# twice, and re-running the move finishes it.
+#
+# Read APIs ask `source(table, start)` for a table name. Ranges after the
+# cutoff get the plain table. Earlier ranges get a temp view that UNION ALLs
+# the main table with the attached years; SQLite pushes WHERE clauses into
+# each branch.
+#
+# Resolved alerts and finished reorder requests move to *_archive tables in
+# the main database; nothing in the app reads them back. Their columns are
+# filled by name from the live table (`id` from its rowid, so legacy
+# `alert_id` tables work too). Archival deletes are never replicated: head
+# office keeps the rows.
+#
+#   python -m pragnya.archive --keep-months 12 [--vacuum]
+import argparse
+import logging
+import os
+import re
+import sys
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# table -> date column used for the cutoff
+ARCHIVED_TABLES = {'bills': 'bill_date', 'sales': 'sale_date'}
+# Only ISO dates are moved; anything else stays in the hot database
+ISO_DATE = "GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+
+
+def months_ago(months, today=None):
+    """First day of the month `months` before today's month ('YYYY-MM-DD')"""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1).isoformat()
+
+
+class SalesArchive:
+    """Per-year archive files for bills/sales before a cutoff date"""
+
+    def __init__(self, db, directory=None):
+        self.db = db
+        self.directory = directory or os.path.join(
+            os.path.dirname(os.path.abspath(db.db_file)), 'archive')
+        self._views = {}
+
+    def cutoff(self):
+        """Dates before this ('YYYY-MM-DD') live in the archive; None if nothing archived"""
+        row = self.db.conn.execute(
+            "SELECT value FROM archive_state WHERE key = 'sales_cutoff'").fetchone()
+        return row[0] if row else None
+
+    def years(self):
+        """Years that have an archive file"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(m.group(1)) for m in
+                      (re.fullmatch(r'sales_(\d{4})\.db', name) for name in os.listdir(self.directory))
+                      if m)
+
+    def _attach(self, year, create=False):
+        schema = f"archive_{year}"
+        conn = self.db.conn
+        attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+        if schema not in attached:
+            path = os.path.join(self.directory, f"sales_{year}.db")
+            if not create and not os.path.exists(path):
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+        for table, date_column in ARCHIVED_TABLES.items():
+            self._sync_columns(schema, table, date_column)
+        return schema
+
+    def _sync_columns(self, schema, table, date_column):
+        """Create the archive table, or add columns main has gained since"""
+        conn = self.db.conn
+        main_columns = conn.execute(f"PRAGMA main.table_info({table})").fetchall()
+        existing = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")}
+        if not existing:
+            conn.execute(f"CREATE TABLE {schema}.{table} AS SELECT * FROM main.{table} WHERE 0")
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {schema}.idx_{table}_id ON {table} (id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_{date_column} "
+                         f"ON {table} ({date_column})")
+            if table == 'sales':
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_sales_bill_id ON sales (bill_id)")
+            else:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_bills_bill_no ON bills (bill_no)")
+            return
+        for _, name, decl, *_ in main_columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {name} {decl}")
+
+    def _columns(self, table):
+        return [row[1] for row in self.db.conn.execute(f"PRAGMA main.table_info({table})")]
+
+    def _replicating(self):
+        return self.db.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_log'").fetchone() is not None
+
+    def _keep_at_head_office(self, since_seq, tables):
+        """Drop change_log deletes of `tables` logged after `since_seq`, so they are not shipped"""
+        marks = ', '.join('?' * len(tables))
+        self.db.conn.execute(f"DELETE FROM change_log WHERE seq > ? AND op = 'D' AND tbl IN ({marks})",
+                             (since_seq, *tables))
+
+    def source(self, table, start=None, end=None):
+        """Table or view name that covers `table` for dates start..end"""
+        cutoff = self.cutoff()
+        if not cutoff or (start and start >= cutoff):
+            return table
+        first = int(start[:4]) if start else 0
+        last = min(int(end[:4]), int(cutoff[:4])) if end else int(cutoff[:4])
+        years = [y for y in self.years() if first <= y <= last]
+        if not years:
+            return table
+
+        key = (table, tuple(years), cutoff)
+        if key in self._views:
+            return self._views[key]
+        if self.db.conn.in_transaction:
+            return table  # cannot ATTACH mid-transaction; hot data only
+
+        columns = ', '.join(self._columns(table))
+        date_column = ARCHIVED_TABLES[table]
+        branches = [f"SELECT {columns} FROM main.{table}"]
+        for year in years:
+            schema = self._attach(year)
+            if schema:
+                branches.append(f"SELECT {columns} FROM {schema}.{table} "
+                                f"WHERE {date_column} < '{cutoff}'")
+        view = f"{table}_{years[0]}_{years[-1]}"
+        self.db.conn.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        self.db.conn.execute(f"CREATE TEMP VIEW {view} AS " + " UNION ALL ".join(branches))
+        self._views[key] = view
+        return view
+
+    def archive_before(self, cutoff):
+        """Move bills and sales dated before `cutoff` into the per-year files
+
+        Returns {'bills': n, 'sales': n} moved. The cutoff never moves back.
+        """
+        conn = self.db.conn
+        cutoff = date.fromisoformat(cutoff).isoformat()
+        current = self.cutoff()
+        cutoff = max(cutoff, current) if current else cutoff
+        years = [int(row[0]) for row in conn.execute(f'''
+            SELECT substr(bill_date, 1, 4) FROM bills WHERE bill_date < ? AND bill_date {ISO_DATE}
+            UNION
+            SELECT substr(sale_date, 1, 4) FROM sales WHERE sale_date < ? AND sale_date {ISO_DATE}
+        ''', (cutoff, cutoff))]
+
+        # ATTACH is not allowed inside a transaction
+        schemas = {year: self._attach(year, create=True) for year in years}
+        bill_columns = ', '.join(self._columns('bills'))
+        sale_columns = ', '.join(self._columns('sales'))
+        moved = {'bills': 0, 'sales': 0}
+        replicating = self._replicating()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            log_seq = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0 \
+                if replicating else 0
+            for year, schema in schemas.items():
+                low, high = f"{year:04d}-01-01", min(f"{year + 1:04d}-01-01", cutoff)
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO {schema}.bills ({bill_columns})
+                    SELECT {bill_columns} FROM main.bills
+                    WHERE bill_date >= ? AND bill_date < ?
+                ''', (low, high))
+                # Billed lines carry their bill's date, so they move together
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO {schema}.sales ({sale_columns})
+                    SELECT {sale_columns} FROM main.sales
+                    WHERE sale_date >= ? AND sale_date < ?
+                ''', (low, high))
+            moved['sales'] = conn.execute(
+                f"DELETE FROM main.sales WHERE sale_date < ? AND sale_date {ISO_DATE}",
+                (cutoff,)).rowcount
+            moved['bills'] = conn.execute(
+                f"DELETE FROM main.bills WHERE bill_date < ? AND bill_date {ISO_DATE}",
+                (cutoff,)).rowcount
+            if replicating:
+                # Head office keeps the history: don't ship these deletes
+                self._keep_at_head_office(log_seq, ('bills', 'sales'))
+            conn.execute('''
+                INSERT INTO archive_state (key, value) VALUES ('sales_cutoff', ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value
+            ''', (cutoff,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._views.clear()
+            for schema in schemas.values():
+                conn.execute(f"DETACH DATABASE {schema}")
+        logger.info("Archived %(bills)d bills / %(sales)d sales lines", moved)
+        return moved
+
+    def archive_alerts(self, before=None):
+        """Move resolved alerts and finished reorder requests to *_archive tables
+
+        `before` ('YYYY-MM-DD') limits the move to rows created earlier.
+        Returns {'alerts': n, 'reorder_queue': n}.
+        """
+        conn = self.db.conn
+        before = before or '9999-12-31'
+        moved = {}
+        replicating = self._replicating()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            log_seq = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0 \
+                if replicating else 0
+            for table, done in (('alerts', "resolved = 1"),
+                                ('reorder_queue', "status != 'Pending'")):
+                live = set(self._columns(table))
+                columns = [c for c in self._columns(f'{table}_archive') if c != 'archived_date']
+                values = ['rowid' if c == 'id' else c if c in live else 'NULL' for c in columns]
+                where = f"{done} AND created_date < ?"
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO {table}_archive ({', '.join(columns)})
+                    SELECT {', '.join(values)} FROM {table} WHERE {where}
+                ''', (before,))
+                moved[table] = conn.execute(f"DELETE FROM {table} WHERE {where}",
+                                            (before,)).rowcount
+            if replicating:
+                self._keep_at_head_office(log_seq, ('alerts',))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return moved
+
+
+def main():
+    from pragnya.db import IndianPharmacyDB
+
+    parser = argparse.ArgumentParser(description='Archive closed sales periods and resolved alerts')
+    parser.add_argument('--db', default='pharmacy.db')
+    parser.add_argument('--dir', default=None, help='archive directory (default: next to the db)')
+    parser.add_argument('--keep-months', type=int, default=12,
+                        help='months of sales (besides the current one) kept in the hot db')
+    parser.add_argument('--vacuum', action='store_true',
+                        help='rebuild the hot db afterwards to return freed pages to the OS')
+    args = parser.parse_args()
+
+    db = IndianPharmacyDB(args.db)
+    archive = SalesArchive(db, args.dir)
+    cutoff = months_ago(args.keep_months)
+    sales = archive.archive_before(cutoff)
+    alerts = archive.archive_alerts()
+    print(f"Archived before {archive.cutoff()}: {sales['bills']} bills, {sales['sales']} sales lines, "
+          f"{alerts['alerts']} alerts, {alerts['reorder_queue']} reorder requests", file=sys.stderr)
+    if args.vacuum:
+        db.conn.execute("VACUUM")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# ============================================================================
+# PRAGNYA PHARM - Barcode / GTIN lookup
+# ============================================================================
+# Scan-to-line has to be O(1): the counter scans faster than a selectbox can
+# be scrolled. BarcodeIndex keeps barcode -> (id, mrp) in a dict that is
+# warmed once from the unique barcode index and patched per medicine when a
+# barcode or price is edited. Stock is not cached: sales land through other
+# connections and processes (the journal drainer, the API pool), so every
+# lookup reads the current quantity by primary key.
+from pragnya.metrics import CACHE_LOOKUPS
+
+_HIT = CACHE_LOOKUPS.labels('barcode', 'hit')
+_MISS = CACHE_LOOKUPS.labels('barcode', 'miss')
+
+
+def normalize_barcode(code):
+    """Normalize a scanned code: numeric GTIN-8/12/13/14 become 14-digit GTINs"""
+    code = str(code).strip()
+    if code.endswith('.0'):
+        # Excel hands long numeric cells back as floats
+        code = code[:-2]
+    if code.isdigit() and len(code) in (8, 12, 13, 14):
+        return code.zfill(14)
+    return code
+
+
+def gtin_check_digit_ok(code):
+    """Validate the GS1 mod-10 check digit of a (normalized) numeric GTIN"""
+    if not code.isdigit() or len(code) != 14:
+        return False
+    digits = [int(c) for c in code]
+    total = sum(d * (3 if i % 2 == 0 else 1) for i, d in enumerate(digits[:-1]))
+    return (10 - total % 10) % 10 == digits[-1]
+
+
+class BarcodeIndex:
+    """In-memory barcode -> (medicine_id, mrp) map over one database
+
+    Lookups add the live stock; record_bill still re-checks the quantity
+    inside its own transaction.
+    """
+
+    def __init__(self):
+        self._by_code = {}
+        self._code_of = {}
+        self._warm = False
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, db, code):
+        """Resolve a scanned code to (medicine_id, mrp, stock), or None"""
+        code = normalize_barcode(code)
+        if not self._warm:
+            self.warm(db)
+        entry = self._by_code.get(code)
+        if entry is not None:
+            stock = db.cursor.execute("SELECT quantity FROM medicines WHERE id = ?",
+                                      (entry[0],)).fetchone()
+            if stock is not None:
+                self.hits += 1
+                _HIT.inc()
+                return entry + stock
+            self.invalidate(entry[0])  # deleted since it was cached
+
+        # Not cached (new barcode or invalidated by an edit): one indexed read
+        self.misses += 1
+        _MISS.inc()
+        row = db.cursor.execute(
+            "SELECT id, mrp, quantity FROM medicines WHERE barcode = ?", (code,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._store(code, row[:2])
+        return tuple(row)
+
+    def warm(self, db):
+        """Load every barcoded medicine in one pass"""
+        rows = db.cursor.execute(
+            "SELECT barcode, id, mrp FROM medicines WHERE barcode IS NOT NULL"
+        ).fetchall()
+        self._by_code.clear()
+        self._code_of.clear()
+        for code, *row in rows:
+            self._store(code, row)
+        self._warm = True
+
+    def invalidate(self, medicine_id=None):
+        """Drop one medicine's entry (after an edit), or everything"""
+        if medicine_id is None:
+            self._by_code.clear()
+            self._code_of.clear()
+            self._warm = False
+            return
+        code = self._code_of.pop(medicine_id, None)
+        if code is not None:
+            self._by_code.pop(code, None)
+
+    def _store(self, code, row):
+        medicine_id, mrp = row
+        self._by_code[code] = (medicine_id, mrp)
+        self._code_of[medicine_id] = code
@@ -0,0 +1,39 @@
+# ============================================================================
+# PRAGNYA PHARM - Bill number allocation
+# ============================================================================
+# Bill numbers are `BILL-<counter>-<seq>`, where seq comes from the
+# per-counter row in `bill_sequences`. Busy counters reserve a block of
+# numbers in one short write transaction and then hand them out from memory,
+# so the database is touched once per block instead of once per bill.
+# Numbers left in a block when a process exits are skipped, never reused.
+import threading
+
+
+def format_bill_no(counter, seq):
+    return f"BILL-{counter}-{seq:07d}"
+
+
+class BillNumberAllocator:
+    """Thread-safe, block-allocating bill number source for many counters
+
+    `db` should be an IndianPharmacyDB handle used for nothing else: blocks
+    are reserved (and committed) on it, so it must never be inside another
+    caller's transaction.
+    """
+
+    def __init__(self, db, block_size=50):
+        self.db = db
+        self.block_size = block_size
+        self._ranges = {}
+        self._lock = threading.Lock()
+        self.blocks = 0
+
+    def next(self, counter='C1'):
+        """Return the next bill number for `counter`"""
+        with self._lock:
+            seq, end = self._ranges.get(counter, (0, 0))
+            if seq >= end:
+                seq, end = self.db.reserve_bill_numbers(counter, self.block_size)
+                self.blocks += 1
+            self._ranges[counter] = (seq + 1, end)
+        return format_bill_no(counter, seq)
@@ -0,0 +1,160 @@
+# ============================================================================
+# PRAGNYA PHARM - Chart figures for the dashboard and analytics pages
+# ============================================================================
+# Builders take query results and return Plotly figures. The app memoizes
+# them by IndianPharmacyDB.data_version(), so a rerun with unchanged data
+# reuses the figure instead of querying and rebuilding.
+#
+# Figures are made with plotly.graph_objects rather than plotly.express:
+# express re-derives traces, layout templates and colour mappings on every
+# call and costs several times more for the same chart.
+#
+# Long time series are downsampled on the server with LTTB
+# (Largest-Triangle-Three-Buckets: one point per bucket, the one spanning
+# the biggest triangle with its neighbours, so peaks and dips survive)
+# to at most MAX_TRACE_POINTS per trace. Three years of daily sales then
+# ship ~500 points to the browser instead of ~1100.
+#
+# plotly and numpy are imported inside the functions, as elsewhere in
+# the package.
+
+# Most points any one trace sends to the browser
+MAX_TRACE_POINTS = 500
+
+STOCK_COLORS = ['#28B463', '#F39C12', '#E74C3C']
+EXPIRY_COLORS = {'Critical (<7)': '#E74C3C', 'Warning (8-30)': '#F39C12', 'Normal': '#28B463'}
+BRAND_GREEN = '#0A5C36'
+
+
+def lttb(x, y, threshold):
+    """Indices of `threshold` points of (x, y) chosen by LTTB (x ascending)"""
+    import numpy as np
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def downsample(frame, x, y, max_points=MAX_TRACE_POINTS):
+    """`frame` cut to at most `max_points` rows by LTTB over columns x (dates) and y"""
+    import pandas as pd
+
+    if len(frame) <= max_points:
+        return frame
+    xs = pd.to_datetime(frame[x]).to_numpy(dtype='datetime64[s]').astype('int64')
+    return frame.iloc[lttb(xs, frame[y].to_numpy(), max_points)]
+
+
+def stock_status_pie(total, low_stock, out_of_stock):
+    """Adequate / low / out-of-stock pie"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Pie(labels=['Adequate', 'Low Stock', 'Out of Stock'],
+                           values=[total - low_stock, low_stock, out_of_stock],
+                           marker=dict(colors=STOCK_COLORS), sort=False))
+    fig.update_layout(legend_title_text='Status')
+    return fig
+
+
+def expiry_timeline(expiring, top=10):
+    """Bar per medicine of days left, coloured by urgency"""
+    import plotly.graph_objects as go
+
+    expiring = expiring.head(top)
+    days = expiring['days_left'].astype(int)
+    status = days.map(lambda d: 'Critical (<7)' if d <= 7 else 'Warning (8-30)' if d <= 30 else 'Normal')
+    fig = go.Figure()
+    for name, color in EXPIRY_COLORS.items():
+        rows = status == name
+        if rows.any():
+            fig.add_trace(go.Bar(x=expiring['brand_name'][rows], y=days[rows], name=name,
+                                 marker_color=color))
+    fig.update_layout(title='Top 10 Expiring Medicines', xaxis_title='brand_name',
+                      yaxis_title='days_left', legend_title_text='status')
+    return fig
+
+
+def sales_trend(sales, max_points=MAX_TRACE_POINTS):
+    """Daily revenue area chart, LTTB-downsampled to `max_points`"""
+    import plotly.graph_objects as go
+
+    shown = downsample(sales, 'sale_date', 'daily_revenue', max_points)
+    title = "Sales Trend"
+    if len(shown) < len(sales):
+        title += f" ({len(shown)} of {len(sales)} days shown)"
+    fig = go.Figure(go.Scatter(
+        x=shown['sale_date'],
+        y=shown['daily_revenue'].round(2),
+        name='Daily Revenue',
+        line=dict(color=BRAND_GREEN, width=3),
+        fill='tozeroy',
+        fillcolor='rgba(10, 92, 54, 0.1)'
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title="Revenue (₹)",
+        hovermode='x unified'
+    )
+    return fig
+
+
+def top_medicines_bars(top_meds):
+    """(units sold, revenue) bar charts for the top medicines"""
+    import plotly.graph_objects as go
+
+    figures = []
+    for column, title, scale in (('total_sold', 'Top 10 Medicines by Quantity Sold', 'Viridis'),
+                                 ('total_revenue', 'Top 10 Medicines by Revenue', 'Plasma')):
+        values = top_meds[column].round(2)
+        fig = go.Figure(go.Bar(x=top_meds['brand_name'], y=values,
+                               marker=dict(color=values, colorscale=scale, showscale=True,
+                                           colorbar=dict(title=column))))
+        fig.update_layout(title=title, xaxis_title='brand_name', yaxis_title=column)
+        figures.append(fig)
+    return tuple(figures)
+
+
+def forecast_chart(forecast, medicine):
+    """Predicted monthly demand bars with the reorder point"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=forecast['month_name'],
+        y=forecast['predicted_demand'],
+        name='Predicted Demand',
+        marker_color=BRAND_GREEN
+    ))
+    fig.add_trace(go.Scatter(
+        x=forecast['month_name'],
+        y=forecast['reorder_point'],
+        name='Reorder Point',
+        line=dict(color='#E74C3C', dash='dash')
+    ))
+    fig.update_layout(
+        title=f"3-Month Demand Forecast for {medicine}",
+        xaxis_title="Month",
+        yaxis_title="Units",
+        hovermode='x unified'
+    )
+    return fig
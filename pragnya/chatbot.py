@@ -0,0 +1,346 @@
+# ============================================================================
+# PRAGNYA PHARM - Intelligent Chatbot
+# ============================================================================
+# Routing is one pass of a compiled regex over the message: every intent's
+# keywords are a named group, the highest-priority group that matched
+# wins. Keywords match at word starts ("expir" covers expire/expiring/
+# expired, "sale" covers sales) and greetings only as whole words, so "hi"
+# no longer fires inside "which".
+#
+# Medicine names are looked up in an in-memory token table (first word of
+# each brand/generic name -> full names, longest first) instead of scanning
+# the medicines table on every message. Aggregate answers (low stock,
+# expiring, today's sales, ...) are cached per
+# IndianPharmacyDB.data_version() and day, so repeated questions cost a
+# dict lookup until something is written; free-text search answers make
+# the key space open-ended, so the cache is an LRU of ANSWER_CACHE_SIZE.
+# The name table survives writes and is rebuilt only when NAMES_SIGNATURE
+# shows medicines were added or removed.
+import random
+import re
+from collections import OrderedDict
+from datetime import date
+
+from pragnya.metrics import CACHE_LOOKUPS
+
+# Intents in priority order; the medicine lookup runs right after greetings
+INTENTS = (
+    ('greeting', r'\b(?:hello|hi|hey|namaste|good morning|good afternoon)\b'),
+    ('stock', r'\b(?:stock|available|quantity|kitna hai)'),
+    ('expiry', r'\b(?:expir|khatam|date)'),
+    ('sales', r'\b(?:sale|bikri|revenue)'),
+    ('prescription', r'\b(?:prescription|doctor|patient|rx\b)'),
+    ('supplier', r'\b(?:supplier|company|order|supply)'),
+    ('help', r'\b(?:help|madad)'),
+)
+INTENT_ROUTER = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in INTENTS))
+INTENT_PRIORITY = {name: rank for rank, (name, _) in enumerate(INTENTS)}
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+_HIT = CACHE_LOOKUPS.labels('chatbot', 'hit')
+_MISS = CACHE_LOOKUPS.labels('chatbot', 'miss')
+
+# Changes only when a medicine is added or removed, not on a sale. Nothing
+# renames a medicine in place (inventory uploads insert new rows), so the
+# names need not be read to notice a change.
+NAMES_SIGNATURE = "SELECT COUNT(*), MAX(id) FROM medicines"
+
+ANSWER_CACHE_SIZE = 256
+
+
+class PharmacyChatbot:
+    def __init__(self, db):
+        self.db = db
+        self.context = {}
+        self._version = None
+        self._cache = OrderedDict()
+        self._names = {}
+        self._names_signature = None
+        self._names_version = None
+    
+    def process_query(self, user_input):
+        """Process user query with Indian pharmacy context"""
+        user_input = user_input.lower().strip()
+        intent, medicine_info = self.route(user_input)
+        
+        # Update context
+        if medicine_info:
+            self.context['last_medicine'] = medicine_info['brand'].lower()
+        
+        if intent == 'greeting':
+            return self.get_greeting_response()
+        if intent == 'medicine':
+            return self.get_medicine_response(medicine_info)
+        if intent == 'stock':
+            return self.get_stock_response(user_input)
+        if intent == 'expiry':
+            return self.get_expiry_response(user_input)
+        if intent == 'sales':
+            return self.get_sales_response()
+        if intent == 'prescription':
+            return self.get_prescription_response()
+        if intent == 'supplier':
+            return self.get_supplier_response()
+        if intent == 'help':
+            return self.get_help_response()
+        
+        # Free-text needs ("something for acidity") go to the catalogue search
+        return self.get_search_response(user_input)
+    
+    def route(self, text):
+        """(intent, medicine info or None) for a lower-cased message"""
+        best = None
+        for match in INTENT_ROUTER.finditer(text):
+            if best is None or INTENT_PRIORITY[match.lastgroup] < INTENT_PRIORITY[best]:
+                best = match.lastgroup
+        medicine_info = self.extract_medicine_info(text)
+        if best == 'greeting':
+            return best, medicine_info
+        if medicine_info:
+            return 'medicine', medicine_info
+        return best or 'default', None
+    
+    def _refresh(self):
+        """Drop cached answers and the name table when the data or the day changed"""
+        version = (self.db.data_version(), date.today())
+        if version != self._version:
+            self._version = version
+            self._cache.clear()
+    
+    def _cached(self, key, build):
+        self._refresh()
+        if key not in self._cache:
+            _MISS.inc()
+            self._cache[key] = build()
+            if len(self._cache) > ANSWER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            _HIT.inc()
+            self._cache.move_to_end(key)
+        return self._cache[key]
+    
+    def update_context(self, user_input):
+        """Update conversation context"""
+        medicine_info = self.extract_medicine_info(user_input)
+        if medicine_info:
+            self.context['last_medicine'] = medicine_info['brand'].lower()
+    
+    def is_greeting(self, text):
+        return any(m.lastgroup == 'greeting' for m in INTENT_ROUTER.finditer(text))
+    
+    def get_greeting_response(self):
+        responses = [
+            "Namaste! I'm your Pragnya Pharm assistant. How can I help you today? 💊",
+            "Hello! Welcome to Pragnya Pharm. What pharmacy assistance do you need?",
+            "Hi there! Ready to help with your pharmacy queries. What do you need?"
+        ]
+        return random.choice(responses)
+    
+    def _name_table(self):
+        """First word of each medicine name -> [(name, info)], longest name first"""
+        self._refresh()
+        if self._names_version == self._version:
+            return self._names
+        self._names_version = self._version
+        signature = self.db.cursor.execute(NAMES_SIGNATURE).fetchone()
+        if signature != self._names_signature:
+            self._names_signature = signature
+            table = {}
+            seen = set()
+            rows = self.db.cursor.execute(
+                "SELECT id, brand_name, generic_name FROM medicines ORDER BY id").fetchall()
+            for med_id, brand, generic in rows:
+                info = {'id': med_id, 'brand': brand, 'generic': generic}
+                for name in (brand, generic):
+                    name = (name or '').lower().strip()
+                    words = _WORD.findall(name)
+                    if not words or name in seen:
+                        continue
+                    seen.add(name)
+                    table.setdefault(words[0], []).append((name, info))
+            for candidates in table.values():
+                candidates.sort(key=lambda c: len(c[0]), reverse=True)
+            self._names = table
+        return self._names
+    
+    def extract_medicine_info(self, text):
+        """Extract medicine information from query"""
+        table = self._name_table()
+        for word in _WORD.finditer(text):
+            for name, info in table.get(word.group(), ()):
+                if text.startswith(name, word.start()):
+                    return info
+        return None
+    
+    def get_medicine_response(self, medicine_info):
+        """Get detailed medicine information"""
+        return self._cached(('medicine', medicine_info['id']),
+                            lambda: self._medicine_response(medicine_info))
+    
+    def _medicine_response(self, medicine_info):
+        query = '''
+            SELECT brand_name, generic_name, quantity, expiry_date, mrp, category,
+                   julianday(expiry_date) - julianday('now') as days_left, min_quantity
+            FROM medicines WHERE id = ?
+        '''
+        result = self.db.cursor.execute(query, (medicine_info['id'],)).fetchone()
+        
+        if result:
+            brand, generic, qty, expiry, mrp, category, days_left, min_qty = result
+            
+            response = f"**{brand}** ({generic})\n\n"
+            response += f"📦 **Stock Available:** {qty} units\n"
+            response += f"💰 **MRP:** ₹{mrp:.2f}\n"
+            response += f"🏷️ **Category:** {category}\n"
+            
+            if days_left > 0:
+                if days_left <= 7:
+                    response += f"⚠️ **Expiry Alert:** {int(days_left)} days left ({expiry})\n"
+                elif days_left <= 30:
+                    response += f"📅 **Expiring:** {int(days_left)} days ({expiry})\n"
+                else:
+                    response += f"✅ **Expiry Date:** {expiry}\n"
+            else:
+                response += f"❌ **EXPIRED:** {expiry}\n"
+            
+            # Add reorder suggestion if low stock
+            if qty <= min_qty:
+                shortage = min_qty - qty
+                response += f"\n🚨 **Low Stock Alert!** Need {shortage} more units. Want me to create a reorder?"
+            
+            return response
+        return f"Could not find details for {medicine_info['brand']}"
+    
+    def get_stock_response(self, query):
+        """Get stock information"""
+        if 'low' in query or 'kam' in query:
+            return self._cached('low_stock', self._low_stock_response)
+        return self._cached('stock_summary', self._stock_summary_response)
+    
+    def _low_stock_response(self):
+        low_stock = self.db.get_low_stock_medicines()
+        if len(low_stock) > 0:
+            response = "🚨 **Low Stock Medicines:**\n"
+            for _, row in low_stock.head(5).iterrows():
+                response += f"• {row['brand_name']}: {row['quantity']} units (Min: {row['min_quantity']})\n"
+            if len(low_stock) > 5:
+                response += f"\n... and {len(low_stock) - 5} more items"
+            return response
+        return "✅ All stock levels are adequate!"
+    
+    def _stock_summary_response(self):
+        stats = self.db.get_dashboard_stats()
+        return f"**Stock Summary:**\n• Total Medicines: {stats['total_medicines']}\n• Low Stock Items: {stats['low_stock']}\n• Inventory Value: ₹{stats['inventory_value']:,.2f}"
+    
+    def get_expiry_response(self, query):
+        """Get expiry information"""
+        if 'soon' in query or '30' in query:
+            return self._cached('expiring_soon', self._expiring_soon_response)
+        return self._cached('expiring_90', self._expiring_count_response)
+    
+    def _expiring_soon_response(self):
+        expiring = self.db.get_expiring_medicines(30)
+        if len(expiring) > 0:
+            response = "📅 **Medicines Expiring Soon (≤30 days):**\n"
+            critical = []
+            warning = []
+            
+            for _, row in expiring.iterrows():
+                days = int(row['days_left'])
+                if days <= 7:
+                    critical.append(f"• {row['brand_name']}: {days} days ({row['expiry_date']})")
+                else:
+                    warning.append(f"• {row['brand_name']}: {days} days ({row['expiry_date']})")
+            
+            if critical:
+                response += "\n🚨 **Critical (≤7 days):**\n" + "\n".join(critical[:3])
+            if warning:
+                response += "\n⚠️ **Warning (8-30 days):**\n" + "\n".join(warning[:3])
+            
+            if len(expiring) > 6:
+                response += f"\n\n... and {len(expiring) - 6} more medicines"
+            return response
+        return "✅ No medicines expiring in the next 30 days!"
+    
+    def _expiring_count_response(self):
+        expiring = self.db.get_expiring_medicines(90)
+        return f"There are {len(expiring)} medicines expiring in the next 90 days."
+    
+    def get_sales_response(self):
+        """Get sales information"""
+        return self._cached('sales_today', self._sales_response)
+    
+    def _sales_response(self):
+        # Today's sales
+        today = self.db.get_today_sales()
+        
+        if today['units']:
+            return f"**Today's Sales:**\n• Bills: {today['bills']}\n• Units Sold: {today['units']}\n• Revenue: ₹{today['revenue']:,.2f}"
+        return "No sales recorded today yet."
+    
+    def get_prescription_response(self):
+        """Get prescription information"""
+        return self._cached('prescriptions', self._prescription_response)
+    
+    def _prescription_response(self):
+        self.db.cursor.execute("SELECT COUNT(*) FROM prescriptions WHERE status = 'Pending'")
+        pending = self.db.cursor.fetchone()[0]
+        
+        return f"**Prescriptions:**\n• Pending: {pending} prescription(s)\n• Use 'Prescriptions' page to view details."
+    
+    def get_supplier_response(self):
+        """Get supplier information"""
+        return self._cached('suppliers', self._supplier_response)
+    
+    def _supplier_response(self):
+        self.db.cursor.execute("SELECT COUNT(*) FROM suppliers")
+        count = self.db.cursor.fetchone()[0]
+        
+        return f"We work with {count} trusted suppliers. Check 'Suppliers' page for details."
+    
+    def get_search_response(self, query):
+        """Medicines matching a described need, or the default response"""
+        return self._cached(('search', query), lambda: self._search_response(query))
+    
+    def _search_response(self, query):
+        results = self.db.semantic_search(query, 5)
+        if not results:
+            return self.get_default_response()
+        ids = [r['id'] for r in results]
+        stock = dict(self.db.cursor.execute(
+            f"SELECT id, quantity FROM medicines WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall())
+        response = "🔎 **Medicines that may help:**\n"
+        for r in results:
+            response += f"• {r['brand_name']} ({r['generic_name']}) - {stock.get(r['id'], 0)} units\n"
+        return response + "\nAsk about any of these by name for price and expiry."
+    
+    def get_help_response(self):
+        """Get help information"""
+        return """
+        **I can help you with:**
+        
+        💊 **Medicine Info:** Ask about any medicine (stock, price, expiry)
+        🔎 **Find by Need:** "Something for acidity", "BP tablet"
+        📦 **Stock Queries:** "Show low stock", "Check stock levels"
+        📅 **Expiry Tracking:** "What's expiring soon?", "Expiry alerts"
+        💰 **Sales Info:** "Today's sales", "Revenue"
+        📝 **Prescriptions:** Prescription status and details
+        🚚 **Suppliers:** Supplier information
+        🚨 **Alerts:** Critical alerts and warnings
+        
+        **Try asking:**
+        • "Stock of Crocin"
+        • "What's expiring this week?"
+        • "Show low stock medicines"
+        • "Today's sales report"
+        """
+    
+    def get_default_response(self):
+        """Get default response"""
+        responses = [
+            "I can help with medicine stock, expiry dates, sales reports, and more. What specific information do you need?",
+            "I'm here to assist with pharmacy operations. Try asking about medicine stock, expiry, or sales.",
+            "Need pharmacy assistance? I can check stock levels, expiry dates, or help with prescriptions."
+        ]
+        return random.choice(responses)
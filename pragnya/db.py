@@ -0,0 +1,1163 @@
+# ============================================================================
+# PRAGNYA PHARM - Database Manager (Indian Pharmacy Style)
+# ============================================================================
+# UI-free: nothing here may import streamlit or plotly. pandas is imported
+# inside the methods that return DataFrames so that workers and scripts that
+# only need sqlite pay nothing for it at import time.
+import logging
+import sqlite3
+import time
+
+from pragnya.archive import SalesArchive
+from pragnya.barcode import BarcodeIndex, gtin_check_digit_ok, normalize_barcode
+from pragnya.billno import format_bill_no
+from pragnya.metrics import (ALERTS_CREATED, ALERTS_RESOLVED, BILL_LINES, BILL_SECONDS, BILLS,
+                             IMPORT_ROWS, IMPORT_SECONDS, IMPORTS)
+from pragnya.outbox import MailOutbox
+from pragnya.querylog import connect
+from pragnya.search import MedicineSearch
+from pragnya.suppliers import SupplierBook
+
+logger = logging.getLogger(__name__)
+
+
+# Header columns added to `bills` after it was first introduced
+BILL_HEADER_COLUMNS = [
+    ('bill_date', 'DATE'),
+    ('customer_name', 'TEXT'),
+    ('customer_phone', 'TEXT'),
+    ('doctor_name', 'TEXT'),
+    ('payment_mode', 'TEXT'),
+    ('discount_percent', 'REAL DEFAULT 0'),
+    ('gst_percent', 'REAL DEFAULT 18'),
+    ('subtotal', 'REAL DEFAULT 0'),
+    ('discount_amount', 'REAL DEFAULT 0'),
+    ('gst_amount', 'REAL DEFAULT 0'),
+    ('total', 'REAL DEFAULT 0'),
+    ('item_count', 'INTEGER DEFAULT 0'),
+]
+
+# Open alerts are listed most severe first, newest first within a severity.
+# The expression must match the one in idx_alerts_open* exactly for the
+# partial indexes to serve the paged list and the counts.
+SEVERITY_RANK = "(CASE severity WHEN 'HIGH' THEN 3 WHEN 'MEDIUM' THEN 2 WHEN 'LOW' THEN 1 ELSE 0 END)"
+# Alert Settings (the `settings` table); values are stored as text and
+# read back as the type of their default
+DEFAULT_SETTINGS = {
+    'expiry_warning_days': 30,
+    'critical_expiry_days': 7,
+    'low_stock_percent': 30,
+}
+
+# Alert types auto_resolve_alerts() clears when their lot is gone
+EXPIRY_ALERT_TYPES = ('EXPIRY', 'EXPIRED')
+LOW_STOCK_PRIORITY = '''(CASE WHEN quantity = 0 THEN 'HIGH'
+                              WHEN min_quantity - quantity > min_quantity THEN 'MEDIUM'
+                              ELSE 'LOW' END)'''
+
+
+def bill_totals(subtotal, discount_percent=0, gst_percent=18):
+    """Return (discount_amount, gst_amount, final_total) for a bill subtotal"""
+    discount_amount = subtotal * (discount_percent / 100)
+    gst_amount = (subtotal - discount_amount) * (gst_percent / 100)
+    return discount_amount, gst_amount, subtotal - discount_amount + gst_amount
+
+
+class IndianPharmacyDB:
+    def __init__(self, db_file='pharmacy.db'):
+        self.db_file = db_file
+        # Instrumented: statement timings feed pragnya.querylog.STATS
+        self.conn = connect(self.db_file, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.barcodes = BarcodeIndex()
+        self.search_index = MedicineSearch()
+        self.archive = SalesArchive(self)
+        self.suppliers = SupplierBook(self)
+        self.outbox = MailOutbox(self)
+        self.create_tables()
+    
+    def create_tables(self):
+        """Create database tables for Indian pharmacy operations"""
+        # Medicines table with Indian naming conventions
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS medicines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                brand_name TEXT NOT NULL,
+                generic_name TEXT,
+                company TEXT,
+                batch_no TEXT,
+                mfg_date TEXT,
+                expiry_date TEXT,
+                quantity INTEGER DEFAULT 0,
+                max_quantity INTEGER,
+                min_quantity INTEGER DEFAULT 20,
+                mrp REAL,
+                purchase_price REAL,
+                category TEXT,
+                schedule TEXT,
+                store_location TEXT,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Daily sales records
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sales (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bill_id INTEGER,
+                bill_no TEXT,
+                medicine_id INTEGER,
+                quantity INTEGER,
+                selling_price REAL,
+                discount REAL DEFAULT 0,
+                gst_percent REAL DEFAULT 18,
+                total_amount REAL,
+                customer_name TEXT,
+                customer_phone TEXT,
+                doctor_name TEXT,
+                sale_date DATE DEFAULT CURRENT_DATE,
+                payment_mode TEXT,
+                FOREIGN KEY (bill_id) REFERENCES bills (id),
+                FOREIGN KEY (medicine_id) REFERENCES medicines (id)
+            )
+        ''')
+        
+        # Suppliers (Indian companies)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS suppliers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                phone TEXT,
+                email TEXT,
+                address TEXT,
+                city TEXT,
+                state TEXT,
+                gst_no TEXT,
+                payment_terms TEXT
+            )
+        ''')
+        
+        # Prescriptions
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prescriptions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_name TEXT,
+                patient_age INTEGER,
+                patient_gender TEXT,
+                patient_phone TEXT,
+                doctor_name TEXT,
+                doctor_license TEXT,
+                diagnosis TEXT,
+                date TEXT,
+                status TEXT DEFAULT 'Pending'
+            )
+        ''')
+        
+        # Prescription items
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prescription_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                prescription_id INTEGER,
+                medicine_name TEXT,
+                dosage TEXT,
+                frequency TEXT,
+                duration TEXT,
+                instructions TEXT,
+                FOREIGN KEY (prescription_id) REFERENCES prescriptions (id)
+            )
+        ''')
+        
+        # Stock alerts
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                medicine_id INTEGER,
+                alert_type TEXT,
+                message TEXT,
+                severity TEXT,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                resolved BOOLEAN DEFAULT 0,
+                FOREIGN KEY (medicine_id) REFERENCES medicines (id)
+            )
+        ''')
+        
+        # Auto reorder queue
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reorder_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                medicine_id INTEGER,
+                quantity INTEGER,
+                reason TEXT,
+                priority TEXT,
+                status TEXT DEFAULT 'Pending',
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (medicine_id) REFERENCES medicines (id)
+            )
+        ''')
+        
+        # Patient adherence tracking
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS patient_adherence (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_phone TEXT,
+                medicine_name TEXT,
+                prescribed_date DATE,
+                next_refill_date DATE,
+                last_refill_date DATE,
+                adherence_score INTEGER,
+                notes TEXT
+            )
+        ''')
+        
+        # Bills replayed from counter journals (idempotency ledger)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS journal_applied (
+                bill_no TEXT PRIMARY KEY,
+                counter TEXT,
+                applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                status TEXT DEFAULT 'applied'
+            )
+        ''')
+        # 'applied', or 'rejected' for bills set aside in the rejected file
+        self._add_column('journal_applied', 'status', "TEXT DEFAULT 'applied'")
+        
+        # Bill headers: one row per bill with its customer, payment and
+        # computed totals; sales rows are its lines (sales.bill_id)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bills (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bill_no TEXT NOT NULL,
+                bill_date DATE DEFAULT CURRENT_DATE,
+                customer_name TEXT,
+                customer_phone TEXT,
+                doctor_name TEXT,
+                payment_mode TEXT,
+                discount_percent REAL DEFAULT 0,
+                gst_percent REAL DEFAULT 18,
+                subtotal REAL DEFAULT 0,
+                discount_amount REAL DEFAULT 0,
+                gst_amount REAL DEFAULT 0,
+                total REAL DEFAULT 0,
+                item_count INTEGER DEFAULT 0,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_bills_bill_no ON bills (bill_no)")
+        # Databases from before the header columns existed
+        for column, decl in BILL_HEADER_COLUMNS:
+            self._add_column('bills', column, decl)
+        if self._add_column('sales', 'bill_id', 'INTEGER REFERENCES bills (id)'):
+            self._backfill_bills()
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_bills_bill_date ON bills (bill_date)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_bill_id ON sales (bill_id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_bill_no ON sales (bill_no)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date)")
+        
+        # Per-counter monotonic bill sequence
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bill_sequences (
+                counter TEXT PRIMARY KEY,
+                next_seq INTEGER NOT NULL
+            )
+        ''')
+        
+        # GTIN / barcode per medicine (NULLs allowed, duplicates are not)
+        self._add_column('medicines', 'barcode', 'TEXT')
+        # Free-text uses ("acidity, heartburn") for semantic search
+        self._add_column('medicines', 'indications', 'TEXT')
+        self.cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_medicines_barcode ON medicines (barcode)"
+        )
+        
+        # Older databases name these `type` / `date_created` (and `alert_id`,
+        # which is the rowid either way)
+        if self._add_column('alerts', 'alert_type', 'TEXT'):
+            self.cursor.execute("UPDATE alerts SET alert_type = type")
+        if self._add_column('alerts', 'created_date', 'TIMESTAMP'):
+            self.cursor.execute("UPDATE alerts SET created_date = date_created")
+        # Paged lists and counts only ever look at the open set
+        self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_alerts_open ON alerts ({SEVERITY_RANK}) "
+                            f"WHERE resolved = 0")
+        self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_alerts_open_type "
+                            f"ON alerts (alert_type, {SEVERITY_RANK}) WHERE resolved = 0")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicines_low_stock ON medicines (quantity) "
+                            "WHERE quantity <= min_quantity")
+        
+        # Store-wide settings edited from the app (see DEFAULT_SETTINGS)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Suppliers: who each medicine is bought from, purchase orders
+        # drafted from the reorder queue and delivery lead times
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS medicine_suppliers (
+                medicine_id INTEGER NOT NULL REFERENCES medicines (id),
+                supplier_id INTEGER NOT NULL REFERENCES suppliers (id),
+                unit_cost REAL,
+                preferred BOOLEAN DEFAULT 1,
+                PRIMARY KEY (medicine_id, supplier_id)
+            )
+        ''')
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_medicine_suppliers_preferred "
+                            "ON medicine_suppliers (medicine_id) WHERE preferred = 1")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicine_suppliers_supplier "
+                            "ON medicine_suppliers (supplier_id)")
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS purchase_orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                po_no TEXT UNIQUE,
+                supplier_id INTEGER REFERENCES suppliers (id),
+                status TEXT DEFAULT 'Draft',
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_date DATE,
+                expected_date DATE,
+                received_date DATE,
+                item_count INTEGER DEFAULT 0,
+                total REAL DEFAULT 0
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS purchase_order_lines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                po_id INTEGER NOT NULL REFERENCES purchase_orders (id),
+                medicine_id INTEGER REFERENCES medicines (id),
+                quantity INTEGER,
+                unit_cost REAL,
+                amount REAL
+            )
+        ''')
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_po_lines_po ON purchase_order_lines (po_id)")
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS supplier_lead_times (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                supplier_id INTEGER REFERENCES suppliers (id),
+                po_id INTEGER REFERENCES purchase_orders (id),
+                ordered_date DATE,
+                received_date DATE,
+                lead_days REAL
+            )
+        ''')
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_lead_times_supplier "
+                            "ON supplier_lead_times (supplier_id, received_date)")
+        self._add_column('reorder_queue', 'po_id', 'INTEGER REFERENCES purchase_orders (id)')
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_reorder_pending ON reorder_queue (medicine_id) "
+                            "WHERE status = 'Pending'")
+
+        # Outgoing mail, sent in the background by pragnya.outbox.OutboxSender
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT,
+                recipient TEXT NOT NULL,
+                supplier_id INTEGER REFERENCES suppliers (id),
+                subject TEXT,
+                body TEXT,
+                status TEXT DEFAULT 'Pending',
+                attempts INTEGER DEFAULT 0,
+                next_attempt REAL DEFAULT 0,
+                last_error TEXT,
+                dedupe_key TEXT UNIQUE,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_date TIMESTAMP
+            )
+        ''')
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (next_attempt) "
+                            "WHERE status = 'Pending'")
+        
+        # Archival: sales cutoff, and resolved alerts / finished reorders
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alerts_archive (
+                id INTEGER PRIMARY KEY,
+                medicine_id INTEGER,
+                alert_type TEXT,
+                message TEXT,
+                severity TEXT,
+                created_date TIMESTAMP,
+                resolved BOOLEAN,
+                archived_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reorder_queue_archive (
+                id INTEGER PRIMARY KEY,
+                medicine_id INTEGER,
+                quantity INTEGER,
+                reason TEXT,
+                priority TEXT,
+                status TEXT,
+                created_date TIMESTAMP,
+                archived_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self._add_column('reorder_queue_archive', 'po_id', 'INTEGER')
+        
+        self.conn.commit()
+        self.load_initial_indian_medicines()
+    
+    def _add_column(self, table, column, decl):
+        """Add a column to an existing table if an older database lacks it
+        
+        Returns True when the column was added, so callers can backfill.
+        """
+        columns = [row[1] for row in self.cursor.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+            return True
+        return False
+    
+    def _backfill_bills(self):
+        """Build bill headers from the per-line data of older databases"""
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO bills (bill_no)
+            SELECT DISTINCT bill_no FROM sales WHERE bill_no IS NOT NULL
+        ''')
+        # Old lines carry the pre-discount, pre-GST amount and copy the
+        # bill-level fields onto every line
+        self.cursor.execute('''
+            UPDATE bills SET
+                bill_date = agg.bill_date,
+                customer_name = agg.customer_name,
+                customer_phone = agg.customer_phone,
+                doctor_name = agg.doctor_name,
+                payment_mode = agg.payment_mode,
+                discount_percent = agg.discount,
+                gst_percent = agg.gst,
+                subtotal = agg.subtotal,
+                discount_amount = agg.subtotal * agg.discount / 100,
+                gst_amount = agg.subtotal * (1 - agg.discount / 100) * agg.gst / 100,
+                total = agg.subtotal * (1 - agg.discount / 100) * (1 + agg.gst / 100),
+                item_count = agg.lines
+            FROM (
+                SELECT bill_no, MIN(sale_date) AS bill_date,
+                       MAX(customer_name) AS customer_name, MAX(customer_phone) AS customer_phone,
+                       MAX(doctor_name) AS doctor_name, MAX(payment_mode) AS payment_mode,
+                       COALESCE(MAX(discount), 0) AS discount, COALESCE(MAX(gst_percent), 18) AS gst,
+                       SUM(total_amount) AS subtotal, COUNT(*) AS lines
+                FROM sales WHERE bill_no IS NOT NULL GROUP BY bill_no
+            ) AS agg
+            WHERE bills.bill_no = agg.bill_no
+        ''')
+        self.cursor.execute('''
+            UPDATE sales SET bill_id = (SELECT id FROM bills WHERE bills.bill_no = sales.bill_no)
+            WHERE bill_no IS NOT NULL
+        ''')
+    
+    def load_initial_indian_medicines(self):
+        """Load common Indian medicines"""
+        count = self.cursor.execute("SELECT COUNT(*) FROM medicines").fetchone()[0]
+        if count == 0:
+            # Common Indian medicines with realistic data
+            medicines = [
+                # Analgesics
+                ('Crocin 650mg', 'Paracetamol', 'GSK', 'CRN-2024-01', '2024-01-15', '2025-12-31', 100, 200, 30, 15.0, 8.5, 'Analgesic', 'OTC', 'Rack A1'),
+                ('Combiflam', 'Ibuprofen + Paracetamol', 'Sanofi', 'CBF-2024-02', '2024-02-10', '2025-11-30', 75, 150, 25, 25.0, 15.0, 'Analgesic', 'OTC', 'Rack A2'),
+                
+                # Antibiotics
+                ('Augmentin 625mg', 'Amoxicillin + Clavulanic', 'GSK', 'AUG-2024-01', '2024-01-20', '2025-10-31', 50, 100, 20, 180.0, 120.0, 'Antibiotic', 'Schedule H', 'Rack B1'),
+                ('Azithral 500mg', 'Azithromycin', 'Alembic', 'AZT-2024-03', '2024-03-05', '2026-03-04', 60, 120, 25, 85.0, 55.0, 'Antibiotic', 'Schedule H', 'Rack B2'),
+                
+                # Cardiac
+                ('Cardace 5mg', 'Ramipril', 'Sun Pharma', 'CRD-2024-01', '2024-01-12', '2025-12-31', 80, 160, 40, 120.0, 85.0, 'Cardiac', 'Schedule H', 'Rack C1'),
+                ('Storvas 10mg', 'Atorvastatin', 'Sun Pharma', 'STV-2024-02', '2024-02-18', '2026-02-17', 90, 180, 45, 95.0, 65.0, 'Cardiac', 'Schedule H', 'Rack C2'),
+                
+                # Diabetic
+                ('Glycomet GP 1', 'Metformin + Glimepiride', 'USV', 'GLY-2024-01', '2024-01-25', '2025-12-31', 120, 240, 50, 135.0, 90.0, 'Diabetic', 'Schedule H', 'Rack D1'),
+                ('Januvia 100mg', 'Sitagliptin', 'MSD', 'JNV-2024-02', '2024-02-14', '2026-02-13', 40, 80, 20, 480.0, 350.0, 'Diabetic', 'Schedule H', 'Rack D2'),
+                
+                # Gastrointestinal
+                ('Pantop 40mg', 'Pantoprazole', 'Sun Pharma', 'PAN-2024-01', '2024-01-08', '2025-12-31', 150, 300, 60, 45.0, 25.0, 'GI', 'Schedule H', 'Rack E1'),
+                ('Cyclopam', 'Dicyclomine + Paracetamol', 'Mankind', 'CYC-2024-03', '2024-03-01', '2026-02-28', 110, 220, 45, 65.0, 35.0, 'GI', 'OTC', 'Rack E2'),
+            ]
+            
+            for med in medicines:
+                self.cursor.execute('''
+                    INSERT INTO medicines 
+                    (brand_name, generic_name, company, batch_no, mfg_date, expiry_date, 
+                     quantity, max_quantity, min_quantity, mrp, purchase_price, category, schedule, store_location)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', med)
+            
+            # Add sample suppliers
+            suppliers = [
+                ('Medley Pharmaceuticals', '022-12345678', 'orders@medley.com', 'Plot No. 107, Andheri', 'Mumbai', 'Maharashtra', '27AAACM1234M1Z5', 'Net 30'),
+                ('Cipla Limited', '022-87654321', 'supply@cipla.com', 'Mumbai Central', 'Mumbai', 'Maharashtra', '27AABCC1234M1Z2', 'Net 45'),
+                ('Sun Pharmaceutical', '079-23456789', 'purchase@sunpharma.com', 'Sarkhej-Bavla Highway', 'Ahmedabad', 'Gujarat', '24AABCS1234M1Z3', 'Net 60'),
+            ]
+            
+            for sup in suppliers:
+                self.cursor.execute('''
+                    INSERT INTO suppliers (name, phone, email, address, city, state, gst_no, payment_terms)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', sup)
+            
+            self.conn.commit()
+    
+    def add_medicine(self, medicine_data):
+        """Add new medicine to database"""
+        try:
+            self.cursor.execute('''
+                INSERT INTO medicines 
+                (brand_name, generic_name, company, batch_no, mfg_date, expiry_date, 
+                 quantity, max_quantity, min_quantity, mrp, purchase_price, category, schedule, store_location)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', medicine_data)
+            self.conn.commit()
+            self.search_index.invalidate(self.cursor.lastrowid)
+            return self.cursor.lastrowid
+        except Exception as e:
+            logger.error("Error adding medicine: %s", e)
+            return None
+    
+    def update_stock_from_sales(self, medicine_id, quantity_sold):
+        """Update stock after sales - Indian pharmacy style"""
+        try:
+            if self._deduct_stock(medicine_id, quantity_sold):
+                self.conn.commit()
+                return True
+        except Exception as e:
+            logger.error("Error updating stock: %s", e)
+            return False
+    
+    def _deduct_stock(self, medicine_id, quantity_sold):
+        """Deduct sold units and raise low-stock alert/reorder, without committing"""
+        # Get current stock
+        self.cursor.execute("SELECT quantity FROM medicines WHERE id = ?", (medicine_id,))
+        current = self.cursor.fetchone()
+        
+        if not current:
+            return False
+        
+        new_quantity = current[0] - quantity_sold
+        if new_quantity < 0:
+            new_quantity = 0
+        
+        # Update stock
+        self.cursor.execute("UPDATE medicines SET quantity = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?", 
+                          (new_quantity, medicine_id))
+        
+        # Check if reorder needed
+        self.cursor.execute("SELECT min_quantity FROM medicines WHERE id = ?", (medicine_id,))
+        min_qty = self.cursor.fetchone()[0]
+        
+        if new_quantity <= min_qty:
+            self.create_alert(medicine_id, 'LOW_STOCK', 
+                            f'Stock below minimum ({new_quantity}/{min_qty})', 'HIGH',
+                            commit=False)
+            
+            # Auto-add to reorder queue
+            self.cursor.execute('''
+                INSERT INTO reorder_queue (medicine_id, quantity, reason, priority)
+                SELECT id, max_quantity - quantity, 'Auto-reorder: Low stock', 'HIGH'
+                FROM medicines WHERE id = ? AND quantity <= min_quantity
+            ''', (medicine_id,))
+        return True
+    
+    def next_bill_no(self, counter='C1'):
+        """Allocate the next bill number for a counter"""
+        seq, _ = self.reserve_bill_numbers(counter, 1)
+        return format_bill_no(counter, seq)
+    
+    def reserve_bill_numbers(self, counter, count):
+        """Reserve `count` consecutive sequence numbers for a counter
+        
+        Returns (first, end) with end exclusive. Commits unless the caller
+        already has a transaction open.
+        """
+        own_transaction = not self.conn.in_transaction
+        if own_transaction:
+            self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self.cursor.execute(
+                "INSERT OR IGNORE INTO bill_sequences (counter, next_seq) VALUES (?, 1)",
+                (counter,))
+            first = self.cursor.execute(
+                "SELECT next_seq FROM bill_sequences WHERE counter = ?", (counter,)).fetchone()[0]
+            self.cursor.execute("UPDATE bill_sequences SET next_seq = ? WHERE counter = ?",
+                                (first + count, counter))
+            if own_transaction:
+                self.conn.commit()
+        except Exception:
+            if own_transaction:
+                self.conn.rollback()
+            raise
+        return first, first + count
+    
+    def record_bill(self, bill_no, items, customer_name=None, customer_phone=None,
+                    doctor_name=None, discount=0, gst_percent=18, payment_mode='Cash',
+                    commit=True, check_stock=True, sale_date=None):
+        """Record a bill header with its totals, one sales line per item, and deduct stock
+        
+        items are dicts with 'id', 'qty', 'price' and 'subtotal', as built by
+        the billing page. The whole bill is written or none of it: a bill
+        number already in `bills`, a missing medicine or short stock raises
+        ValueError and rolls the bill back.
+        check_stock=False records bills that were already handed over (e.g.
+        replayed from the bill journal), clamping stock at zero instead.
+        With commit=False the caller owns the surrounding transaction.
+        """
+        t0 = time.perf_counter()
+        own_transaction = not self.conn.in_transaction
+        if own_transaction:
+            # Take the write lock up front: a deferred transaction that has
+            # already read cannot wait for a busy writer and fails at once
+            self.cursor.execute("BEGIN IMMEDIATE")
+        self.cursor.execute("SAVEPOINT bill")
+        try:
+            subtotal = sum(item['subtotal'] for item in items)
+            discount_amount, gst_amount, final_total = bill_totals(subtotal, discount, gst_percent)
+            try:
+                self.cursor.execute('''
+                    INSERT INTO bills 
+                    (bill_no, bill_date, customer_name, customer_phone, doctor_name,
+                     payment_mode, discount_percent, gst_percent, subtotal,
+                     discount_amount, gst_amount, total, item_count)
+                    VALUES (?, COALESCE(?, CURRENT_DATE), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    bill_no, sale_date, customer_name, customer_phone, doctor_name,
+                    payment_mode, discount, gst_percent, subtotal,
+                    discount_amount, gst_amount, final_total, len(items)
+                ))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Bill number {bill_no} already used")
+            bill_id = self.cursor.lastrowid
+            
+            for item in items:
+                row = self.cursor.execute("SELECT quantity FROM medicines WHERE id = ?",
+                                          (item['id'],)).fetchone()
+                if row is None:
+                    raise ValueError(f"Unknown medicine id {item['id']}")
+                if check_stock and row[0] < item['qty']:
+                    raise ValueError(f"Only {row[0]} units available for medicine {item['id']}")
+                
+                self._deduct_stock(item['id'], item['qty'])
+                # Customer, payment and discount/GST live on the bill header
+                self.cursor.execute('''
+                    INSERT INTO sales 
+                    (bill_id, bill_no, medicine_id, quantity, selling_price, 
+                     discount, gst_percent, total_amount, sale_date)
+                    VALUES (?, ?, ?, ?, ?, NULL, NULL, ?, COALESCE(?, CURRENT_DATE))
+                ''', (
+                    bill_id, bill_no, item['id'], item['qty'], item['price'],
+                    item['subtotal'], sale_date
+                ))
+            self.cursor.execute("RELEASE SAVEPOINT bill")
+        except Exception:
+            if own_transaction:
+                self.conn.rollback()
+            else:
+                self.cursor.execute("ROLLBACK TO SAVEPOINT bill")
+                self.cursor.execute("RELEASE SAVEPOINT bill")
+            BILLS.labels('rejected').inc()
+            raise
+        
+        if commit:
+            self.conn.commit()
+        BILLS.labels('recorded').inc()
+        BILL_LINES.inc(len(items))
+        BILL_SECONDS.observe(time.perf_counter() - t0)
+        return bill_no
+    
+    def create_alert(self, medicine_id, alert_type, message, severity, commit=True):
+        """Create alert in database"""
+        self.cursor.execute('''
+            INSERT INTO alerts (medicine_id, alert_type, message, severity, created_date)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (medicine_id, alert_type, message, severity))
+        if commit:
+            self.conn.commit()
+        ALERTS_CREATED.labels(alert_type, severity).inc()
+    
+    def get_alert_counts(self):
+        """Open alerts as {'total', 'by_severity', 'by_type', 'oldest'} from one aggregate"""
+        rows = self.cursor.execute(f'''
+            SELECT alert_type, severity, COUNT(*), MIN(created_date)
+            FROM alerts WHERE resolved = 0
+            GROUP BY alert_type, {SEVERITY_RANK}
+        ''').fetchall()
+        counts = {'total': 0, 'by_severity': {}, 'by_type': {}, 'oldest': None}
+        for alert_type, severity, count, oldest in rows:
+            counts['total'] += count
+            counts['by_severity'][severity] = counts['by_severity'].get(severity, 0) + count
+            counts['by_type'][alert_type] = counts['by_type'].get(alert_type, 0) + count
+            if oldest and (counts['oldest'] is None or oldest < counts['oldest']):
+                counts['oldest'] = oldest
+        return counts
+    
+    def get_open_alerts(self, after=None, limit=50, alert_type=None):
+        """One page of open alerts, most severe and newest first
+        
+        Keyset pagination: pass the returned `next_after` to get the
+        following page (None when this was the last). Each page is two
+        index range reads, however deep into the list it is.
+        Returns (rows as dicts, next_after).
+        """
+        rank, last_id = after if after else (4, None)
+        type_filter = "AND alert_type = :type" if alert_type else ""
+        page = f'''
+            SELECT a.rowid, a.alert_type, a.severity, a.message, a.created_date,
+                   a.medicine_id, m.brand_name, {SEVERITY_RANK} AS rank
+            FROM alerts a LEFT JOIN medicines m ON m.id = a.medicine_id
+            WHERE a.resolved = 0 {type_filter} AND {{where}}
+            ORDER BY {{order}} LIMIT :limit
+        '''
+        # Rest of the current severity, then the lower ones: a row-value
+        # bound over the expression index would scan it from the top
+        query = (
+            "SELECT * FROM (" + page.format(where=f"{SEVERITY_RANK} = :rank AND a.rowid < :last",
+                                            order="a.rowid DESC") + ") "
+            "UNION ALL SELECT * FROM (" + page.format(where=f"{SEVERITY_RANK} < :rank",
+                                                      order=f"{SEVERITY_RANK} DESC, a.rowid DESC") + ") "
+            "LIMIT :limit"
+        )
+        params = {'rank': rank, 'last': last_id if last_id is not None else -1,
+                  'limit': limit + 1, 'type': alert_type}
+        rows = self.cursor.execute(query, params).fetchall()
+        keys = ('id', 'alert_type', 'severity', 'message', 'created_date', 'medicine_id',
+                'brand_name', 'rank')
+        alerts = [dict(zip(keys, row)) for row in rows[:limit]]
+        next_after = (alerts[-1]['rank'], alerts[-1]['id']) if len(rows) > limit else None
+        return alerts, next_after
+    
+    def resolve_alerts(self, alert_ids):
+        """Resolve the given alerts in one UPDATE; returns how many were still open"""
+        alert_ids = list(alert_ids)
+        if not alert_ids:
+            return 0
+        self.cursor.execute(
+            f"UPDATE alerts SET resolved = 1 WHERE resolved = 0 "
+            f"AND rowid IN ({','.join('?' * len(alert_ids))})", alert_ids)
+        self.conn.commit()
+        ALERTS_RESOLVED.labels('manual').inc(self.cursor.rowcount)
+        return self.cursor.rowcount
+    
+    def resolve_alerts_of_type(self, alert_type, severity=None):
+        """Resolve every open alert of a type (and severity) in one UPDATE; returns the count"""
+        query = "UPDATE alerts SET resolved = 1 WHERE resolved = 0 AND alert_type = ?"
+        params = [alert_type]
+        if severity:
+            query += " AND severity = ?"
+            params.append(severity)
+        self.cursor.execute(query, params)
+        self.conn.commit()
+        ALERTS_RESOLVED.labels('manual').inc(self.cursor.rowcount)
+        return self.cursor.rowcount
+    
+    def get_settings(self):
+        """DEFAULT_SETTINGS overlaid with the saved values"""
+        settings = dict(DEFAULT_SETTINGS)
+        for key, value in self.cursor.execute("SELECT key, value FROM settings").fetchall():
+            if key in settings:
+                try:
+                    settings[key] = type(DEFAULT_SETTINGS[key])(value)
+                except ValueError:
+                    logger.warning("Ignoring bad setting %s=%r", key, value)
+        return settings
+    
+    def save_settings(self, **values):
+        """Persist settings (keys of DEFAULT_SETTINGS) in one transaction"""
+        unknown = set(values) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        self.cursor.executemany('''
+            INSERT INTO settings (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated = CURRENT_TIMESTAMP
+        ''', [(key, str(type(DEFAULT_SETTINGS[key])(value))) for key, value in values.items()])
+        self.conn.commit()
+    
+    def auto_resolve_alerts(self, expiry_days=None, commit=True):
+        """Resolve open alerts whose condition has cleared, in one UPDATE; returns the count
+        
+        LOW_STOCK clears when the medicine is back above min_quantity.
+        EXPIRY/EXPIRED clear when the lot is gone: sold out or written off
+        (quantity 0), or replaced by stock expiring after `expiry_days`.
+        Either clears when the medicine was deleted. Only the open set is
+        read, through idx_alerts_open_type and the medicines primary key.
+        expiry_days defaults to the expiry_warning_days setting. With
+        commit=False the UPDATE joins the caller's transaction.
+        """
+        if expiry_days is None:
+            expiry_days = self.get_settings()['expiry_warning_days']
+        self.cursor.execute(f'''
+            UPDATE alerts SET resolved = 1
+            WHERE resolved = 0 AND alert_type IN ('LOW_STOCK', {','.join('?' * len(EXPIRY_ALERT_TYPES))})
+              AND NOT EXISTS (
+                  SELECT 1 FROM medicines m WHERE m.id = alerts.medicine_id
+                  AND CASE WHEN alerts.alert_type = 'LOW_STOCK' THEN m.quantity <= m.min_quantity
+                           ELSE m.quantity > 0 AND m.expiry_date <= date('now', ?) END
+              )
+        ''', (*EXPIRY_ALERT_TYPES, f'+{int(expiry_days)} days'))
+        resolved = self.cursor.rowcount
+        if commit:
+            self.conn.commit()
+        if resolved:
+            ALERTS_RESOLVED.labels('auto').inc(resolved)
+            logger.info("Auto-resolved %d alerts whose condition cleared", resolved)
+        return resolved
+    
+    def process_excel_upload(self, df, upload_type):
+        """Process Excel uploads for sales or inventory"""
+        t0 = time.perf_counter()
+        result = self._process_upload(df, upload_type)
+        if result is not None:
+            IMPORTS.labels(upload_type, 'ok' if result[0] else 'failed').inc()
+            IMPORT_ROWS.labels(upload_type).inc(len(df))
+            IMPORT_SECONDS.labels(upload_type).observe(time.perf_counter() - t0)
+        return result
+    
+    def _process_upload(self, df, upload_type):
+        try:
+            if upload_type == 'sales':
+                # One transaction for the sheet: a bad row leaves stock untouched
+                medicine_ids = {}
+                for row in df.to_dict('records'):
+                    # Find medicine by brand name (once per name in the sheet)
+                    name = row['Medicine']
+                    if name not in medicine_ids:
+                        self.cursor.execute("SELECT id FROM medicines WHERE brand_name LIKE ?", 
+                                          (f"%{name}%",))
+                        result = self.cursor.fetchone()
+                        medicine_ids[name] = result[0] if result else None
+                    medicine_id = medicine_ids[name]
+                    
+                    if medicine_id is not None:
+                        quantity = int(row['Quantity'])
+                        self._deduct_stock(medicine_id, quantity)
+                        
+                        # Record sale
+                        self.cursor.execute('''
+                            INSERT INTO sales (medicine_id, quantity, selling_price, total_amount, sale_date)
+                            VALUES (?, ?, ?, ?, DATE('now'))
+                        ''', (medicine_id, quantity, row.get('Price', 0), row.get('Total', 0)))
+                
+                self.conn.commit()
+                return True, f"Processed {len(df)} sales records"
+                
+            elif upload_type == 'inventory':
+                self.cursor.executemany('''
+                    INSERT OR REPLACE INTO medicines 
+                    (brand_name, generic_name, company, expiry_date, quantity, mrp, category)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [(
+                    row.get('Brand Name', ''),
+                    row.get('Generic Name', ''),
+                    row.get('Company', ''),
+                    row.get('Expiry Date', '2025-12-31'),
+                    int(row.get('Quantity', 0)),
+                    float(row.get('MRP', 0)),
+                    row.get('Category', 'Other')
+                ) for row in df.to_dict('records')])
+                
+                # New stock can clear low-stock and expiry alerts; resolve
+                # them in the same transaction, so one commit (fsync) covers both
+                self.auto_resolve_alerts(commit=False)
+                self.conn.commit()
+                self.barcodes.invalidate()
+                self.search_index.invalidate()
+                return True, f"Updated {len(df)} inventory items"
+            
+            elif upload_type == 'barcodes':
+                return self.import_barcodes(df)
+            
+            elif upload_type == 'supplier_mapping':
+                return self.suppliers.import_mapping(df)
+                
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            return False, f"Error: {str(e)}"
+    
+    def data_version(self):
+        """Token that changes whenever any connection or process commits
+
+        Built from the size and mtime of the database file and its WAL, so
+        it survives reruns that open a fresh connection (unlike
+        PRAGMA data_version, which is per connection).
+        """
+        import os
+        if self.db_file == ':memory:':
+            return ('memory', id(self.conn), self.conn.total_changes)
+        version = []
+        for path in (self.db_file, self.db_file + '-wal'):
+            try:
+                st = os.stat(path)
+                version += [st.st_mtime_ns, st.st_size]
+            except FileNotFoundError:
+                version += [0, 0]
+        return tuple(version)
+
+    def get_dashboard_stats(self):
+        """Get dashboard statistics"""
+        stats = {}
+        
+        # Total medicines
+        self.cursor.execute("SELECT COUNT(*) FROM medicines")
+        stats['total_medicines'] = self.cursor.fetchone()[0]
+        
+        # Low stock count
+        self.cursor.execute("SELECT COUNT(*) FROM medicines WHERE quantity <= min_quantity")
+        stats['low_stock'] = self.cursor.fetchone()[0]
+        
+        # Expiring soon (within 30 days)
+        self.cursor.execute('''
+            SELECT COUNT(*) FROM medicines 
+            WHERE date(expiry_date) BETWEEN date('now') AND date('now', '+30 days')
+        ''')
+        stats['expiring_soon'] = self.cursor.fetchone()[0]
+        
+        # Today's sales
+        today = self.get_today_sales()
+        stats['today_sales'] = today['revenue']
+        stats['today_bills'] = today['bills']
+        
+        # Total inventory value
+        self.cursor.execute("SELECT SUM(quantity * purchase_price) FROM medicines")
+        inv_value = self.cursor.fetchone()[0]
+        stats['inventory_value'] = inv_value if inv_value else 0
+        
+        # Active alerts
+        self.cursor.execute("SELECT COUNT(*) FROM alerts WHERE resolved = 0 AND severity = 'HIGH'")
+        stats['critical_alerts'] = self.cursor.fetchone()[0]
+        
+        return stats
+    
+    def get_expiring_medicines(self, days=30):
+        """Get medicines expiring within given days"""
+        import pandas as pd
+        query = '''
+            SELECT brand_name, generic_name, quantity, expiry_date, 
+                   julianday(expiry_date) - julianday('now') as days_left
+            FROM medicines 
+            WHERE days_left BETWEEN 0 AND ?
+            ORDER BY days_left
+        '''
+        return pd.read_sql_query(query, self.conn, params=(days,))
+    
+    def get_low_stock_medicines(self):
+        """Get low stock medicines"""
+        import pandas as pd
+        query = '''
+            SELECT brand_name, generic_name, quantity, min_quantity, 
+                   (min_quantity - quantity) as shortage
+            FROM medicines 
+            WHERE quantity <= min_quantity
+            ORDER BY shortage DESC
+        '''
+        return pd.read_sql_query(query, self.conn)
+    
+    def get_low_stock_counts(self):
+        """(medicines at or below minimum, of which out of stock)"""
+        total, out = self.cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(quantity = 0), 0) FROM medicines
+            WHERE quantity <= min_quantity
+        ''').fetchone()
+        return total, out
+    
+    def get_low_stock_page(self, after=None, limit=50):
+        """One page of low-stock medicines, emptiest first; returns (rows as dicts, next_after)"""
+        quantity, last_id = after if after else (-1, 0)
+        rows = self.cursor.execute(f'''
+            SELECT id, brand_name, generic_name, quantity, min_quantity,
+                   min_quantity - quantity AS shortage, {LOW_STOCK_PRIORITY} AS priority
+            FROM medicines
+            WHERE quantity <= min_quantity AND (quantity, id) > (?, ?)
+            ORDER BY quantity, id LIMIT ?
+        ''', (quantity, last_id, limit + 1)).fetchall()
+        keys = ('id', 'brand_name', 'generic_name', 'quantity', 'min_quantity', 'shortage', 'priority')
+        page = [dict(zip(keys, row)) for row in rows[:limit]]
+        next_after = (page[-1]['quantity'], page[-1]['id']) if len(rows) > limit else None
+        return page, next_after
+    
+    def queue_reorders(self, medicine_ids, reason='Manual reorder'):
+        """Queue a reorder of each medicine's shortage in one INSERT; returns the count"""
+        medicine_ids = list(medicine_ids)
+        if not medicine_ids:
+            return 0
+        self.cursor.execute(f'''
+            INSERT INTO reorder_queue (medicine_id, quantity, reason, priority)
+            SELECT id, min_quantity - quantity, ?, {LOW_STOCK_PRIORITY}
+            FROM medicines WHERE id IN ({','.join('?' * len(medicine_ids))})
+        ''', [reason] + medicine_ids)
+        self.conn.commit()
+        return self.cursor.rowcount
+    
+    def search_medicine(self, search_term):
+        """Search medicine by name"""
+        import pandas as pd
+        query = '''
+            SELECT * FROM medicines 
+            WHERE brand_name LIKE ? OR generic_name LIKE ? OR company LIKE ?
+            ORDER BY brand_name
+        '''
+        return pd.read_sql_query(query, self.conn, 
+                               params=(f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
+    
+    def semantic_search(self, query, k=10):
+        """Medicines matching a free-text need ("something for acidity"), best first"""
+        return self.search_index.search(self, query, k)
+    
+    def get_stock(self, medicine_id):
+        """Get id, name, price and stock of one medicine as a dict (None if unknown)"""
+        row = self.cursor.execute('''
+            SELECT id, brand_name, generic_name, quantity, min_quantity, mrp, expiry_date
+            FROM medicines WHERE id = ?
+        ''', (medicine_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('id', 'brand_name', 'generic_name', 'quantity',
+                         'min_quantity', 'mrp', 'expiry_date'), row))
+    
+    def search_medicine_records(self, search_term, limit=20):
+        """Search medicine by name, returning plain dicts (no pandas)"""
+        like = f'%{search_term}%'
+        rows = self.cursor.execute('''
+            SELECT id, brand_name, generic_name, company, quantity, mrp, expiry_date
+            FROM medicines 
+            WHERE brand_name LIKE ? OR generic_name LIKE ? OR company LIKE ?
+            ORDER BY brand_name
+            LIMIT ?
+        ''', (like, like, like, limit)).fetchall()
+        keys = ('id', 'brand_name', 'generic_name', 'company', 'quantity', 'mrp', 'expiry_date')
+        return [dict(zip(keys, row)) for row in rows]
+    
+    def scan_barcode(self, code):
+        """Resolve a scanned barcode to (medicine_id, mrp, stock), or None"""
+        return self.barcodes.lookup(self, code)
+    
+    def set_barcode(self, medicine_id, code):
+        """Assign a barcode to a medicine (raises sqlite3.IntegrityError if taken)"""
+        code = normalize_barcode(code) if code else None
+        self.cursor.execute("UPDATE medicines SET barcode = ? WHERE id = ?", (code, medicine_id))
+        self.conn.commit()
+        self.barcodes.invalidate(medicine_id)
+    
+    def import_barcodes(self, df):
+        """Bulk-assign barcodes from a sheet with 'Barcode' and 'Medicine ID' or 'Brand Name'
+        
+        Runs in a single transaction. Rows whose numeric GTIN fails the check
+        digit, whose medicine is unknown, or whose barcode is already used by
+        another medicine are skipped and counted.
+        """
+        names = dict(self.cursor.execute("SELECT brand_name, id FROM medicines").fetchall())
+        taken = dict(self.cursor.execute(
+            "SELECT barcode, id FROM medicines WHERE barcode IS NOT NULL").fetchall())
+        
+        updates = []
+        skipped = 0
+        for row in df.to_dict('records'):
+            code = row.get('Barcode')
+            if code is None or str(code).strip() in ('', 'nan'):
+                skipped += 1
+                continue
+            code = normalize_barcode(code)
+            if code.isdigit() and len(code) == 14 and not gtin_check_digit_ok(code):
+                skipped += 1
+                continue
+            
+            medicine_id = row.get('Medicine ID')
+            if medicine_id is None or str(medicine_id) == 'nan':
+                medicine_id = names.get(row.get('Brand Name'))
+            if medicine_id is None or taken.get(code, int(medicine_id)) != int(medicine_id):
+                skipped += 1
+                continue
+            
+            taken[code] = int(medicine_id)
+            updates.append((code, int(medicine_id)))
+        
+        try:
+            self.cursor.executemany("UPDATE medicines SET barcode = ? WHERE id = ?", updates)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            return False, f"Error: {str(e)}"
+        finally:
+            self.barcodes.invalidate()
+        
+        return True, f"Mapped {len(updates)} barcodes ({skipped} rows skipped)"
+    
+    def get_today_sales(self):
+        """Today's bill count, units sold and revenue (after discount and GST)"""
+        bills, revenue = self.cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM bills WHERE bill_date = DATE('now')"
+        ).fetchone()
+        # Lines without a bill (Excel sales uploads) count at their line amount
+        units, unbilled = self.cursor.execute('''
+            SELECT COALESCE(SUM(quantity), 0),
+                   COALESCE(SUM(CASE WHEN bill_id IS NULL THEN total_amount END), 0)
+            FROM sales WHERE sale_date = DATE('now')
+        ''').fetchone()
+        return {'bills': bills, 'units': units, 'revenue': revenue + unbilled}
+    
+    def get_daily_sales(self, start_date, end_date):
+        """Daily revenue, units and bill count between two 'YYYY-MM-DD' dates"""
+        import pandas as pd
+        bills = self.archive.source('bills', start_date, end_date)
+        sales = self.archive.source('sales', start_date, end_date)
+        query = f'''
+            SELECT day AS sale_date,
+                   SUM(revenue) AS daily_revenue,
+                   SUM(units) AS daily_quantity,
+                   SUM(bills) AS daily_bills
+            FROM (
+                SELECT bill_date AS day, total AS revenue, 0 AS units, 1 AS bills
+                FROM {bills} WHERE bill_date BETWEEN ? AND ?
+                UNION ALL
+                SELECT sale_date, CASE WHEN bill_id IS NULL THEN total_amount ELSE 0 END,
+                       quantity, 0
+                FROM {sales} WHERE sale_date BETWEEN ? AND ?
+            )
+            GROUP BY day
+            ORDER BY day
+        '''
+        return pd.read_sql_query(query, self.conn,
+                                 params=(start_date, end_date, start_date, end_date))
+    
+    def get_bills_for_date(self, bill_date=None):
+        """Bill headers for one day (default today), newest first"""
+        import pandas as pd
+        bills = self.archive.source('bills', bill_date, bill_date) if bill_date else 'bills'
+        query = f'''
+            SELECT bill_no, customer_name, payment_mode, item_count, subtotal,
+                   discount_amount, gst_amount, total, created_date
+            FROM {bills}
+            WHERE bill_date = COALESCE(?, DATE('now'))
+            ORDER BY id DESC
+        '''
+        return pd.read_sql_query(query, self.conn, params=(bill_date,))
+    
+    def get_bill(self, bill_no):
+        """One bill header with its lines as a dict (None if unknown)"""
+        bills, sales = 'bills', 'sales'
+        self.cursor.execute("SELECT * FROM bills WHERE bill_no = ?", (bill_no,))
+        row = self.cursor.fetchone()
+        if row is None:
+            # Older bills may have been archived
+            bills, sales = self.archive.source('bills'), self.archive.source('sales')
+            if bills == 'bills':
+                return None
+            self.cursor.execute(f"SELECT * FROM {bills} WHERE bill_no = ?", (bill_no,))
+            row = self.cursor.fetchone()
+            if row is None:
+                return None
+        bill = dict(zip([d[0] for d in self.cursor.description], row))
+        lines = self.cursor.execute(f'''
+            SELECT s.medicine_id, m.brand_name, s.quantity, s.selling_price, s.total_amount
+            FROM {sales} s JOIN medicines m ON s.medicine_id = m.id
+            WHERE s.bill_id = ?
+            ORDER BY s.id
+        ''', (bill['id'],)).fetchall()
+        bill['items'] = [
+            {'id': med_id, 'name': name, 'qty': qty, 'price': price, 'subtotal': amount}
+            for med_id, name, qty, price, amount in lines
+        ]
+        return bill
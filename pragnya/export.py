@@ -0,0 +1,218 @@
+# ============================================================================
+# PRAGNYA PHARM - Streaming report export (Excel, CSV, Parquet)
+# ============================================================================
+# Reports are read from a SQL cursor in fixed-size chunks and written as
+# they arrive: xlsxwriter in constant_memory mode flushes each row to disk,
+# CSV goes straight to the file and Parquet gets one row group per chunk,
+# all with the schema declared in PARQUET_TYPES rather than one guessed from
+# the first chunk. Memory stays bounded by the chunk size whatever the table size, and no
+# DataFrame is ever built.
+#
+#   python -m pragnya.export sales stock --format xlsx -o report.xlsx
+import argparse
+import csv
+import io
+import sys
+from datetime import datetime, timedelta
+
+CHUNK_SIZE = 10000
+EXCEL_MAX_ROWS = 1048576  # rows per worksheet, header included
+FORMATS = ('xlsx', 'csv', 'parquet')
+
+# name -> (sheet title, query); queries may use :start and :end (YYYY-MM-DD),
+# and read {sales} / {bills} so archived periods can be unioned in
+REPORTS = {
+    'stock': ('Stock', '''
+        SELECT id AS "ID", brand_name AS "Brand Name", generic_name AS "Generic Name",
+               company AS "Company", batch_no AS "Batch", expiry_date AS "Expiry Date",
+               quantity AS "Qty", min_quantity AS "Min Qty", mrp AS "MRP",
+               purchase_price AS "Purchase Price", category AS "Category",
+               store_location AS "Location", barcode AS "Barcode"
+        FROM medicines
+        ORDER BY id
+    '''),
+    'sales': ('Sales', '''
+        SELECT s.sale_date AS "Date", s.bill_no AS "Bill No", m.brand_name AS "Medicine",
+               s.quantity AS "Qty", s.selling_price AS "Price", s.total_amount AS "Amount",
+               COALESCE(b.customer_name, s.customer_name) AS "Customer",
+               COALESCE(b.payment_mode, s.payment_mode) AS "Payment"
+        FROM {sales} s
+        LEFT JOIN {bills} b ON s.bill_id = b.id
+        LEFT JOIN medicines m ON s.medicine_id = m.id
+        WHERE s.sale_date BETWEEN :start AND :end
+        ORDER BY s.id
+    '''),
+    'bills': ('Bills', '''
+        SELECT bill_date AS "Date", bill_no AS "Bill No", customer_name AS "Customer",
+               customer_phone AS "Phone", doctor_name AS "Doctor", payment_mode AS "Payment",
+               item_count AS "Items", subtotal AS "Subtotal", discount_amount AS "Discount",
+               gst_amount AS "GST", total AS "Total"
+        FROM {bills}
+        WHERE bill_date BETWEEN :start AND :end
+        ORDER BY id
+    '''),
+    'alerts': ('Alerts', '''
+        SELECT a.created_date AS "Created", m.brand_name AS "Medicine",
+               a.alert_type AS "Type", a.severity AS "Severity", a.message AS "Message"
+        FROM alerts a
+        LEFT JOIN medicines m ON a.medicine_id = m.id
+        WHERE a.resolved = 0
+        ORDER BY a.id
+    '''),
+}
+
+# Parquet type of every numeric report column, by heading (the SQLite
+# declared type of its source column); all other columns are text
+PARQUET_TYPES = {
+    'ID': 'int64', 'Qty': 'int64', 'Min Qty': 'int64', 'Items': 'int64',
+    'MRP': 'float64', 'Purchase Price': 'float64', 'Price': 'float64', 'Amount': 'float64',
+    'Subtotal': 'float64', 'Discount': 'float64', 'GST': 'float64', 'Total': 'float64',
+}
+
+
+def iter_chunks(conn, report, start=None, end=None, chunk_size=CHUNK_SIZE, archive=None):
+    """Run a report; returns (column names, iterator of row lists)
+
+    With a SalesArchive, sales and bills include archived periods in range.
+    """
+    _, sql = REPORTS[report]
+    params = {'start': start or '0000-01-01', 'end': end or '9999-12-31'}
+    tables = {table: archive.source(table, start, end) if archive else table
+              for table in ('sales', 'bills')}
+    cursor = conn.execute(sql.format(**tables), params)
+    columns = [d[0] for d in cursor.description]
+
+    def chunks():
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+    return columns, chunks()
+
+
+def write_xlsx(conn, reports, out, start=None, end=None, chunk_size=CHUNK_SIZE, archive=None):
+    """Write one worksheet per report to `out` (path or binary file object)
+
+    Reports longer than Excel's row limit continue on "<Sheet> (2)", ...
+    Returns the number of data rows written.
+    """
+    import xlsxwriter
+
+    # Cell text is data: a customer named "=HYPERLINK(...)" stays text
+    workbook = xlsxwriter.Workbook(out, {'constant_memory': True,
+                                         'strings_to_urls': False,
+                                         'strings_to_formulas': False})
+    header_format = workbook.add_format({'bold': True, 'font_color': 'white',
+                                         'bg_color': '#0A5C36'})
+    total = 0
+    try:
+        for report in reports:
+            title = REPORTS[report][0]
+            columns, chunks = iter_chunks(conn, report, start, end, chunk_size, archive)
+            part, row_idx, sheet = 1, EXCEL_MAX_ROWS, None
+            for rows in chunks:
+                for row in rows:
+                    if row_idx >= EXCEL_MAX_ROWS:
+                        sheet = _add_sheet(workbook, title if part == 1 else f"{title} ({part})",
+                                           columns, header_format)
+                        part, row_idx = part + 1, 1
+                    sheet.write_row(row_idx, 0, row)
+                    row_idx += 1
+                total += len(rows)
+            if sheet is None:
+                _add_sheet(workbook, title, columns, header_format)
+    finally:
+        workbook.close()
+    return total
+
+
+def _add_sheet(workbook, name, columns, header_format):
+    sheet = workbook.add_worksheet(name)
+    for col, column in enumerate(columns):
+        sheet.set_column(col, col, max(10, len(column) + 2))
+    sheet.write_row(0, 0, columns, header_format)
+    sheet.freeze_panes(1, 0)
+    return sheet
+
+
+def write_csv(conn, report, out, start=None, end=None, chunk_size=CHUNK_SIZE, archive=None):
+    """Write a report as UTF-8 CSV (with BOM, so Excel detects the encoding)"""
+    columns, chunks = iter_chunks(conn, report, start, end, chunk_size, archive)
+    text = io.TextIOWrapper(out, encoding='utf-8-sig', newline='', write_through=True)
+    total = 0
+    try:
+        writer = csv.writer(text)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            total += len(rows)
+    finally:
+        text.flush()
+        text.detach()  # leave `out` open for the caller
+    return total
+
+
+def write_parquet(conn, report, out, start=None, end=None, chunk_size=CHUNK_SIZE, archive=None):
+    """Write a report as Parquet, one row group per chunk (needs pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from e
+
+    columns, chunks = iter_chunks(conn, report, start, end, chunk_size, archive)
+    schema = pa.schema([(name, getattr(pa, PARQUET_TYPES.get(name, 'string'))()) for name in columns])
+    total = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in chunks:
+            arrays = []
+            for col, field in zip(zip(*rows), schema):
+                try:
+                    arrays.append(pa.array(col, type=field.type))
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    raise ValueError(f"Column {field.name!r} of the {report} report is not "
+                                     f"{field.type}: {e}") from e
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            total += len(rows)
+    return total
+
+
+def export_reports(conn, reports, fmt, out, start=None, end=None, chunk_size=CHUNK_SIZE,
+                   archive=None):
+    """Export reports to `out`; CSV and Parquet take exactly one report"""
+    unknown = [r for r in reports if r not in REPORTS]
+    if unknown:
+        raise ValueError(f"Unknown report(s): {', '.join(unknown)}")
+    if fmt == 'xlsx':
+        return write_xlsx(conn, reports, out, start, end, chunk_size, archive)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {FORMATS})")
+    if len(reports) != 1:
+        raise ValueError(f"{fmt} export takes a single report")
+    writer = write_csv if fmt == 'csv' else write_parquet
+    return writer(conn, reports[0], out, start, end, chunk_size, archive)
+
+
+def main():
+    from pragnya.db import IndianPharmacyDB
+
+    parser = argparse.ArgumentParser(description='Stream pharmacy reports to a file')
+    parser.add_argument('reports', nargs='+', choices=sorted(REPORTS))
+    parser.add_argument('--db', default='pharmacy.db')
+    parser.add_argument('--format', choices=FORMATS, default='xlsx')
+    parser.add_argument('--start', default=(datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+    parser.add_argument('--end', default=datetime.now().strftime('%Y-%m-%d'))
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    db = IndianPharmacyDB(args.db)
+    with open(args.output, 'wb') as f:
+        rows = export_reports(db.conn, args.reports, args.format, f, args.start, args.end,
+                              archive=db.archive)
+    print(f"Wrote {rows} rows to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
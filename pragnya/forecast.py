@@ -0,0 +1,222 @@
+# ============================================================================
+# PRAGNYA PHARM - Demand Forecasting Engine
+# ============================================================================
+import json
+import math
+from datetime import datetime, timedelta
+
+from pragnya.suppliers import UNIT_COST, default_lead_time, safety_stock
+
+
+class DemandForecaster:
+    def __init__(self, db):
+        self.db = db
+    
+    def forecast_demand(self, medicine_id, months=3):
+        """Forecast demand based on historical sales"""
+        import pandas as pd
+        try:
+            # Get historical sales data
+            query = '''
+                SELECT date(sale_date) as date, SUM(quantity) as daily_sales
+                FROM sales 
+                WHERE medicine_id = ? 
+                AND sale_date >= date('now', '-90 days')
+                GROUP BY date(sale_date)
+                ORDER BY date(sale_date)
+            '''
+            sales_data = pd.read_sql_query(query, self.db.conn, params=(medicine_id,))
+            
+            if len(sales_data) < 7:
+                return self.simple_forecast(medicine_id, months)
+            
+            # Simple moving average forecast
+            sales_data['date'] = pd.to_datetime(sales_data['date'])
+            sales_data.set_index('date', inplace=True)
+            
+            # Calculate moving averages
+            weekly_avg = sales_data['daily_sales'].rolling(window=7).mean().iloc[-1]
+            monthly_avg = sales_data['daily_sales'].rolling(window=30).mean().iloc[-1]
+            
+            # Get medicine info
+            self.db.cursor.execute("SELECT brand_name, quantity, min_quantity FROM medicines WHERE id = ?", 
+                                 (medicine_id,))
+            brand, current_qty, min_qty = self.db.cursor.fetchone()
+            
+            # Calculate forecast
+            base_forecast = (weekly_avg + monthly_avg) / 2
+            if pd.isna(base_forecast):
+                base_forecast = current_qty * 0.3  # Fallback
+            
+            # Apply seasonal factors
+            seasonal_factor = self.get_seasonal_factor()
+            adjusted_forecast = base_forecast * seasonal_factor
+            
+            forecasts = []
+            for i in range(1, months + 1):
+                month_forecast = adjusted_forecast * 30 * (1 + (i * 0.05))  # 5% monthly growth
+                forecasts.append({
+                    'month': i,
+                    'month_name': (datetime.now() + timedelta(days=30*i)).strftime('%b'),
+                    'predicted_demand': int(month_forecast),
+                    'confidence': max(0.7, 1 - (i * 0.1)),
+                    'reorder_point': int(month_forecast * 0.3)  # 30% of monthly demand
+                })
+            
+            return {
+                'medicine': brand,
+                'current_stock': current_qty,
+                'min_stock': min_qty,
+                'weekly_avg': round(weekly_avg, 1) if not pd.isna(weekly_avg) else 0,
+                'monthly_avg': round(monthly_avg, 1) if not pd.isna(monthly_avg) else 0,
+                'forecasts': forecasts
+            }
+            
+        except Exception:
+            return self.simple_forecast(medicine_id, months)
+    
+    def simple_forecast(self, medicine_id, months):
+        """Simple forecast when historical data is insufficient"""
+        self.db.cursor.execute("SELECT brand_name, quantity, min_quantity FROM medicines WHERE id = ?", 
+                             (medicine_id,))
+        brand, current_qty, min_qty = self.db.cursor.fetchone()
+        
+        forecasts = []
+        for i in range(1, months + 1):
+            # Simple forecast based on current stock and category
+            self.db.cursor.execute("SELECT category FROM medicines WHERE id = ?", (medicine_id,))
+            category = self.db.cursor.fetchone()[0]
+            
+            # Category-based base demand
+            base_demand = {
+                'Analgesic': 30,
+                'Antibiotic': 25,
+                'Cardiac': 20,
+                'Diabetic': 35,
+                'GI': 28,
+                'Other': 15
+            }.get(category, 20)
+            
+            # Apply growth factor and seasonality
+            month_factor = 1 + (i * 0.05)  # 5% monthly growth
+            seasonal_factor = self.get_seasonal_factor()
+            predicted = int(base_demand * month_factor * seasonal_factor * 30)  # Monthly demand
+            
+            forecasts.append({
+                'month': i,
+                'month_name': (datetime.now() + timedelta(days=30*i)).strftime('%b'),
+                'predicted_demand': predicted,
+                'confidence': max(0.6, 1 - (i * 0.15)),
+                'reorder_point': int(predicted * 0.3)
+            })
+        
+        return {
+            'medicine': brand,
+            'current_stock': current_qty,
+            'min_stock': min_qty,
+            'weekly_avg': 'N/A',
+            'monthly_avg': 'N/A',
+            'forecasts': forecasts
+        }
+    
+    def get_seasonal_factor(self):
+        """Get seasonal adjustment factor"""
+        month = datetime.now().month
+        
+        # Indian seasonal factors - based on common disease patterns
+        seasonal_factors = {
+            1: 1.1,   # Jan - Winter illnesses
+            2: 1.0,
+            3: 1.0,
+            4: 1.2,   # Apr - Summer/Allergies
+            5: 1.3,   # May - Summer peak
+            6: 1.4,   # Jun - Monsoon onset
+            7: 1.5,   # Jul - Monsoon peak (high demand)
+            8: 1.4,   # Aug - Monsoon continues
+            9: 1.3,   # Sep - Post-monsoon
+            10: 1.1,  # Oct - Festive season
+            11: 1.0,  # Nov
+            12: 1.2   # Dec - Winter/Year-end
+        }
+        
+        return seasonal_factors.get(month, 1.0)
+    
+    def get_reorder_recommendations(self):
+        """Generate smart reorder recommendations
+        
+        Safety stock and lead-time demand come from the preferred
+        supplier's recorded lead times and the medicine's daily sales
+        variability over 30 days; costs use its purchase price.
+        """
+        import pandas as pd
+        query = f'''
+            SELECT m.id, m.brand_name, m.quantity, m.min_quantity, m.max_quantity,
+                   COALESCE(SUM(s.quantity), 0) as monthly_sales,
+                   ms.supplier_id, sup.name AS supplier, {UNIT_COST} AS unit_cost
+            FROM medicines m
+            LEFT JOIN sales s ON m.id = s.medicine_id 
+                AND s.sale_date >= date('now', '-30 days')
+            LEFT JOIN medicine_suppliers ms ON ms.medicine_id = m.id AND ms.preferred = 1
+            LEFT JOIN suppliers sup ON sup.id = ms.supplier_id
+            WHERE m.quantity <= m.min_quantity * 1.5  -- Include buffer
+            GROUP BY m.id
+            ORDER BY (m.min_quantity - m.quantity) DESC
+        '''
+        
+        low_stock_df = pd.read_sql_query(query, self.db.conn)
+        lead_times = self.db.suppliers.lead_time_stats()
+        demand_std = self.daily_demand_std(low_stock_df['id'].tolist())
+        
+        recommendations = []
+        for _, row in low_stock_df.iterrows():
+            forecast = self.forecast_demand(row['id'], 1)
+            
+            if forecast['forecasts']:
+                monthly_prediction = forecast['forecasts'][0]['predicted_demand']
+                
+                # Calculate optimal reorder quantity
+                lead = lead_times.get(row['supplier_id'], default_lead_time())
+                daily = monthly_prediction / 30
+                safety = safety_stock(daily, demand_std.get(row['id'], 0.0),
+                                      lead['mean_days'], lead['std_days'])
+                lead_time_demand = math.ceil(daily * lead['mean_days'])
+                optimal_reorder = max(
+                    row['max_quantity'] - row['quantity'],
+                    safety + lead_time_demand
+                )
+                
+                urgency = "HIGH" if row['quantity'] <= row['min_quantity'] * 0.5 else "MEDIUM"
+                
+                recommendations.append({
+                    'medicine': row['brand_name'],
+                    'current_stock': row['quantity'],
+                    'min_required': row['min_quantity'],
+                    'monthly_sales': int(row['monthly_sales']),
+                    'predicted_demand': monthly_prediction,
+                    'reorder_qty': optimal_reorder,
+                    'urgency': urgency,
+                    'supplier': row['supplier'],
+                    'lead_time_days': lead['mean_days'],
+                    'safety_stock': safety,
+                    'reorder_point': safety + lead_time_demand,
+                    'unit_cost': row['unit_cost'],
+                    'est_cost': optimal_reorder * row['unit_cost']
+                })
+        
+        return pd.DataFrame(recommendations) if recommendations else pd.DataFrame()
+    
+    def daily_demand_std(self, medicine_ids, days=30):
+        """{medicine_id: standard deviation of daily units sold over `days`}, in one query"""
+        if not medicine_ids:
+            return {}
+        rows = self.db.cursor.execute('''
+            SELECT medicine_id, SUM(units), SUM(units * units)
+            FROM (SELECT medicine_id, sale_date, SUM(quantity) AS units FROM sales
+                  WHERE sale_date >= date('now', ?)
+                    AND medicine_id IN (SELECT value FROM json_each(?))
+                  GROUP BY medicine_id, sale_date)
+            GROUP BY medicine_id
+        ''', (f'-{days} days', json.dumps([int(i) for i in medicine_ids]))).fetchall()
+        # Days without a sale count as zero
+        return {medicine_id: math.sqrt(max(sum_sq / days - (total / days) ** 2, 0.0))
+                for medicine_id, total, sum_sq in rows}
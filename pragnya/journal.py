@@ -0,0 +1,288 @@
+# ============================================================================
+# PRAGNYA PHARM - Offline-first bill journal
+# ============================================================================
+# A billing counter must never fail a bill because a long import or report
+# holds the SQLite write lock. Bills are first appended (and fsynced) to a
+# per-counter JSON-lines journal; JournalDrainer applies them to
+# sales/medicines in batches whenever the database is free.
+#
+# Replay is idempotent: every applied bill number is recorded in
+# `journal_applied` in the same transaction as its sales lines, so a crash
+# between commit and advancing the journal offset cannot double-count.
+# Bills that can never apply are marked 'rejected' there too, and only
+# written to the rejected file once their batch commits, so a batch retried
+# after a lock sets each one aside exactly once. The counter app lists them
+# for a re-apply (journaled again with 'retry') or an acknowledge.
+#
+# The journal is owned by one process (the counter app); appends and the
+# drainer's truncation share a lock. Its own file sequence only numbers
+# bills uniquely within that process: the app passes a BillNumberAllocator
+# so numbers come from `bill_sequences`, shared with the API and any other
+# app process. The allocator touches the database once per block, so only
+# a bill that starts a new block can wait on the write lock.
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from pragnya.db import IndianPharmacyDB
+
+logger = logging.getLogger(__name__)
+
+
+class BillJournal:
+    """Durable append-only log of bills taken at one counter"""
+
+    def __init__(self, directory='journal', counter='C1', allocator=None):
+        os.makedirs(directory, exist_ok=True)
+        self.counter = counter
+        self.allocator = allocator
+        self.path = os.path.join(directory, f'{counter}.jsonl')
+        self.offset_path = self.path + '.offset'
+        self.seq_path = self.path + '.seq'
+        self.rejected_path = os.path.join(directory, f'{counter}.rejected.jsonl')
+        self._lock = threading.Lock()
+        self._seq = self._load_seq()
+
+    def _load_seq(self):
+        seq = int(_read_text(self.seq_path) or 0)
+        for _, entry in self._entries(0):
+            seq = max(seq, entry.get('seq', 0))
+        return seq
+
+    def next_bill_no(self):
+        """Allocate the next (seq, bill number) for this counter
+
+        With an allocator the number comes from the database and seq is None;
+        without one no database is needed, but the number is only unique
+        within this process.
+        """
+        if self.allocator is not None:
+            return None, self.allocator.next(self.counter)
+        with self._lock:
+            self._seq += 1
+            return self._seq, f"BILL-{self.counter}-{datetime.now().strftime('%Y%m%d')}-{self._seq:06d}"
+
+    def append(self, bill):
+        """Durably append a bill and return its bill number
+
+        bill holds record_bill's keyword arguments ('items', 'customer_name',
+        'discount', ...). A bill number is allocated if none is given; with
+        an allocator that can raise sqlite3.OperationalError on a locked
+        database, and nothing is journaled.
+        """
+        bill = dict(bill)
+        if not bill.get('bill_no'):
+            seq, bill['bill_no'] = self.next_bill_no()
+            if seq is not None:
+                bill['seq'] = seq
+        # The UTC day, matching the CURRENT_DATE default of directly recorded
+        # sales, but fixed now so a late drain keeps the day the bill was taken
+        bill.setdefault('sale_date', datetime.now(timezone.utc).strftime('%Y-%m-%d'))
+        bill.setdefault('created', datetime.now().isoformat(timespec='seconds'))
+        line = json.dumps(bill, separators=(',', ':')) + '\n'
+
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        return bill['bill_no']
+
+    def read_pending(self, limit=50):
+        """Return up to `limit` unapplied (end_offset, bill) pairs"""
+        entries = []
+        for entry in self._entries(self.applied_offset()):
+            entries.append(entry)
+            if len(entries) >= limit:
+                break
+        return entries
+
+    def pending_count(self):
+        return sum(1 for _ in self._entries(self.applied_offset()))
+
+    def applied_offset(self):
+        return int(_read_text(self.offset_path) or 0)
+
+    def mark_applied(self, offset):
+        """Advance the applied offset; truncate the journal once fully drained"""
+        with self._lock:
+            if offset < os.path.getsize(self.path):
+                _write_text(self.offset_path, str(offset))
+                return
+            # Save the sequence and a zero offset before truncating: a crash
+            # in between replays the journal (skipped via journal_applied)
+            # rather than leaving an offset past the end of an empty file
+            _write_text(self.seq_path, str(self._seq))
+            _write_text(self.offset_path, '0')
+            with open(self.path, 'w', encoding='utf-8'):
+                pass
+
+    def reject(self, bill, reason):
+        """Set aside a bill that can never be applied, for manual follow-up
+
+        A bill already in the rejected file is not added twice.
+        """
+        with self._lock:
+            if any(e['bill'].get('bill_no') == bill.get('bill_no') for e in self.rejected()):
+                return
+            with open(self.rejected_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'reason': reason, 'bill': bill}) + '\n')
+
+    def rejected(self):
+        """Return the set-aside {'reason', 'bill'} entries, oldest first"""
+        text = _read_text(self.rejected_path)
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def acknowledge(self, bill_no):
+        """Drop a rejected bill from the list; returns its entry (or None)"""
+        with self._lock:
+            entries = self.rejected()
+            kept = [e for e in entries if e['bill'].get('bill_no') != bill_no]
+            if len(kept) == len(entries):
+                return None
+            _write_text(self.rejected_path, ''.join(json.dumps(e) + '\n' for e in kept))
+        return next(e for e in entries if e['bill'].get('bill_no') == bill_no)
+
+    def reapply(self, bill_no):
+        """Journal a rejected bill again (after fixing stock etc.) under its number"""
+        entry = self.acknowledge(bill_no)
+        if entry is None:
+            return None
+        return self.append(dict(entry['bill'], retry=True))
+
+    def _entries(self, offset):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # torn write from a crash mid-append; not durable
+                offset += len(raw)
+                yield offset, json.loads(raw)
+
+
+class JournalDrainer(threading.Thread):
+    """Background thread applying journaled bills to the database in batches"""
+
+    def __init__(self, journal, db_file='pharmacy.db', batch_size=50, interval=0.5,
+                 busy_timeout_ms=100):
+        super().__init__(name=f'journal-drainer-{journal.counter}', daemon=True)
+        self.journal = journal
+        self.db = IndianPharmacyDB(db_file)
+        # Give up quickly on a locked database and retry on the next cycle
+        self.db.conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self.batch_size = batch_size
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.applied = 0
+        self.contended = 0
+
+    def kick(self):
+        """Drain now instead of waiting for the next interval"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                drained = self.drain_once()
+            except Exception:
+                logger.exception("Bill journal drain failed")
+                drained = 0
+            if drained < self.batch_size:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def drain_once(self):
+        """Apply one batch; returns the number of journal entries consumed"""
+        entries = self.journal.read_pending(self.batch_size)
+        if not entries:
+            return 0
+
+        db = self.db
+        rejected = []
+        try:
+            db.cursor.execute("BEGIN IMMEDIATE")
+            for _, bill in entries:
+                self._apply(db, bill, rejected)
+            db.conn.commit()
+        except sqlite3.OperationalError as e:
+            if db.conn.in_transaction:
+                db.conn.rollback()
+            if 'locked' in str(e) or 'busy' in str(e):
+                self.contended += 1
+                return 0
+            raise
+
+        for bill, reason in rejected:
+            logger.error("Rejected journaled bill %s: %s", bill.get('bill_no'), reason)
+            self.journal.reject({k: v for k, v in bill.items() if k != 'retry'}, reason)
+        self.journal.mark_applied(entries[-1][0])
+        self.applied += len(entries)
+        return len(entries)
+
+    def _apply(self, db, bill, rejected):
+        bill_no = bill.get('bill_no')
+        done = db.cursor.execute("SELECT status FROM journal_applied WHERE bill_no = ?",
+                                 (bill_no,)).fetchone()
+        if done and bill.get('retry') and done[0] == 'rejected':
+            db.cursor.execute("DELETE FROM journal_applied WHERE bill_no = ?", (bill_no,))
+        elif done:
+            if done[0] == 'rejected':
+                # Crashed between commit and writing the rejected file
+                rejected.append((bill, 'rejected before a restart'))
+            return  # already applied (or set aside) before a crash/restart
+
+        # record_bill rolls back its own savepoint on failure. A locked
+        # database is retried with the whole batch; anything else is a bad
+        # bill, set aside so it cannot block the bills queued behind it.
+        try:
+            db.record_bill(bill_no, bill['items'], bill.get('customer_name'),
+                           bill.get('customer_phone'), bill.get('doctor_name'),
+                           bill.get('discount', 0), bill.get('gst_percent', 18),
+                           bill.get('payment_mode', 'Cash'), commit=False,
+                           check_stock=False, sale_date=bill.get('sale_date'))
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                raise
+            status = self._reject(bill, e, rejected)
+        except Exception as e:
+            status = self._reject(bill, e, rejected)
+        else:
+            status = 'applied'
+
+        db.cursor.execute("INSERT INTO journal_applied (bill_no, counter, status) VALUES (?, ?, ?)",
+                          (bill_no, self.journal.counter, status))
+
+    def _reject(self, bill, error, rejected):
+        """Queue a bad bill for the rejected file (written once the batch commits)"""
+        reason = str(error) if isinstance(error, ValueError) else f"{type(error).__name__}: {error}"
+        rejected.append((bill, reason))
+        return 'rejected'
+
+
+def _read_text(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ''
+
+
+def _write_text(path, text):
+    """Atomically replace a small state file"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
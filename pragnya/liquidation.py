@@ -0,0 +1,238 @@
+# ============================================================================
+# PRAGNYA PHARM - Near-expiry liquidation planner
+# ============================================================================
+# Works on the expiry risk engine's lots (pragnya.risk): every lot within
+# PLAN_HORIZON_DAYS of expiry (or past it) whose forecast leaves units
+# unsold gets an action, chosen for the whole catalogue at once with NumPy
+# column operations:
+#
+#   Transfer   move the unsold units to the store selling the most of that
+#              medicine, up to what it can sell before expiry on top of
+#              its own stock (one aggregate query per store, via ChainView)
+#   Discount   a clearance price on the unsold units; a discount adds
+#              ELASTICITY x discount of the current daily demand. The
+#              smallest of DISCOUNT_TIERS that clears them is kept, else
+#              the tier recovering the most
+#   Return     whatever neither clears goes back to the supplier for
+#              RETURN_CREDIT of purchase price, accepted from
+#              RETURN_WINDOW_DAYS before expiry until RETURN_GRACE_DAYS
+#              after it (`return_in_days` says when the window opens)
+#   Write-off  the rest
+#
+# A lot's action is the first of these that moves any units. Transfers
+# and discounts recover at MRP, returns at purchase price. The plan is
+# ranked by value at risk (expected unsold units x purchase price). Run
+# it daily with:
+#
+#     python -m pragnya.liquidation --db pharmacy.db [--stores stores.json] [--out plan.csv]
+import argparse
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+from pragnya.forecast import DemandForecaster
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('Transfer', 'Discount', 'Return', 'Write-off')
+
+PLAN_HORIZON_DAYS = 180
+DISCOUNT_TIERS = (0.10, 0.20, 0.30, 0.50)
+ELASTICITY = 3.0            # 10% off sells 30% more of the daily demand
+MIN_DISCOUNT_DAYS = 3
+RETURN_CREDIT = 0.5
+RETURN_WINDOW_DAYS = 90
+RETURN_GRACE_DAYS = 30
+TRANSIT_DAYS = 3            # a transfer loses this much shelf life on the way
+MIN_TRANSFER_SELL_DAYS = 14
+CHAIN_DEMAND_SECONDS = 600  # other stores' sales are re-read at most this often
+
+CHAIN_DEMAND_QUERY = '''
+    SELECT m.brand_name, SUM(m.quantity) AS stock,
+           COALESCE(SUM(d.week), 0) AS week, COALESCE(SUM(d.month), 0) AS month
+    FROM medicines m
+    LEFT JOIN (SELECT medicine_id,
+                      SUM(CASE WHEN sale_date >= ? THEN quantity ELSE 0 END) AS week,
+                      SUM(quantity) AS month
+               FROM sales WHERE sale_date >= ? AND medicine_id IS NOT NULL
+               GROUP BY medicine_id) d ON d.medicine_id = m.id
+    GROUP BY m.brand_name
+'''
+CHAIN_DEMAND_COLUMNS = ['brand_name', 'stock', 'week', 'month']
+
+PLAN_COLUMNS = ['action', 'brand_name', 'batch_no', 'expiry_date', 'days_left', 'quantity',
+                'expected_unsold', 'unsold_value', 'action_units', 'discount_pct', 'to_store',
+                'return_units', 'return_in_days', 'recovered_value', 'written_off_value', 'id']
+
+
+class LiquidationPlanner:
+    """Catalogue-wide liquidation plan, cached with the risk report it was built from"""
+
+    def __init__(self, engine, chain=None, home_store=None):
+        self.engine = engine
+        self.chain = chain
+        self.home_store = home_store
+        self._lock = threading.Lock()
+        self._demand = None
+        self._demand_time = 0.0
+        self._key = None
+        self._plan = None
+
+    def chain_demand(self):
+        """Other stores' stock and daily demand per medicine, re-read every CHAIN_DEMAND_SECONDS"""
+        if self.chain is None:
+            return None
+        if self._demand is None or time.monotonic() - self._demand_time > CHAIN_DEMAND_SECONDS:
+            self._demand = read_chain_demand(self.chain, self.home_store)
+            self._demand_time = time.monotonic()
+        return self._demand
+
+    def plan(self, db, settings=None):
+        """{'plan': DataFrame by value at risk, 'summary': per action, 'as_of'}
+
+        The plan is shared between callers: treat it as read-only.
+        """
+        report = self.engine.assess(db, settings)
+        with self._lock:
+            demand = self.chain_demand()
+            if self._key is None or self._key[0] is not report or self._key[1] is not demand:
+                self._plan = plan_liquidation(report['lots'], demand)
+                self._plan['as_of'] = report['as_of']
+                self._key = (report, demand)
+            return self._plan
+
+
+def read_chain_demand(chain, home_store=None, today=None):
+    """DataFrame store, brand_name, stock, daily for every store except `home_store`"""
+    today = today or date.today()
+    days = [(today - timedelta(days=n)).isoformat() for n in (7, 30)]
+    frame = chain.query(CHAIN_DEMAND_QUERY, days, CHAIN_DEMAND_COLUMNS)
+    frame = frame[frame['store'] != home_store]
+    seasonal = DemandForecaster(None).get_seasonal_factor()
+    frame = frame.assign(daily=(frame['week'] / 7 + frame['month'] / 30) / 2 * seasonal)
+    return frame[['store', 'brand_name', 'stock', 'daily']].reset_index(drop=True)
+
+
+def plan_liquidation(lots, demand=None):
+    """Uncached plan for the risk engine's `lots` frame (see the module header)"""
+    import numpy as np
+    import pandas as pd
+
+    near = (lots['expected_unsold'] > 0) & (lots['days_left'] <= PLAN_HORIZON_DAYS)
+    lots = lots[near].reset_index(drop=True)
+    n = len(lots)
+    days = lots['days_left'].to_numpy(float)
+    unsold = lots['expected_unsold'].to_numpy(float)
+    daily = lots['daily_demand'].to_numpy(float)
+    cost = lots['purchase_price'].to_numpy(float)
+    mrp = lots['mrp'].to_numpy(float)
+    price = np.where(mrp > 0, mrp, cost)
+
+    # Discount: one tier per lot, from a (tiers x lots) matrix
+    tiers = np.array(DISCOUNT_TIERS)[:, None]
+    selling = np.where(days >= MIN_DISCOUNT_DAYS, days, 0.0)
+    cleared = np.minimum(unsold, np.floor(daily * ELASTICITY * tiers * selling + 1e-9))
+    takings = cleared * price * (1 - tiers)
+    clears = cleared >= unsold
+    best = np.where(clears.any(axis=0), clears.argmax(axis=0), takings.argmax(axis=0)) if n \
+        else np.zeros(0, dtype=int)
+    discount_units = cleared[best, np.arange(n)]
+    discount_value = takings[best, np.arange(n)]
+    discount_pct = np.array(DISCOUNT_TIERS)[best] * 100
+
+    # Transfer: each medicine goes to the other store selling most of it.
+    # Lots of one medicine share that store's spare demand, soonest expiry first.
+    transfer_units = np.zeros(n)
+    to_store = np.full(n, None, dtype=object)
+    if demand is not None and len(demand) and n:
+        targets = demand[demand['daily'] > 0]
+        targets = targets.loc[targets.groupby('brand_name')['daily'].idxmax()].set_index('brand_name')
+        target = targets.reindex(lots['brand_name'])
+        t_daily = target['daily'].fillna(0).to_numpy(float)
+        t_stock = target['stock'].fillna(0).to_numpy(float)
+        window = days - TRANSIT_DAYS
+        eligible = (window >= MIN_TRANSFER_SELL_DAYS) & (t_daily > 0)
+        spare = np.where(eligible, np.floor(t_daily * window - t_stock), 0.0)
+        order = lots.assign(days=days).sort_values(['brand_name', 'days'], kind='stable').index.to_numpy()
+        asked = pd.Series(np.where(eligible, unsold, 0.0)[order])
+        before = (asked.groupby(lots['brand_name'].to_numpy()[order]).cumsum() - asked).to_numpy()
+        transfer_units[order] = np.clip(spare[order] - before, 0, unsold[order])
+        to_store = np.where(transfer_units > 0, target['store'].to_numpy(object), None)
+    transfer_value = transfer_units * price
+
+    # The better of transfer and discount first; what is left goes back to
+    # the supplier once the return window opens, else it is written off
+    primary = np.where(transfer_value >= discount_value, 0, 1)
+    primary_units = np.where(primary == 0, transfer_units, discount_units)
+    primary_value = np.where(primary == 0, transfer_value, discount_value)
+    left = unsold - primary_units
+    returnable = days >= -RETURN_GRACE_DAYS
+    return_units = np.where(returnable, left, 0.0)
+    residual = left - return_units
+    choice = np.where(primary_units > 0, primary, np.where(return_units > 0, 2, 3))
+    return_in = np.where(return_units > 0, np.clip(days - RETURN_WINDOW_DAYS, 0, None), 0)
+
+    plan = pd.DataFrame({
+        'action': np.array(ACTIONS, dtype=object)[choice],
+        'brand_name': lots['brand_name'], 'batch_no': lots['batch_no'],
+        'expiry_date': lots['expiry_date'], 'days_left': lots['days_left'],
+        'quantity': lots['quantity'], 'expected_unsold': lots['expected_unsold'],
+        'unsold_value': lots['unsold_value'], 'action_units': primary_units.astype(np.int64),
+        'discount_pct': np.where(choice == 1, discount_pct, 0.0),
+        'to_store': np.where(choice == 0, to_store, None),
+        'return_units': return_units.astype(np.int64), 'return_in_days': return_in.astype(np.int64),
+        'recovered_value': (primary_value + return_units * cost * RETURN_CREDIT).round(2),
+        'written_off_value': (residual * cost).round(2), 'id': lots['id'],
+    }, columns=PLAN_COLUMNS)
+    plan = plan.sort_values('unsold_value', ascending=False, kind='stable', ignore_index=True)
+
+    summary = {}
+    for name in ACTIONS:
+        rows = plan[plan['action'] == name]
+        summary[name] = {'lots': len(rows), 'units': int(rows['expected_unsold'].sum()),
+                         'unsold_value': round(float(rows['unsold_value'].sum()), 2),
+                         'recovered_value': round(float(rows['recovered_value'].sum()), 2),
+                         'written_off_value': round(float(rows['written_off_value'].sum()), 2)}
+    return {'plan': plan, 'summary': summary}
+
+
+def main():
+    from pragnya.db import IndianPharmacyDB
+    from pragnya.risk import ExpiryRiskEngine
+    from pragnya.stores import ChainView, load_stores
+
+    parser = argparse.ArgumentParser(description='Plan discounts, returns and transfers for near-expiry stock')
+    parser.add_argument('--db', default='pharmacy.db')
+    parser.add_argument('--stores', help='stores.json, to suggest transfers to other stores')
+    parser.add_argument('--store', help="this database's store code in the registry")
+    parser.add_argument('--out', help='write the full plan to this CSV')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    db = IndianPharmacyDB(args.db)
+    chain = ChainView(load_stores(args.stores)) if args.stores else None
+    try:
+        result = LiquidationPlanner(ExpiryRiskEngine(), chain, args.store).plan(db)
+    finally:
+        db.conn.close()
+        if chain is not None:
+            chain.close()
+    plan = result['plan']
+    print(f"{len(plan):,} lots with stock left at expiry, planned in {time.perf_counter() - t0:.2f} s")
+    for name, totals in result['summary'].items():
+        print(f"  {name:<10}{totals['lots']:>7} lots {totals['units']:>9} units  "
+              f"at risk {totals['unsold_value']:>13,.0f}  recovered {totals['recovered_value']:>13,.0f}  "
+              f"written off {totals['written_off_value']:>13,.0f}")
+    if args.top:
+        print(plan.head(args.top)[['action', 'brand_name', 'batch_no', 'days_left', 'expected_unsold',
+                                   'action_units', 'discount_pct', 'to_store', 'return_units',
+                                   'unsold_value', 'recovered_value']].to_string(index=False))
+    if args.out:
+        plan.to_csv(args.out, index=False)
+        print(f"Plan written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
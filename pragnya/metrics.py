@@ -0,0 +1,379 @@
+# ============================================================================
+# PRAGNYA PHARM - Operational metrics (Prometheus text format)
+# ============================================================================
+# A small in-process registry of counters, gauges and histograms, rendered
+# in the Prometheus exposition format (text, version 0.0.4). Stdlib only;
+# the metric objects follow prometheus_client's shape (labels(), inc(),
+# observe()) so a later switch is mechanical.
+#
+# Event metrics are fed by the code paths themselves:
+#   pragnya_bills_total{result}               record_bill, recorded / rejected
+#   pragnya_bill_seconds                      record_bill latency (recorded bills)
+#   pragnya_bill_lines_total                  sales lines written by bills
+#   pragnya_imports_total{type,result}        process_excel_upload calls
+#   pragnya_import_rows_total{type}           rows read from uploaded sheets
+#   pragnya_import_seconds{type}              upload processing time
+#   pragnya_alerts_created_total{type,severity}
+#   pragnya_alerts_resolved_total{mode}       manual (page) / auto (condition cleared)
+#   pragnya_cache_lookups_total{cache,result} barcode and chatbot answer caches
+#   pragnya_emails_total{result}              outbox sender: sent / retry / failed
+#   pragnya_email_batch_seconds               one outbox batch over SMTP
+#   pragnya_smtp_connections_total            SMTP connections the sender opened
+#
+# State is read when the endpoint is scraped, by collectors:
+#   DatabaseCollector  reorder queue and outbox depth, open alerts, DB/WAL size
+#   query stats        statements and time from pragnya.querylog.STATS
+#
+# Metrics are per process: the Streamlit app (PRAGNYA_METRICS_PORT), the
+# POS API (GET /metrics) and this exporter each serve their own. Run a
+# standalone exporter for a store's database with:
+#
+#     python -m pragnya.metrics --db pharmacy.db --port 9464 [--once]
+import argparse
+import bisect
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from pragnya.querylog import STATS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+IMPORT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name):
+        return [(name, (), self.value)]
+
+
+class _Buckets:
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        rows = []
+        seen = 0
+        for bound, n in zip(self.bounds + (float('inf'),), counts):
+            seen += n
+            rows.append((name + '_bucket', (('le', _format_value(bound)),), seen))
+        rows.append((name + '_sum', (), total))
+        rows.append((name + '_count', (), count))
+        return rows
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._child()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _child(self):
+        return _Value()
+
+    def labels(self, *values):
+        """The child for one combination of label values (created on first use)"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def samples(self):
+        """(sample name, ((label, value), ...), value) rows"""
+        rows = []
+        for key, child in sorted(self._children.items()):
+            labels = tuple(zip(self.labelnames, key))
+            rows += [(name, labels + extra, value) for name, extra, value in child.samples(self.name)]
+        return rows
+
+
+class Counter(_Metric):
+    """Monotonic count; rate() of it in PromQL gives per-second throughput"""
+    kind = 'counter'
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+    kind = 'gauge'
+
+    def set(self, value):
+        self._children[()].set(value)
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets, with their sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+
+class Registry:
+    """Metrics and scrape-time collectors of one process"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def set_collector(self, key, collect):
+        """Add (or replace) a callable returning (name, kind, help, [(labels, value)]) families"""
+        with self._lock:
+            self._collectors[key] = collect
+
+    def remove_collector(self, key):
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for key, collect in collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", key, e)
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+BILLS = Counter('pragnya_bills_total', 'Bills passed to record_bill, by result',
+                ['result'])
+BILL_SECONDS = Histogram('pragnya_bill_seconds',
+                         'Time to record a bill (header, lines, stock) including its commit')
+BILL_LINES = Counter('pragnya_bill_lines_total', 'Sales lines written by recorded bills')
+IMPORTS = Counter('pragnya_imports_total', 'Excel uploads processed, by type and result',
+                  ['type', 'result'])
+IMPORT_ROWS = Counter('pragnya_import_rows_total', 'Rows read from uploaded sheets', ['type'])
+IMPORT_SECONDS = Histogram('pragnya_import_seconds', 'Time to process one uploaded sheet',
+                           ['type'], buckets=IMPORT_BUCKETS)
+ALERTS_CREATED = Counter('pragnya_alerts_created_total', 'Alerts raised, by type and severity',
+                         ['type', 'severity'])
+ALERTS_RESOLVED = Counter('pragnya_alerts_resolved_total',
+                          'Alerts resolved, by hand or automatically when their condition cleared',
+                          ['mode'])
+CACHE_LOOKUPS = Counter('pragnya_cache_lookups_total', 'Cache lookups, by cache and hit/miss',
+                        ['cache', 'result'])
+EMAILS = Counter('pragnya_emails_total', 'Outbox messages handled by the sender, by result',
+                 ['result'])
+EMAIL_BATCH_SECONDS = Histogram('pragnya_email_batch_seconds', 'Time to send one outbox batch over SMTP')
+SMTP_CONNECTIONS = Counter('pragnya_smtp_connections_total', 'SMTP connections opened by the outbox sender')
+PROCESS_START = Gauge('pragnya_process_start_time_seconds', 'Start time of this process (unix)')
+PROCESS_START.set(round(time.time(), 3))
+
+
+def _query_stats():
+    calls, total_ms = STATS.totals()
+    return [
+        ('pragnya_db_statements_total', 'counter',
+         'Statements recorded by the query instrumentation', [({}, calls)]),
+        ('pragnya_db_statement_seconds_total', 'counter',
+         'Time spent in recorded statements', [({}, round(total_ms / 1000, 6))]),
+    ]
+
+
+REGISTRY.set_collector('query_stats', _query_stats)
+
+
+class DatabaseCollector:
+    """Scrape-time gauges of one store database: queues, open alerts and file sizes
+
+    Each scrape opens its own short read-only connection, so it never
+    waits on the app's connection and its reads stay out of the query stats.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+
+    def __call__(self):
+        families = [('pragnya_db_size_bytes', 'gauge', 'Size of the database file and its WAL',
+                     [({'file': 'db'}, _size(self.db_file)),
+                      ({'file': 'wal'}, _size(self.db_file + '-wal'))])]
+        if not os.path.exists(self.db_file):
+            return families
+        conn = sqlite3.connect(f'file:{self.db_file}?mode=ro', uri=True, timeout=1.0)
+        try:
+            pending, units = conn.execute('''
+                SELECT COUNT(*), COALESCE(SUM(quantity), 0) FROM reorder_queue
+                WHERE status = 'Pending'
+            ''').fetchone()
+            alerts = conn.execute('''
+                SELECT severity, COUNT(*) FROM alerts WHERE resolved = 0 GROUP BY severity
+            ''').fetchall()
+            outbox = conn.execute('''
+                SELECT status, COUNT(*) FROM outbox WHERE status != 'Sent' GROUP BY status
+            ''').fetchall()
+        finally:
+            conn.close()
+        families += [
+            ('pragnya_reorder_queue_pending', 'gauge', 'Pending entries in reorder_queue',
+             [({}, pending)]),
+            ('pragnya_reorder_queue_pending_units', 'gauge',
+             'Units requested by pending reorder_queue entries', [({}, units)]),
+            ('pragnya_alerts_open', 'gauge', 'Unresolved alerts, by severity',
+             [({'severity': severity or ''}, count) for severity, count in alerts]),
+            ('pragnya_outbox_messages', 'gauge', 'Outbox messages not yet sent, by status',
+             [({'status': status}, count) for status, count in outbox]),
+        ]
+        return families
+
+
+def _size(path):
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def watch_database(db_file, registry=None):
+    """Report db_file's queue, alert and size gauges on every scrape"""
+    (REGISTRY if registry is None else registry).set_collector('database', DatabaseCollector(db_file))
+
+
+def start_http_server(port, host='127.0.0.1', registry=None):
+    """Serve GET /metrics from a daemon thread; returns the server (server_address has the port)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = REGISTRY if registry is None else registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            data = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics %s - %s", self.address_string(), format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='pragnya-metrics', daemon=True).start()
+    logger.info("Metrics on http://%s:%d/metrics", *server.server_address[:2])
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prometheus exporter for a Pragnya Pharm database')
+    parser.add_argument('--db', default='pharmacy.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9464)
+    parser.add_argument('--once', action='store_true', help='print one scrape and exit')
+    args = parser.parse_args()
+
+    watch_database(args.db)
+    if args.once:
+        print(REGISTRY.render(), end='')
+        return
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    server = start_http_server(args.port, args.host)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
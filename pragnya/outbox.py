@@ -0,0 +1,291 @@
+# ============================================================================
+# PRAGNYA PHARM - Mail outbox and background SMTP sender
+# ============================================================================
+# Pages never talk to an SMTP server. MailOutbox.enqueue() is one INSERT
+# into `outbox`; OutboxSender, a background thread with its own database
+# connection, sends what is due:
+#
+#   - a batch is up to `batch_size` due messages ordered by recipient, so
+#     each supplier's messages go out back to back
+#   - every batch reuses one SMTP connection, kept open between batches
+#     and closed after SMTP_IDLE_SECONDS without work
+#   - a temporary failure (4xx reply, dropped connection, timeout) puts
+#     the message back with exponential backoff (BACKOFF_SECONDS doubling
+#     up to BACKOFF_MAX_SECONDS). Permanent 5xx replies, or MAX_ATTEMPTS
+#     tries, mark it Failed. While the server is unreachable the sender
+#     itself backs off the same way.
+#
+# Delivery is at least once. A crash between the SMTP DATA reply and the
+# commit that marks the batch Sent resends those messages. Their
+# Message-ID is derived from the outbox id, so a resend carries the same
+# ID. Only a crash opens that window: the sender fetches with a short
+# busy timeout (a locked database just skips a cycle), but once messages
+# are delivered it waits as long as it takes to record them rather than
+# leave them Pending to be sent again. enqueue()'s `dedupe_key` (unique)
+# keeps a double-clicked button from queuing a message twice.
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from pragnya.metrics import EMAIL_BATCH_SECONDS, EMAILS, SMTP_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_STATUSES = ('Pending', 'Sent', 'Failed')
+MAX_ATTEMPTS = 6
+BACKOFF_SECONDS = 30.0
+BACKOFF_MAX_SECONDS = 3600.0
+SMTP_IDLE_SECONDS = 60.0
+
+_SENT = EMAILS.labels('sent')
+_RETRY = EMAILS.labels('retry')
+_FAILED = EMAILS.labels('failed')
+
+
+def backoff(attempts, base=BACKOFF_SECONDS, cap=BACKOFF_MAX_SECONDS):
+    """Seconds to wait after `attempts` failures: doubling, capped, with jitter"""
+    return min(cap, base * 2 ** max(attempts - 1, 0)) * random.uniform(0.8, 1.0)
+
+
+class MailOutbox:
+    """Queue of outgoing mail in one database; see OutboxSender for delivery"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def enqueue(self, recipient, subject, body, kind='general', supplier_id=None, dedupe_key=None,
+                commit=True):
+        """Queue one message; returns its id, or None if `dedupe_key` was already queued"""
+        if not recipient:
+            raise ValueError("no recipient address")
+        self.db.cursor.execute('''
+            INSERT OR IGNORE INTO outbox (kind, recipient, supplier_id, subject, body, dedupe_key)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (kind, recipient, supplier_id, subject, body, dedupe_key))
+        message_id = self.db.cursor.lastrowid if self.db.cursor.rowcount else None
+        if commit:
+            self.db.conn.commit()
+        return message_id
+
+    def counts(self):
+        """{status: messages} for every status"""
+        counts = dict.fromkeys(OUTBOX_STATUSES, 0)
+        counts.update(self.db.cursor.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return counts
+
+    def recent(self, limit=50, status=None):
+        """Newest messages without their bodies"""
+        import pandas as pd
+
+        where = "WHERE status = ?" if status else ""
+        return pd.read_sql_query(f'''
+            SELECT id, kind, recipient, subject, status, attempts, last_error, created_date, sent_date
+            FROM outbox {where} ORDER BY id DESC LIMIT ?
+        ''', self.db.conn, params=([status] if status else []) + [limit])
+
+    def retry_failed(self):
+        """Put Failed messages back in the queue; returns how many"""
+        self.db.cursor.execute('''
+            UPDATE outbox SET status = 'Pending', attempts = 0, next_attempt = 0
+            WHERE status = 'Failed'
+        ''')
+        self.db.conn.commit()
+        return self.db.cursor.rowcount
+
+
+class OutboxSender(threading.Thread):
+    """Background thread sending due outbox messages in batches over one SMTP connection"""
+
+    def __init__(self, db_file, host, port=25, sender='pharmacy@localhost', user=None, password=None,
+                 starttls=False, batch_size=100, interval=1.0, timeout=10.0, backoff_seconds=BACKOFF_SECONDS,
+                 busy_timeout_ms=100, record_timeout_ms=30000):
+        from pragnya.db import IndianPharmacyDB
+
+        super().__init__(name='outbox-sender', daemon=True)
+        self.db = IndianPharmacyDB(db_file)
+        # Give up quickly on a locked database and retry on the next cycle;
+        # recording a delivered batch waits up to `record_timeout_ms` a try
+        self.busy_timeout_ms, self.record_timeout_ms = int(busy_timeout_ms), int(record_timeout_ms)
+        self.db.conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        self.host, self.port, self.sender = host, int(port), sender
+        self.user, self.password, self.starttls = user, password, starttls
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.backoff_seconds = backoff_seconds
+        self._smtp = None
+        self._last_used = 0.0
+        self._down_until = 0.0
+        self._outages = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0, 'connections': 0,
+                      'busy_seconds': 0.0}
+
+    def kick(self):
+        """Send now instead of waiting for the next interval"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+        self._close()
+
+    def throughput(self):
+        """Messages sent per second of sending time so far"""
+        busy = self.stats['busy_seconds']
+        return self.stats['sent'] / busy if busy else 0.0
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                sent = self.send_once()
+            except Exception:
+                logger.exception("Outbox send failed")
+                sent = 0
+            if sent < self.batch_size:
+                if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+                    self._close()
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    # ---------------------------------------------------------------- SMTP
+    def _connection(self):
+        import smtplib
+
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    smtp.starttls()
+                if self.user:
+                    smtp.login(self.user, self.password or '')
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.stats['connections'] += 1
+            SMTP_CONNECTIONS.inc()
+        return self._smtp
+
+    def _close(self):
+        import smtplib
+
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+    def _message(self, message_id, recipient, subject, body):
+        # MIMEText (compat32) renders several times faster than EmailMessage
+        from email.mime.text import MIMEText
+        from email.utils import formatdate
+
+        message = MIMEText(body or '', 'plain', 'utf-8')
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Subject'] = subject
+        message['Date'] = formatdate(localtime=True)
+        message['Message-ID'] = f"<outbox-{message_id}@{self.sender.rpartition('@')[2] or 'localhost'}>"
+        return message.as_bytes()
+
+    # --------------------------------------------------------------- batch
+    def send_once(self):
+        """Send one batch of due messages; returns how many were sent"""
+        import smtplib
+
+        now = time.time()
+        if now < self._down_until:
+            return 0
+        rows = self.db.cursor.execute('''
+            SELECT id, recipient, subject, body, attempts FROM outbox
+            WHERE status = 'Pending' AND next_attempt <= ?
+            ORDER BY recipient, id LIMIT ?
+        ''', (now, self.batch_size)).fetchall()
+        if not rows:
+            return 0
+
+        t0 = time.perf_counter()
+        sent, retry, failed = [], [], []
+        for message_id, recipient, subject, body, attempts in rows:
+            try:
+                self._connection().sendmail(self.sender, [recipient],
+                                            self._message(message_id, recipient, subject, body))
+                sent.append(message_id)
+                self._outages = 0
+            except smtplib.SMTPRecipientsRefused as e:
+                codes = [code for code, _ in e.recipients.values()]
+                (failed if min(codes) >= 500 else retry).append((message_id, attempts, str(e.recipients)))
+            except smtplib.SMTPResponseException as e:
+                error = f"{e.smtp_code} {e.smtp_error!r}"
+                if e.smtp_code == 421:  # the server is closing the connection
+                    self._close()
+                (failed if e.smtp_code >= 500 else retry).append((message_id, attempts, error))
+                if e.smtp_code == 421:
+                    break
+            except (smtplib.SMTPException, OSError) as e:
+                # Connection-level trouble: this message waits, the sender backs off
+                self._close()
+                retry.append((message_id, attempts, f"{type(e).__name__}: {e}"))
+                self._outages += 1
+                self._down_until = time.time() + backoff(self._outages, self.backoff_seconds)
+                logger.warning("SMTP %s:%s unavailable (%s); retrying in %.0f s", self.host, self.port, e,
+                               self._down_until - time.time())
+                break
+        self._last_used = time.monotonic()
+        self._record(sent, retry, failed)
+        elapsed = time.perf_counter() - t0
+        EMAIL_BATCH_SECONDS.observe(elapsed)
+        self.stats['busy_seconds'] += elapsed
+        self.stats['batches'] += 1
+        return len(sent)
+
+    def _record(self, sent, retry, failed):
+        retry_rows, now = [], time.time()
+        for message_id, attempts, error in retry:
+            if attempts + 1 >= MAX_ATTEMPTS:
+                failed.append((message_id, attempts, error))
+            else:
+                retry_rows.append((now + backoff(attempts + 1, self.backoff_seconds), error, message_id))
+        conn = self.db.conn
+        # The batch has been delivered: if this commit gave up on a lock the
+        # messages would stay Pending and go out again, so keep trying
+        conn.execute(f"PRAGMA busy_timeout={self.record_timeout_ms}")
+        try:
+            while True:
+                try:
+                    self._write_outcome(sent, retry_rows, failed)
+                    break
+                except sqlite3.OperationalError as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    if 'locked' not in str(e) and 'busy' not in str(e):
+                        raise
+                    logger.warning("Outbox database still locked; retrying to record %d sent messages",
+                                   len(sent))
+        finally:
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        self.stats['sent'] += len(sent)
+        self.stats['retried'] += len(retry_rows)
+        self.stats['failed'] += len(failed)
+        _SENT.inc(len(sent))
+        _RETRY.inc(len(retry_rows))
+        _FAILED.inc(len(failed))
+        if failed:
+            logger.error("%d outbox messages failed, e.g. %s: %s", len(failed), failed[0][0], failed[0][2])
+
+    def _write_outcome(self, sent, retry_rows, failed):
+        conn = self.db.conn
+        conn.executemany("UPDATE outbox SET status = 'Sent', attempts = attempts + 1, "
+                         "sent_date = CURRENT_TIMESTAMP, last_error = NULL WHERE id = ?",
+                         [(message_id,) for message_id in sent])
+        conn.executemany("UPDATE outbox SET attempts = attempts + 1, next_attempt = ?, last_error = ? "
+                         "WHERE id = ?", retry_rows)
+        conn.executemany("UPDATE outbox SET status = 'Failed', attempts = attempts + 1, last_error = ? "
+                         "WHERE id = ?", [(error, message_id) for message_id, _, error in failed])
+        conn.commit()
@@ -0,0 +1,53 @@
+# ============================================================================
+# PRAGNYA PHARM - Connection Pool
+# ============================================================================
+# A fixed set of IndianPharmacyDB handles shared by worker threads. SQLite
+# connections are cheap but not free (schema check, page cache warm-up), so
+# long-running services borrow one per operation instead of opening a new
+# connection per request.
+import queue
+from contextlib import contextmanager
+
+from pragnya.barcode import BarcodeIndex
+from pragnya.db import IndianPharmacyDB
+
+
+class ConnectionPool:
+    """Fixed-size pool of IndianPharmacyDB handles on one database file"""
+
+    def __init__(self, db_file='pharmacy.db', size=4, busy_timeout_ms=5000, wal=True):
+        self.db_file = db_file
+        self.size = size
+        self._idle = queue.LifoQueue()
+        # One barcode map for the whole pool, so an edit on any handle
+        # invalidates the entry every other handle would serve
+        self.barcodes = BarcodeIndex()
+        for _ in range(size):
+            db = IndianPharmacyDB(db_file)
+            db.barcodes = self.barcodes
+            if wal:
+                # Readers no longer block the writer (and vice versa)
+                db.conn.execute("PRAGMA journal_mode=WAL")
+                db.conn.execute("PRAGMA synchronous=NORMAL")
+            db.conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            self._idle.put(db)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a database handle; it is rolled back and returned on exit"""
+        db = self._idle.get(timeout=timeout)
+        try:
+            yield db
+        finally:
+            if db.conn.in_transaction:
+                db.conn.rollback()
+            self._idle.put(db)
+
+    def close(self):
+        """Close every idle handle"""
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            db.conn.close()
@@ -0,0 +1,191 @@
+# ============================================================================
+# PRAGNYA PHARM - Render profiling
+# ============================================================================
+# A RenderProfile times one run of the app script as nested sections
+# (setup, sidebar, the page, and the parts of the page between its
+# headings). Each section records its wall time, the database statements
+# it ran (from querylog's per-thread totals) and the elements and widgets
+# the front end counted into it. Sections are inclusive: a parent's
+# numbers contain its children's.
+#
+# With cprofile=True the run is also profiled function by function.
+# save() writes the run to disk:
+#   <stamp>-<page>.trace.json  sections as Chrome trace events, for
+#                              chrome://tracing, Perfetto or speedscope
+#   <stamp>-<page>.prof        the cProfile stats (python -m pstats, snakeviz)
+#
+# Nothing here imports streamlit. The app counts elements and marks
+# headings through RenderProfile.current(), the profile that is running
+# on the calling thread.
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from pragnya.querylog import STATS
+
+_active = threading.local()
+
+
+class _Section:
+    __slots__ = ('name', 'depth', 'implicit', 'start', 'ms', 'queries', 'query_ms',
+                 'elements', 'widgets', '_open')
+
+    def __init__(self, name, depth, implicit, profile):
+        self.name = name
+        self.depth = depth
+        self.implicit = implicit
+        self.start = time.perf_counter()
+        calls, ms = STATS.thread_totals()
+        self._open = (calls, ms, profile.elements, profile.widgets)
+        self.ms = self.queries = self.query_ms = self.elements = self.widgets = 0
+
+    def close(self, profile):
+        self.ms = (time.perf_counter() - self.start) * 1000
+        calls, ms = STATS.thread_totals()
+        calls0, ms0, elements0, widgets0 = self._open
+        self.queries = calls - calls0
+        self.query_ms = ms - ms0
+        self.elements = profile.elements - elements0
+        self.widgets = profile.widgets - widgets0
+
+
+class RenderProfile:
+    """Timed sections, query and element counts (and optionally cProfile) for one render"""
+
+    def __init__(self, name='render', cprofile=False):
+        self.name = name
+        self.sections = []
+        self.elements = 0
+        self.widgets = 0
+        self.saved = []
+        self._stack = []
+        self._profiler = None
+        self._cprofile = cprofile
+        self._forcing = False
+        self.started = None
+
+    @staticmethod
+    def current():
+        """The profile running on this thread, or None"""
+        return getattr(_active, 'profile', None)
+
+    def start(self):
+        # Query counts come from the instrumented cursor: count this
+        # thread's statements even if stats are off, without touching the
+        # process-wide switch other sessions' renders share
+        STATS.force()
+        self._forcing = True
+        self.started = time.time()
+        self._root = _Section(self.name, 0, False, self)
+        self._stack = [self._root]
+        _active.profile = self
+        if self._cprofile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+        while self._stack:
+            self._close_top()
+        _active.profile = None
+        if self._forcing:
+            STATS.force(False)
+            self._forcing = False
+        return self
+
+    def _close_top(self):
+        section = self._stack.pop()
+        section.close(self)
+        if section is self._root:
+            self.sections.insert(0, section)
+
+    @contextmanager
+    def section(self, name):
+        """Time the enclosed block as a child of the innermost open section"""
+        self._end_implicit()
+        section = _Section(name, len(self._stack), False, self)
+        self.sections.append(section)
+        self._stack.append(section)
+        try:
+            yield section
+        finally:
+            self._end_implicit()
+            if self._stack and self._stack[-1] is section:
+                self._close_top()
+
+    def mark(self, name):
+        """Start a sub-section (e.g. at a heading) that runs until the next mark or its parent ends"""
+        self._end_implicit()
+        section = _Section(name, len(self._stack), True, self)
+        self.sections.append(section)
+        self._stack.append(section)
+
+    def _end_implicit(self):
+        if self._stack and self._stack[-1].implicit:
+            self._close_top()
+
+    def count(self, widget=False):
+        """One element sent to the front end"""
+        self.elements += 1
+        if widget:
+            self.widgets += 1
+
+    @property
+    def total_ms(self):
+        return self.sections[0].ms if self.sections else 0.0
+
+    def summary(self):
+        """Section rows as dicts, in render order"""
+        total = self.total_ms or 1.0
+        return [{'section': s.name, 'depth': s.depth, 'ms': round(s.ms, 2),
+                 'share': round(s.ms / total, 3), 'queries': s.queries,
+                 'query_ms': round(s.query_ms, 2), 'elements': s.elements, 'widgets': s.widgets}
+                for s in self.sections]
+
+    def functions(self, n=15, under=None):
+        """Top n functions by cumulative time from cProfile, limited to paths under `under`"""
+        if self._profiler is None:
+            return []
+        import pstats
+
+        stats = pstats.Stats(self._profiler).stats
+        rows = []
+        for (path, line, func), (_, calls, own, cumulative, _) in stats.items():
+            if under and not path.startswith(under):
+                continue
+            where = os.path.relpath(path, under) if under else path
+            rows.append({'function': f"{where}:{line} {func}", 'calls': calls,
+                         'own_ms': round(own * 1000, 2), 'cumulative_ms': round(cumulative * 1000, 2)})
+        rows.sort(key=lambda row: -row['cumulative_ms'])
+        return rows[:n]
+
+    def trace_events(self):
+        """The sections in Chrome trace event format"""
+        origin = self.sections[0].start if self.sections else 0.0
+        return [{'name': s.name, 'cat': 'heading' if s.implicit else 'section', 'ph': 'X',
+                 'ts': round((s.start - origin) * 1e6), 'dur': round(s.ms * 1000), 'pid': 1,
+                 'tid': 1, 'args': {'queries': s.queries, 'query_ms': round(s.query_ms, 3),
+                                    'elements': s.elements, 'widgets': s.widgets}}
+                for s in self.sections]
+
+    def save(self, directory):
+        """Write the trace (and cProfile stats) to directory; returns the paths"""
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^a-z0-9]+', '-', self.name.lower()).strip('-') or 'render'
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        stem = os.path.join(directory, f"{stamp}.{int(self.started * 1000) % 1000:03d}-{slug}")
+        paths = [stem + '.trace.json']
+        with open(paths[0], 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms',
+                       'otherData': {'page': self.name, 'started': self.started}}, f)
+        if self._profiler is not None:
+            paths.append(stem + '.prof')
+            self._profiler.dump_stats(paths[1])
+        self.saved = paths
+        return paths
@@ -0,0 +1,399 @@
+# ============================================================================
+# PRAGNYA PHARM - Query instrumentation and slow-query log
+# ============================================================================
+# IndianPharmacyDB connects through connect() below, so every statement
+# run through db.cursor, db.conn.execute or pd.read_sql_query(db.conn)
+# is timed without touching the pages. A statement's time is its execute
+# plus the fetches (or iteration) that read its rows; it is recorded when
+# its rows are exhausted, the cursor runs its next statement, or the
+# cursor is closed or garbage collected, so a throwaway
+# `conn.execute(...).fetchone()` counts too. COMMIT is recorded as a
+# statement too, since that is where a write waits for the disk. A
+# statement that fails on another connection's lock (busy/locked), and a
+# BEGIN (whose only work is taking the lock), are counted but never
+# logged as slow: they waited, they did not work.
+#
+# Statements are grouped by their text with literals replaced by `?`.
+# Each group keeps calls, total/max time, rows, a latency histogram and
+# its busiest call sites: the project line that ran it and, when that is
+# inside pragnya/, the app or script line that called into pragnya.
+# Anything slower than STATS.slow_ms is logged as a warning and kept in
+# a short in-memory list for the Query Stats page.
+#
+# The stats are per process. Dump them with STATS.save(path) (or set
+# STATS.dump_file) and read the dump with:
+#
+#     python -m pragnya.querylog stats.json [--top 20] [--by total_ms]
+import argparse
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.dirname(os.path.abspath(__file__))
+THIS_FILE = os.path.abspath(__file__)
+
+# Histogram upper bounds in ms (the last bucket is everything above)
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SLOW_QUERY_MS = 100.0
+MAX_SITES = 8           # call sites kept per statement; the rest count as "(other)"
+SLOW_LOG_SIZE = 200
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SPACE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize(sql):
+    """Statement text with literals as `?`, IN lists collapsed and whitespace squeezed"""
+    text = _SPACE.sub(' ', _LITERALS.sub('?', sql)).strip()
+    return _IN_LIST.sub('(?, ...)', text)
+
+
+@functools.lru_cache(maxsize=1024)
+def _source(path):
+    """(path relative to the project or None outside it, inside pragnya/)"""
+    if not path.startswith(ROOT) or path == THIS_FILE:
+        return None, False
+    return os.path.relpath(path, ROOT), path.startswith(PACKAGE)
+
+
+def call_site():
+    """'file:line function' of the project code that ran the statement"""
+    frame = sys._getframe(2)
+    inner = None
+    depth = 0
+    while frame is not None and depth < 40:
+        where, in_package = _source(frame.f_code.co_filename)
+        if where is not None:
+            where = f"{where}:{frame.f_lineno} {frame.f_code.co_name}"
+            if inner is None:
+                if not in_package:
+                    return where
+                inner = where
+            elif not in_package:
+                return f"{inner} < {where}"
+        frame = frame.f_back
+        depth += 1
+    return inner or '(unknown)'
+
+
+class _Stat:
+    __slots__ = ('calls', 'total_ms', 'max_ms', 'rows', 'buckets', 'sites')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.sites = {}
+
+
+class _ThreadTotals(threading.local):
+    calls = 0
+    ms = 0.0
+    forced = 0  # render profiles running on this thread (they count queries with stats off)
+
+
+class QueryStats:
+    """Per-statement latency, rows and call sites for this process"""
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self.dump_file = None
+        self.slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._thread = _ThreadTotals()
+        self.since = time.time()
+
+    def recording(self):
+        """Whether this thread's statements are recorded: stats on, or a profile forcing them"""
+        return self.enabled or self._thread.forced > 0
+
+    def force(self, on=True):
+        """Record this thread's statements even while stats are off; calls nest
+
+        For render profiles: other threads (sessions) are unaffected, and
+        `enabled` is never touched.
+        """
+        self._thread.forced += 1 if on else -1
+
+    def record(self, sql, ms, rows, site, contended=False):
+        key = normalize(sql)
+        bucket = bisect.bisect_left(BUCKETS_MS, ms)
+        totals = self._thread
+        totals.calls += 1
+        totals.ms += ms
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = _Stat()
+            stat.calls += 1
+            stat.total_ms += ms
+            stat.rows += rows
+            if ms > stat.max_ms:
+                stat.max_ms = ms
+            stat.buckets[bucket] += 1
+            if site not in stat.sites and len(stat.sites) >= MAX_SITES:
+                site = '(other)'
+            stat.sites[site] = stat.sites.get(site, 0) + 1
+        if ms >= self.slow_ms and not contended and key[:5].upper() != 'BEGIN':
+            self.slow.append({'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'ms': round(ms, 2),
+                              'rows': rows, 'site': site, 'sql': key})
+            logger.warning("Slow query %.1f ms, %d rows, at %s: %s", ms, rows, site, key[:300])
+
+    def thread_totals(self):
+        """(statements, ms) recorded so far by the calling thread, for per-render counts"""
+        return self._thread.calls, self._thread.ms
+
+    def totals(self):
+        """(statements, ms) recorded by every thread since the last reset"""
+        with self._lock:
+            return (sum(stat.calls for stat in self._stats.values()),
+                    sum(stat.total_ms for stat in self._stats.values()))
+
+    def top(self, n=20, by='total_ms'):
+        """The n heaviest statements as dicts, sorted by total_ms, mean_ms, max_ms, calls or rows"""
+        with self._lock:
+            items = [(key, stat.calls, stat.total_ms, stat.max_ms, stat.rows,
+                      list(stat.buckets), dict(stat.sites)) for key, stat in self._stats.items()]
+        rows = [{'sql': key, 'calls': calls, 'total_ms': round(total, 3),
+                 'mean_ms': round(total / calls, 3), 'p95_ms': _quantile(buckets, 0.95, max_ms),
+                 'max_ms': round(max_ms, 3), 'rows': n_rows,
+                 'sites': sorted(sites.items(), key=lambda kv: -kv[1]), 'buckets': buckets}
+                for key, calls, total, max_ms, n_rows, buckets, sites in items]
+        rows.sort(key=lambda row: -row[by])
+        return rows[:n]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow.clear()
+            self.since = time.time()
+
+    def to_dict(self):
+        return {'since': self.since, 'saved': time.time(), 'slow_ms': self.slow_ms,
+                'buckets_ms': list(BUCKETS_MS), 'queries': self.top(n=None),
+                'slow': list(self.slow)}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+def _quantile(buckets, q, max_ms):
+    """Upper bound of the histogram bucket holding quantile q"""
+    target = q * sum(buckets)
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if count and seen >= target:
+            return min(BUCKETS_MS[i], round(max_ms, 3)) if i < len(BUCKETS_MS) else round(max_ms, 3)
+    return 0.0
+
+
+STATS = QueryStats()
+
+
+@atexit.register
+def _dump_at_exit():
+    if STATS.dump_file:
+        try:
+            STATS.save(STATS.dump_file)
+        except OSError as e:
+            logger.error("Could not write query stats to %s: %s", STATS.dump_file, e)
+
+
+def _contended(error):
+    """True for an OperationalError raised because another connection holds the lock"""
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """sqlite3 cursor that reports each statement to STATS"""
+
+    _pending = None  # [sql, ms, rows, site] of the statement whose rows are being read
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            STATS.record(*pending)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        if not STATS.recording():
+            return super().execute(sql, parameters)
+        contended = False
+        t0 = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            contended = _contended(e)
+            raise
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            if contended or self.description is None:
+                STATS.record(sql, ms, max(self.rowcount, 0), call_site(), contended)
+            else:
+                self._pending = [sql, ms, 0, call_site()]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        if not STATS.recording():
+            return super().executemany(sql, seq_of_parameters)
+        contended = False
+        t0 = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except sqlite3.OperationalError as e:
+            contended = _contended(e)
+            raise
+        finally:
+            STATS.record(sql, (time.perf_counter() - t0) * 1000, max(self.rowcount, 0), call_site(),
+                         contended)
+        return self
+
+    def executescript(self, sql_script):
+        self._finish()
+        t0 = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        finally:
+            if STATS.recording():
+                STATS.record(sql_script, (time.perf_counter() - t0) * 1000, 0, call_site())
+        return self
+
+    def _fetched(self, t0, rows, done):
+        pending = self._pending
+        if pending is not None:
+            pending[1] += (time.perf_counter() - t0) * 1000
+            pending[2] += rows
+            if done:
+                self._finish()
+
+    def __next__(self):
+        # `for row in conn.execute(...)`, dict(), list(), ...
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t0, 0, True)
+            raise
+        self._fetched(t0, 1, False)
+        return row
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        size = self.arraysize if size is None else size
+        rows = super().fetchmany(size)
+        self._fetched(t0, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows), True)
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # A throwaway cursor whose rows were not all read
+        if self._pending is not None:
+            self._finish()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors, shortcuts and commits report to STATS"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if not (self.in_transaction and STATS.recording()):
+            return super().commit()
+        contended = False
+        t0 = time.perf_counter()
+        try:
+            super().commit()
+        except sqlite3.OperationalError as e:
+            contended = _contended(e)
+            raise
+        finally:
+            STATS.record('COMMIT', (time.perf_counter() - t0) * 1000, 0, call_site(), contended)
+
+
+def connect(database, **kwargs):
+    """sqlite3.connect() returning an InstrumentedConnection"""
+    return sqlite3.connect(database, factory=InstrumentedConnection, **kwargs)
+
+
+def format_top(queries, width=100):
+    """Text table of top() rows"""
+    lines = [f"{'total ms':>10}{'calls':>8}{'mean':>9}{'p95':>9}{'max':>9}{'rows':>10}  statement / top call site"]
+    for q in queries:
+        lines.append(f"{q['total_ms']:>10.1f}{q['calls']:>8}{q['mean_ms']:>9.2f}{q['p95_ms']:>9.1f}"
+                     f"{q['max_ms']:>9.1f}{q['rows']:>10}  {q['sql'][:width]}")
+        if q['sites']:
+            site, count = q['sites'][0]
+            lines.append(f"{'':>55}  @ {site} ({count}x)")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the top queries from a query stats dump')
+    parser.add_argument('dump', help='JSON written by QueryStats.save()')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--by', default='total_ms',
+                        choices=['total_ms', 'mean_ms', 'p95_ms', 'max_ms', 'calls', 'rows'])
+    parser.add_argument('--slow', action='store_true', help='also list the slow-query log')
+    args = parser.parse_args()
+
+    with open(args.dump) as f:
+        data = json.load(f)
+    queries = sorted(data['queries'], key=lambda q: -q[args.by])[:args.top]
+    since = time.strftime('%Y-%m-%d %H:%M', time.localtime(data['since']))
+    print(f"{len(data['queries'])} distinct statements since {since}, "
+          f"top {len(queries)} by {args.by}:")
+    print(format_top(queries))
+    if args.slow:
+        print(f"\nSlow queries (>= {data['slow_ms']:.0f} ms), newest last:")
+        for entry in data['slow']:
+            print(f"{entry['time']}  {entry['ms']:>9.1f} ms {entry['rows']:>8} rows  "
+                  f"{entry['site']}\n    {entry['sql'][:200]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+# ============================================================================
+# PRAGNYA PHARM - Receipt rendering (HTML, ESC/POS thermal, PDF)
+# ============================================================================
+# Templates are split once, at import, into static chunks and per-line
+# format strings; rendering a receipt is a few substitutions and one
+# str.join, never repeated string concatenation. The HTML templates are
+# pure ASCII (the rupee sign is the &#8377; entity), which keeps every
+# substitution and the join on CPython's compact 1-byte strings. The
+# receipt date is formatted once per minute, and HTML line prices (which
+# repeat across bills) once per value. Names are HTML-escaped.
+# Batch reprints stream each receipt straight into the output file, so a
+# day of bills never sits in memory at once.
+#
+#   python -m pragnya.receipts --date 2026-10-19 --format pdf -o receipts.pdf
+import argparse
+import functools
+import html
+import itertools
+import sys
+from datetime import datetime, timezone
+
+SHOP = {
+    'name': 'PRAGNYA PHARM',
+    'tagline': 'Smart Pharmacy Management',
+    'contact': 'Contact: +91 98765 43210 | Email: info@pragnyapharm.com',
+    'gst_no': 'GST No: 27AAACP1234M1Z5',
+}
+
+FORMATS = ('html', 'escpos', 'pdf')
+
+
+@functools.lru_cache(maxsize=1024)
+def _minute_label(year, month, day, hour, minute):
+    return datetime(year, month, day, hour, minute).strftime('%d/%m/%Y %I:%M %p')
+
+
+def make_receipt(bill_no, items, subtotal, discount, gst, total, customer_name, when=None):
+    """Build the receipt dict every renderer takes"""
+    when = when or datetime.now()
+    return {
+        'bill_no': bill_no,
+        'date': _minute_label(when.year, when.month, when.day, when.hour, when.minute),
+        'customer': customer_name or 'Walk-in Customer',
+        'items': items,
+        'subtotal': subtotal,
+        'discount': discount,
+        'gst': gst,
+        'total': total,
+    }
+
+
+def receipt_from_bill(bill):
+    """Build a receipt from a bill header + lines (see IndianPharmacyDB.get_bill)"""
+    when = None
+    created = bill.get('created_date') or ''
+    try:
+        # CURRENT_TIMESTAMP is UTC; live receipts show local time
+        when = datetime.strptime(created[:19], '%Y-%m-%d %H:%M:%S')
+        when = when.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    except ValueError:
+        try:
+            when = datetime.strptime(created[:10], '%Y-%m-%d')
+        except ValueError:
+            pass
+    return make_receipt(bill['bill_no'], bill['items'], bill['subtotal'],
+                        bill['discount_amount'], bill['gst_amount'], bill['total'],
+                        bill['customer_name'], when)
+
+
+# ----------------------------------------------------------------------------
+# HTML
+# ----------------------------------------------------------------------------
+_HTML_STYLE = """
+        <style>
+            body { font-family: Arial, sans-serif; margin: 20px; }
+            .header { text-align: center; margin-bottom: 20px; }
+            .logo { font-size: 24px; font-weight: bold; color: #0A5C36; }
+            .bill-info { margin: 10px 0; }
+            .item-table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+            .item-table th, .item-table td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+            .item-table th { background-color: #0A5C36; color: white; }
+            .total { font-size: 18px; font-weight: bold; margin-top: 20px; }
+            .footer { margin-top: 30px; text-align: center; font-size: 12px; color: #666; }
+            .receipt { page-break-after: always; }
+        </style>"""
+
+_HTML_DOC_HEAD = f"<html>\n<head>{_HTML_STYLE}\n</head>\n<body>\n"
+_HTML_DOC_TAIL = "</body>\n</html>\n"
+
+_HTML_RECEIPT_HEAD = f"""<div class="receipt">
+    <div class="header">
+        <div class="logo">{SHOP['name']}</div>
+        <div>{SHOP['tagline']}</div>
+    </div>
+    <div class="bill-info">
+        <strong>Bill No:</strong> %s<br>
+        <strong>Date:</strong> %s<br>
+        <strong>Customer:</strong> %s<br>
+    </div>
+    <table class="item-table">
+        <tr><th>Medicine</th><th>Qty</th><th>Price</th><th>Total</th></tr>
+"""
+
+
+_HTML_RECEIPT_TAIL = f"""    </table>
+    <div class="bill-info">
+        Subtotal: &#8377;%.2f<br>
+        Discount: -&#8377;%.2f<br>
+        GST: +&#8377;%.2f<br>
+    </div>
+    <div class="total">Grand Total: &#8377;%.2f</div>
+    <div class="footer">
+        Thank you for visiting Pragnya Pharm!<br>
+        {SHOP['contact']}<br>
+        {SHOP['gst_no']}
+    </div>
+</div>
+"""
+
+
+# Medicine and customer names, and line prices, repeat across bills;
+# escape or format each once
+_escape = functools.lru_cache(maxsize=4096)(html.escape)
+_money = functools.lru_cache(maxsize=4096)('%.2f'.__mod__)
+
+
+def _html_parts(receipt, parts):
+    """Append one receipt's HTML chunks to `parts`"""
+    parts.append(_HTML_RECEIPT_HEAD % (_escape(str(receipt['bill_no'])), receipt['date'],
+                                       _escape(receipt['customer'])))
+    for item in receipt['items']:
+        # An f-string is cheaper than a 4-argument %-format per line
+        parts.append(f"        <tr><td>{_escape(item['name'])}</td><td>{item['qty']}</td>"
+                     f"<td>&#8377;{_money(item['price'])}</td>"
+                     f"<td>&#8377;{_money(item['subtotal'])}</td></tr>\n")
+    parts.append(_HTML_RECEIPT_TAIL % (receipt['subtotal'], receipt['discount'], receipt['gst'],
+                                       receipt['total']))
+    return parts
+
+
+def render_html(receipt):
+    """Render one receipt as a standalone HTML document"""
+    parts = _html_parts(receipt, [_HTML_DOC_HEAD])
+    parts.append(_HTML_DOC_TAIL)
+    return ''.join(parts)
+
+
+# ----------------------------------------------------------------------------
+# Plain text lines (shared by ESC/POS and PDF)
+# ----------------------------------------------------------------------------
+def text_lines(receipt, width=42):
+    """Lay a receipt out as fixed-width text lines (ASCII, 'Rs.' for ₹)"""
+    rule = '-' * width
+    name_w = width - 22
+    amount = f"{{:>{width - 12}.2f}}"
+    lines = [
+        SHOP['name'].center(width),
+        SHOP['tagline'].center(width),
+        rule,
+        f"Bill No : {receipt['bill_no']}",
+        f"Date    : {receipt['date']}",
+        f"Customer: {receipt['customer'][:width - 10]}",
+        rule,
+        f"{'Item':<{name_w}}{'Qty':>5}{'Price':>8}{'Total':>9}",
+        rule,
+    ]
+    for item in receipt['items']:
+        lines.append(f"{item['name'][:name_w]:<{name_w}}{item['qty']:>5}"
+                     f"{item['price']:>8.2f}{item['subtotal']:>9.2f}")
+    lines += [
+        rule,
+        'Subtotal Rs.' + amount.format(receipt['subtotal']),
+        'Discount Rs.' + amount.format(-receipt['discount']),
+        'GST      Rs.' + amount.format(receipt['gst']),
+        rule,
+        'TOTAL    Rs.' + amount.format(receipt['total']),
+        rule,
+        'Thank you for visiting Pragnya Pharm!'.center(width),
+        SHOP['gst_no'].center(width),
+    ]
+    return lines
+
+
+# ----------------------------------------------------------------------------
+# ESC/POS (thermal printers)
+# ----------------------------------------------------------------------------
+ESC_INIT = b'\x1b@'
+ESC_CENTER = b'\x1ba\x01'
+ESC_LEFT = b'\x1ba\x00'
+ESC_BOLD_ON = b'\x1bE\x01'
+ESC_BOLD_OFF = b'\x1bE\x00'
+GS_CUT = b'\x1dV\x42\x00'  # feed and partial cut
+
+
+def render_escpos(receipt, width=42):
+    """Render one receipt as ESC/POS bytes for a `width`-column thermal printer"""
+    lines = [line.encode('ascii', 'replace') for line in text_lines(receipt, width)]
+    out = [ESC_INIT, ESC_CENTER, ESC_BOLD_ON, lines[0].strip(), b'\n',
+           ESC_BOLD_OFF, lines[1].strip(), b'\n', ESC_LEFT]
+    for line in lines[2:-2]:
+        if line.startswith(b'TOTAL'):
+            out += [ESC_BOLD_ON, line, b'\n', ESC_BOLD_OFF]
+        else:
+            out += [line, b'\n']
+    out += [ESC_CENTER, lines[-2].strip(), b'\n', lines[-1].strip(), b'\n\n\n', GS_CUT]
+    return b''.join(out)
+
+
+# ----------------------------------------------------------------------------
+# PDF (dependency-free, streamed page by page)
+# ----------------------------------------------------------------------------
+class PDFWriter:
+    """Minimal streaming PDF writer: one Courier text page per receipt
+
+    Objects are written as pages arrive and only their byte offsets are
+    kept, so memory stays flat however many receipts go into one file.
+    """
+
+    PAGE_W, PAGE_H = 298, 600  # roughly 105 x 210 mm
+    FONT_SIZE, LEADING, MARGIN = 8, 10, 18
+
+    def __init__(self, fileobj):
+        self.out = fileobj
+        self.pos = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4  # 1 catalog, 2 page tree, 3 font
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier '
+                        b'/Encoding /WinAnsiEncoding >>')
+
+    def _write(self, data):
+        self.out.write(data)
+        self.pos += len(data)
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.pos
+        self._write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+
+    def add_page(self, lines):
+        ops = [b'BT /F1 %d Tf %d TL %d %d Td' % (
+            self.FONT_SIZE, self.LEADING, self.MARGIN, self.PAGE_H - self.MARGIN - self.FONT_SIZE)]
+        for line in lines:
+            text = line.encode('cp1252', 'replace')
+            text = text.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+            ops.append(b'(' + text + b") '")
+        ops.append(b'ET')
+        stream = b'\n'.join(ops)
+
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b'<< /Length %d >>\nstream\n' % len(stream)
+                     + stream + b'\nendstream')
+        self._object(page_id, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                              b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+                     % (self.PAGE_W, self.PAGE_H, content_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = b' '.join(b'%d 0 R' % p for p in self.page_ids)
+        self._object(2, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(self.page_ids))
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_at = self.pos
+        size = self.next_id
+        entries = [b'0000000000 65535 f \n']
+        entries += [b'%010d 00000 n \n' % self.offsets[i] if i in self.offsets
+                    else b'0000000000 65535 f \n' for i in range(1, size)]
+        self._write(b'xref\n0 %d\n' % size + b''.join(entries))
+        self._write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (size, xref_at))
+
+
+def render_pdf(receipt):
+    """Render one receipt as a single-page PDF (bytes)"""
+    import io
+    buf = io.BytesIO()
+    writer = PDFWriter(buf)
+    writer.add_page(text_lines(receipt))
+    writer.close()
+    return buf.getvalue()
+
+
+# ----------------------------------------------------------------------------
+# Batch output
+# ----------------------------------------------------------------------------
+def write_receipts(receipts, fmt, fileobj, width=42):
+    """Stream receipts into one binary file object; returns how many were written"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown receipt format {fmt!r} (expected one of {FORMATS})")
+
+    count = 0
+    if fmt == 'pdf':
+        writer = PDFWriter(fileobj)
+        for receipt in receipts:
+            writer.add_page(text_lines(receipt, width))
+            count += 1
+        writer.close()
+    elif fmt == 'escpos':
+        for receipt in receipts:
+            fileobj.write(render_escpos(receipt, width))
+            count += 1
+    else:
+        fileobj.write(_HTML_DOC_HEAD.encode('utf-8'))
+        for receipt in receipts:
+            fileobj.write(''.join(_html_parts(receipt, [])).encode('utf-8'))
+            count += 1
+        fileobj.write(_HTML_DOC_TAIL.encode('utf-8'))
+    return count
+
+
+def iter_day_receipts(db, bill_date):
+    """Yield receipts for every bill of one day, reading headers and lines in two passes"""
+    bills = db.archive.source('bills', bill_date, bill_date)
+    sales = db.archive.source('sales', bill_date, bill_date)
+    headers = db.conn.execute(f'''
+        SELECT id, bill_no, customer_name, subtotal, discount_amount, gst_amount,
+               total, created_date
+        FROM {bills} WHERE bill_date = ? ORDER BY id
+    ''', (bill_date,))
+    lines = db.conn.execute(f'''
+        SELECT s.bill_id, m.brand_name, s.quantity, s.selling_price, s.total_amount
+        FROM {bills} b
+        JOIN {sales} s ON s.bill_id = b.id
+        JOIN medicines m ON s.medicine_id = m.id
+        WHERE b.bill_date = ?
+        ORDER BY s.bill_id, s.id
+    ''', (bill_date,))
+    grouped = itertools.groupby(lines, key=lambda row: row[0])
+    current = next(grouped, (None, iter(())))
+
+    for bill_id, bill_no, customer, subtotal, discount, gst, total, created in headers:
+        items = []
+        # Both cursors walk bill ids in ascending order
+        while current[0] is not None and current[0] < bill_id:
+            current = next(grouped, (None, iter(())))
+        if current[0] == bill_id:
+            items = [{'name': name, 'qty': qty, 'price': price, 'subtotal': amount}
+                     for _, name, qty, price, amount in current[1]]
+            current = next(grouped, (None, iter(())))
+        yield receipt_from_bill({
+            'bill_no': bill_no, 'items': items, 'subtotal': subtotal,
+            'discount_amount': discount, 'gst_amount': gst, 'total': total,
+            'customer_name': customer, 'created_date': created,
+        })
+
+
+def reprint_day(db, bill_date, fmt, fileobj, width=42):
+    """Write every receipt of `bill_date` ('YYYY-MM-DD') into one file"""
+    return write_receipts(iter_day_receipts(db, bill_date), fmt, fileobj, width)
+
+
+def main():
+    from pragnya.db import IndianPharmacyDB
+
+    parser = argparse.ArgumentParser(description="Reprint a day's receipts into one file")
+    parser.add_argument('--db', default='pharmacy.db')
+    parser.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'))
+    parser.add_argument('--format', choices=FORMATS, default='pdf')
+    parser.add_argument('--width', type=int, default=42, help='thermal paper columns')
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    db = IndianPharmacyDB(args.db)
+    with open(args.output, 'wb') as f:
+        count = reprint_day(db, args.date, args.format, f, args.width)
+    print(f"Wrote {count} receipts for {args.date} to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# ============================================================================
+# PRAGNYA PHARM - Change-log replication of store databases to head office
+# ============================================================================
+# Triggers on the replicated tables append (table, op, row id, time) to
+# `change_log` in the same transaction as the change itself. A SyncAgent
+# per store reads the log past the last acknowledged sequence and
+# coalesces it to the final state of each row (one upsert or delete
+# however often the row changed). It ships that state as a
+# zlib-compressed JSON batch, and prunes the log once head office
+# acknowledges.
+#
+# Rows are identified by their SQLite rowid (the INTEGER PRIMARY KEY, which
+# is `id` in current schemas and `alert_id` in old alerts tables).
+#
+# CentralStore keeps one copy of every replicated table keyed by
+# (store, row_id) and applies each batch idempotently in one transaction:
+# a batch at or below the store's applied sequence is ignored, a gap is
+# refused and the agent resends from where head office actually is.
+#
+# Archival deletes of sales/bills and of resolved alerts are not
+# replicated: head office keeps the history (see pragnya.archive).
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+REPLICATED_TABLES = ('medicines', 'bills', 'sales', 'alerts')
+
+# Seconds since the epoch, with milliseconds, inside SQLite
+NOW_EXPR = "(julianday('now') - 2440587.5) * 86400.0"
+
+
+def install_change_log(conn):
+    """Create the change log and its triggers (idempotent)
+
+    Only stores that replicate call this, so single-shop installs pay no
+    trigger cost on writes. The first install logs every existing row so
+    head office receives the store's baseline.
+    """
+    first_install = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_log'").fetchone()
+    statements = ['''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            changed_at REAL NOT NULL
+        )
+    ''', '''
+        CREATE TABLE IF NOT EXISTS replication_state (
+            peer TEXT PRIMARY KEY,
+            acked_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''']
+    for table in REPLICATED_TABLES:
+        for op, event, ref in (('I', 'INSERT', 'NEW'), ('U', 'UPDATE', 'NEW'), ('D', 'DELETE', 'OLD')):
+            statements.append(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{op.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (tbl, op, row_id, changed_at)
+                    VALUES ('{table}', '{op}', {ref}.rowid, {NOW_EXPR});
+                END
+            ''')
+    if first_install:
+        statements += [f'''
+            INSERT INTO change_log (tbl, op, row_id, changed_at)
+            SELECT '{table}', 'I', rowid, {NOW_EXPR} FROM {table} ORDER BY rowid
+        ''' for table in REPLICATED_TABLES]
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+
+
+class CentralStore:
+    """Head-office database holding every store's replicated rows"""
+
+    def __init__(self, db_file='central.db'):
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                store TEXT PRIMARY KEY,
+                applied_seq INTEGER NOT NULL DEFAULT 0,
+                applied_at REAL,
+                batches INTEGER DEFAULT 0,
+                bytes INTEGER DEFAULT 0
+            )
+        ''')
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._columns = {}
+
+    def applied_seq(self, store):
+        row = self.conn.execute("SELECT applied_seq FROM sync_state WHERE store = ?",
+                                (store,)).fetchone()
+        return row[0] if row else 0
+
+    def _ensure_table(self, table, columns):
+        known = self._columns.get(table)
+        if known is None:
+            known = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+            if not known:
+                cols = ', '.join(f'"{c}"' for c in columns[1:])
+                self.conn.execute(f'CREATE TABLE {table} (store TEXT NOT NULL, row_id INTEGER NOT NULL, '
+                                  f'{cols}, PRIMARY KEY (store, row_id))')
+                known = ['store'] + list(columns)
+        for column in columns:
+            if column not in known:
+                self.conn.execute(f'ALTER TABLE {table} ADD COLUMN "{column}"')
+                known.append(column)
+        self._columns[table] = known
+
+    def apply(self, payload):
+        """Apply one shipped batch; returns the store's applied sequence afterwards"""
+        batch = json.loads(zlib.decompress(payload))
+        store = batch['store']
+        unknown = (set(batch['columns']) | set(batch['deletes'])) - set(REPLICATED_TABLES)
+        if unknown:
+            raise ValueError(f"Batch from {store} names unreplicated tables: {sorted(unknown)}")
+        with self._lock:
+            applied = self.applied_seq(store)
+            if batch['to_seq'] <= applied:
+                return applied  # already applied (retry after a lost ack)
+            if batch['from_seq'] > applied + 1:
+                logger.warning("Gap from store %s: have %d, got %d..%d",
+                               store, applied, batch['from_seq'], batch['to_seq'])
+                return applied
+
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                for table, columns in batch['columns'].items():
+                    self._ensure_table(table, columns)
+                    names = ', '.join(['store'] + [f'"{c}"' for c in columns])
+                    marks = ', '.join('?' * (len(columns) + 1))
+                    rows = batch['upserts'].get(table, [])
+                    self.conn.executemany(f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({marks})",
+                                          [[store] + row for row in rows])
+                for table, ids in batch['deletes'].items():
+                    if table in self._columns or self.conn.execute(
+                            "SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone():
+                        self.conn.executemany(f"DELETE FROM {table} WHERE store = ? AND row_id = ?",
+                                              [(store, row_id) for row_id in ids])
+                self.conn.execute(f'''
+                    INSERT INTO sync_state (store, applied_seq, applied_at, batches, bytes)
+                    VALUES (?, ?, {NOW_EXPR}, 1, ?)
+                    ON CONFLICT (store) DO UPDATE SET
+                        applied_seq = excluded.applied_seq, applied_at = excluded.applied_at,
+                        batches = batches + 1, bytes = bytes + excluded.bytes
+                ''', (store, batch['to_seq'], len(payload)))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                self._columns.clear()
+                raise
+            return batch['to_seq']
+
+
+class LocalTransport:
+    """Ships batches to a CentralStore in the same process (stand-in for HTTP)"""
+
+    def __init__(self, central):
+        self.central = central
+
+    def send(self, payload):
+        return self.central.apply(payload)
+
+
+class SyncAgent(threading.Thread):
+    """Background thread shipping one store's change log to head office"""
+
+    def __init__(self, db_file, store, transport, batch_size=1000, interval=1.0, peer='central'):
+        super().__init__(name=f'sync-{store}', daemon=True)
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA busy_timeout=2000")
+        install_change_log(self.conn)
+        self.store = store
+        self.transport = transport
+        self.batch_size = batch_size
+        self.interval = interval
+        self.peer = peer
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.stats = {'batches': 0, 'changes': 0, 'rows': 0, 'bytes': 0, 'lags': []}
+
+    def kick(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                shipped = self.sync_once()
+            except Exception:
+                logger.exception("Sync of store %s failed", self.store)
+                shipped = 0
+            if shipped < self.batch_size:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def acked_seq(self):
+        row = self.conn.execute("SELECT acked_seq FROM replication_state WHERE peer = ?",
+                                (self.peer,)).fetchone()
+        return row[0] if row else 0
+
+    def build_batch(self, after_seq):
+        """(payload bytes, change count, oldest change time) past `after_seq`, or None"""
+        changes = self.conn.execute('''
+            SELECT seq, tbl, op, row_id, changed_at FROM change_log
+            WHERE seq > ? ORDER BY seq LIMIT ?
+        ''', (after_seq, self.batch_size)).fetchall()
+        if not changes:
+            return None
+
+        # Last operation per row wins
+        final = {}
+        for _, table, op, row_id, _ in changes:
+            final[(table, row_id)] = op
+        upserts, deletes, columns = {}, {}, {}
+        by_table = {}
+        for (table, row_id), op in final.items():
+            if op == 'D':
+                deletes.setdefault(table, []).append(row_id)
+            else:
+                by_table.setdefault(table, []).append(row_id)
+        for table, ids in by_table.items():
+            found = set()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                cursor = self.conn.execute(
+                    f"SELECT rowid AS row_id, * FROM {table} "
+                    f"WHERE rowid IN ({','.join('?' * len(chunk))})", chunk)
+                columns[table] = [d[0] for d in cursor.description]
+                for row in cursor:
+                    upserts.setdefault(table, []).append(list(row))
+                    found.add(row[0])
+            # Inserted then deleted later in the log: nothing left to ship but a delete
+            deletes.setdefault(table, []).extend(i for i in ids if i not in found)
+
+        batch = {'store': self.store, 'from_seq': after_seq + 1, 'to_seq': changes[-1][0],
+                 'columns': columns, 'upserts': upserts,
+                 'deletes': {t: ids for t, ids in deletes.items() if ids}}
+        payload = zlib.compress(json.dumps(batch, separators=(',', ':')).encode('utf-8'), 6)
+        return payload, len(changes), min(c[4] for c in changes), sum(map(len, upserts.values()))
+
+    def sync_once(self):
+        """Ship one batch; returns the number of change-log entries acknowledged"""
+        acked = self.acked_seq()
+        built = self.build_batch(acked)
+        if built is None:
+            return 0
+        payload, count, oldest, rows = built
+        new_acked = self.transport.send(payload)
+        lag = time.time() - oldest
+
+        if new_acked < acked:
+            # Head office lost changes this store has already pruned
+            logger.error("Head office is at seq %d but store %s pruned through %d; "
+                         "a full resync is needed", new_acked, self.store, acked)
+            return 0
+        if new_acked == acked:
+            return 0
+        self.conn.execute('''
+            INSERT INTO replication_state (peer, acked_seq) VALUES (?, ?)
+            ON CONFLICT (peer) DO UPDATE SET acked_seq = excluded.acked_seq
+        ''', (self.peer, new_acked))
+        self.conn.execute("DELETE FROM change_log WHERE seq <= ?", (new_acked,))
+        self.conn.commit()
+
+        self.stats['batches'] += 1
+        self.stats['changes'] += count
+        self.stats['rows'] += rows
+        self.stats['bytes'] += len(payload)
+        self.stats['lags'].append(lag)
+        return count
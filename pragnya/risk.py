@@ -0,0 +1,132 @@
+# ============================================================================
+# PRAGNYA PHARM - Expiry risk engine
+# ============================================================================
+# Every lot in stock (a medicines row: one batch with its own expiry) is
+# assessed at once, as NumPy column operations over two queries: the lots
+# and a 7/30/90-day sales aggregate per medicine. Per lot:
+#
+#   days_left        expiry_date - today
+#   value_at_risk    quantity x purchase_price
+#   daily_demand     DemandForecaster's model, vectorized: mean of the 7-
+#                    and 30-day averages (90-day average for slow movers)
+#                    times the seasonal factor
+#   expected_unsold  units left at expiry at that demand
+#   risk             Expired / Critical / Warning by the Alert Settings
+#                    days, Slow-moving when units will outlive the lot
+#
+# Results are cached per IndianPharmacyDB.data_version(), settings and
+# day, so reruns reuse them until stock (or the settings) change.
+import threading
+from datetime import date, timedelta
+
+from pragnya.forecast import DemandForecaster
+
+RISK_LEVELS = ('Expired', 'Critical', 'Warning', 'Slow-moving', 'OK')
+
+LOTS_QUERY = '''
+    SELECT id, brand_name, batch_no, substr(expiry_date, 1, 10), quantity,
+           COALESCE(purchase_price, mrp * 0.6, 0), max_quantity, COALESCE(mrp, 0)
+    FROM medicines WHERE quantity > 0
+    ORDER BY id
+'''
+DEMAND_QUERY = '''
+    SELECT medicine_id,
+           SUM(CASE WHEN sale_date >= ? THEN quantity ELSE 0 END),
+           SUM(CASE WHEN sale_date >= ? THEN quantity ELSE 0 END),
+           SUM(quantity)
+    FROM sales
+    WHERE sale_date >= ? AND medicine_id IS NOT NULL
+    GROUP BY medicine_id
+'''
+
+
+class ExpiryRiskEngine:
+    """Vectorized expiry risk over every lot, cached until stock or settings change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # shared by every app session
+        self._key = None
+        self._report = None
+        self.builds = 0
+
+    def assess(self, db, settings=None):
+        """{'lots': DataFrame worst first, 'summary': per risk level, 'as_of', 'settings'}
+
+        The report is shared between callers: treat it as read-only.
+        """
+        settings = dict(settings or db.get_settings())
+        today = date.today()
+        key = (db.data_version(), tuple(sorted(settings.items())), today)
+        with self._lock:
+            if key != self._key:
+                self._report = assess_lots(db, settings, today)
+                self._key = key
+                self.builds += 1
+            return self._report
+
+
+def assess_lots(db, settings, today):
+    """Uncached assessment of every lot in stock (see the module header)"""
+    import numpy as np
+    import pandas as pd
+
+    lots = db.cursor.execute(LOTS_QUERY).fetchall()
+    ids, names, batches, expiry, quantity, cost, max_qty, mrp = (list(col) for col in zip(*lots)) if lots \
+        else ([], [], [], [], [], [], [], [])
+    ids = np.array(ids, dtype=np.int64)
+    quantity = np.array(quantity, dtype=float)
+    cost = np.array(cost, dtype=float)
+    max_qty = np.array(max_qty, dtype=float)  # None -> nan
+
+    # Sales per medicine over 7/30/90 days, scattered onto the lots by id
+    days = [(today - timedelta(days=n)).isoformat() for n in (7, 30, 90)]
+    demand = db.cursor.execute(DEMAND_QUERY, days).fetchall()
+    sold = np.zeros((3, len(ids)))
+    if demand and len(ids):
+        sale_ids = np.array([row[0] for row in demand], dtype=np.int64)
+        totals = np.array([row[1:] for row in demand], dtype=float).T
+        slot = np.minimum(np.searchsorted(ids, sale_ids), len(ids) - 1)
+        match = ids[slot] == sale_ids
+        sold[:, slot[match]] = totals[:, match]
+    week, month, quarter = sold
+    seasonal = DemandForecaster(db).get_seasonal_factor()
+    daily = np.where(month > 0, (week / 7 + month / 30) / 2, quarter / 90) * seasonal
+
+    expiry_day = pd.to_datetime(pd.Series(expiry, dtype=object), errors='coerce').to_numpy('datetime64[D]')
+    has_expiry = ~np.isnat(expiry_day)
+    days_left = np.where(has_expiry, (expiry_day - np.datetime64(today, 'D')).astype(float), np.nan)
+
+    # Units sold before expiry at the forecast rate; lots with no expiry never go to waste
+    selling_days = np.clip(np.nan_to_num(days_left, nan=0.0), 0, None)
+    expected_sold = np.minimum(quantity, daily * selling_days)
+    expected_unsold = np.where(has_expiry, np.ceil(quantity - expected_sold - 1e-9), 0.0)
+    value_at_risk = quantity * cost
+    unsold_value = expected_unsold * cost
+
+    warning = settings['expiry_warning_days']
+    critical = settings['critical_expiry_days']
+    level = np.select(
+        [has_expiry & (days_left < 0), has_expiry & (days_left <= critical),
+         has_expiry & (days_left <= warning), expected_unsold > 0],
+        [0, 1, 2, 3], default=4)
+    below_threshold = quantity <= max_qty * (settings['low_stock_percent'] / 100)
+
+    frame = pd.DataFrame({
+        'id': ids, 'brand_name': names, 'batch_no': batches, 'expiry_date': expiry,
+        'days_left': days_left, 'quantity': quantity.astype(np.int64), 'purchase_price': cost,
+        'mrp': np.array(mrp, dtype=float),
+        'daily_demand': daily.round(2), 'expected_unsold': expected_unsold.astype(np.int64),
+        'value_at_risk': value_at_risk.round(2), 'unsold_value': unsold_value.round(2),
+        'risk': np.array(RISK_LEVELS, dtype=object)[level], 'below_threshold': below_threshold,
+    })
+    frame = frame.iloc[np.lexsort((-unsold_value, level))].reset_index(drop=True)
+
+    counts = np.bincount(level, minlength=len(RISK_LEVELS))
+    units = np.bincount(level, weights=quantity, minlength=len(RISK_LEVELS))
+    at_risk = np.bincount(level, weights=value_at_risk, minlength=len(RISK_LEVELS))
+    unsold = np.bincount(level, weights=unsold_value, minlength=len(RISK_LEVELS))
+    summary = {name: {'lots': int(counts[i]), 'units': int(units[i]),
+                      'value_at_risk': round(float(at_risk[i]), 2),
+                      'unsold_value': round(float(unsold[i]), 2)}
+               for i, name in enumerate(RISK_LEVELS)}
+    return {'lots': frame, 'summary': summary, 'as_of': today, 'settings': settings}
@@ -0,0 +1,292 @@
+# ============================================================================
+# PRAGNYA PHARM - Offline semantic search over the medicine catalogue
+# ============================================================================
+# "something for acidity" or "bp tablet" name no medicine, so LIKE and the
+# chatbot's name table find nothing. MedicineSearch is a TF-IDF index over
+# brand, generic name, category and indications, searched by cosine
+# similarity with NumPy. No network or model download is needed.
+#
+# Indications come from the medicines.indications column when it is
+# filled in, else from the defaults below keyed by category and by each
+# generic ingredient.
+#
+# The index is inverted: term -> (slots, sublinear tf). A query touches
+# only the postings of its own terms (np.bincount), divides by the
+# document norms and takes the top k with argpartition: about a
+# millisecond for 50k SKUs. Like BarcodeIndex it is built once per
+# process and patched on writes:
+#   - invalidate(id) re-reads one medicine on the next search;
+#   - invalidate() rebuilds everything;
+#   - new ids added by other processes are picked up by an indexed read.
+# An updated medicine gets a new slot and its old one is marked dead.
+# IDF is computed live for query terms, but a document's norm uses the
+# IDF of when it was indexed. The index therefore compacts itself by
+# rebuilding once a quarter of its slots have changed since the last
+# full build.
+import math
+import re
+import threading
+
+# Default indications, so the shipped catalogue answers symptom queries
+INDICATIONS_BY_CATEGORY = {
+    'analgesic': 'pain painkiller fever headache body ache toothache',
+    'antibiotic': 'infection bacterial throat infection fever antibiotic',
+    'cardiac': 'heart bp blood pressure hypertension cholesterol cardiac',
+    'diabetic': 'diabetes sugar blood sugar glucose',
+    'gi': 'acidity gas stomach indigestion heartburn ulcer digestion',
+    'antihistamine': 'allergy cold sneezing itching runny nose',
+    'antacid': 'acidity gas heartburn indigestion',
+    'vitamin': 'supplement weakness deficiency immunity',
+    'cough': 'cough cold throat',
+}
+INDICATIONS_BY_GENERIC = {
+    'paracetamol': 'fever pain headache',
+    'ibuprofen': 'pain inflammation fever swelling',
+    'diclofenac': 'pain inflammation joint pain',
+    'amoxicillin': 'infection throat ear',
+    'azithromycin': 'infection throat chest',
+    'ramipril': 'bp hypertension blood pressure',
+    'amlodipine': 'bp hypertension blood pressure',
+    'telmisartan': 'bp hypertension blood pressure',
+    'atorvastatin': 'cholesterol lipid',
+    'metformin': 'diabetes sugar',
+    'glimepiride': 'diabetes sugar',
+    'sitagliptin': 'diabetes sugar',
+    'pantoprazole': 'acidity heartburn gerd ulcer',
+    'omeprazole': 'acidity heartburn gerd ulcer',
+    'ranitidine': 'acidity heartburn ulcer',
+    'dicyclomine': 'stomach cramps colic abdominal pain',
+    'cetirizine': 'allergy cold sneezing itching',
+    'levocetirizine': 'allergy cold sneezing itching',
+    'ondansetron': 'vomiting nausea',
+    'loperamide': 'diarrhoea loose motion',
+}
+
+# Query and document words that carry no meaning for matching
+STOPWORDS = frozenset('''
+    a an and any are as at be can do for from give have i in is it me medicine medicines
+    my need of on or please show some something suggest tab tablet tablets the to what
+    which with
+'''.split())
+
+# Field weights: names count more than the category and indications
+FIELD_WEIGHTS = (2, 2, 1, 1)
+
+# Rebuild once this share of slots has changed since the last full build
+COMPACT_RATIO = 0.25
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+CATALOGUE_QUERY = "SELECT id, brand_name, generic_name, category, {indications} FROM medicines"
+
+
+def tokenize(text):
+    """Lower-cased words without stopwords, plural 's' stripped"""
+    words = []
+    for word in _WORD.findall((text or '').lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def default_indications(category, generic):
+    """Indication text for a medicine without its own"""
+    parts = [INDICATIONS_BY_CATEGORY.get((category or '').strip().lower(), '')]
+    for ingredient in _WORD.findall((generic or '').lower()):
+        parts.append(INDICATIONS_BY_GENERIC.get(ingredient, ''))
+    return ' '.join(p for p in parts if p)
+
+
+class MedicineSearch:
+    """TF-IDF cosine search over medicine names, categories and indications"""
+
+    def __init__(self):
+        self._lock = threading.RLock()  # shared by every app session
+        self._warm = False
+        self._stale = set()
+        self._clear()
+        self.builds = 0
+
+    def _clear(self):
+        self._postings = {}     # term -> ([slots], [weights])
+        self._arrays = {}       # term -> (slot array, weight array), built on demand
+        self._df = {}           # term -> live documents containing it
+        self._slot_of = {}      # medicine id -> live slot
+        self._ids = []          # slot -> medicine id
+        self._alive = []
+        self._norms = []
+        self._info = []         # slot -> (brand, generic, category)
+        self._terms_of = []     # slot -> its terms (to undo df on removal)
+        self._dense = None      # (norms, alive) arrays, built on demand
+        self._query_sql = None
+        self._max_id = 0
+        self._changed = 0
+        self._sorted_vocab = None
+
+    # ---------------------------------------------------------------- updates
+    def warm(self, db):
+        """(Re)build the whole index in one pass over the catalogue"""
+        with self._lock:
+            self._clear()
+            for row in db.cursor.execute(self._query(db)).fetchall():
+                self._add(*row)
+            self._changed = 0
+            self._stale.clear()
+            self._warm = True
+            self.builds += 1
+
+    def invalidate(self, medicine_id=None):
+        """Re-read one medicine on the next search (after an edit), or rebuild everything"""
+        if medicine_id is None:
+            self._warm = False
+        else:
+            self._stale.add(medicine_id)
+
+    def sync(self, db):
+        """Apply pending invalidations and pick up medicines added elsewhere"""
+        if not self._warm:
+            self.warm(db)
+            return
+        query = self._query(db)
+        if self._stale:
+            ids = sorted(self._stale)
+            self._stale.clear()
+            found = set()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = db.cursor.execute(
+                    f"{query} WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                for row in rows:
+                    self._add(*row)
+                    found.add(row[0])
+            for medicine_id in set(ids) - found:
+                self._remove(medicine_id)
+        for row in db.cursor.execute(f"{query} WHERE id > ?", (self._max_id,)).fetchall():
+            self._add(*row)
+        if self._changed > COMPACT_RATIO * max(len(self._slot_of), 1):
+            self.warm(db)
+
+    def _query(self, db):
+        if self._query_sql is None:
+            columns = [row[1] for row in db.cursor.execute("PRAGMA table_info(medicines)")]
+            self._query_sql = CATALOGUE_QUERY.format(
+                indications='indications' if 'indications' in columns else 'NULL')
+        return self._query_sql
+
+    def _add(self, medicine_id, brand, generic, category, indications):
+        if medicine_id in self._slot_of:
+            self._remove(medicine_id)
+        counts = {}
+        fields = (brand, generic, category, indications or default_indications(category, generic))
+        for weight, text in zip(FIELD_WEIGHTS, fields):
+            for term in tokenize(text):
+                counts[term] = counts.get(term, 0) + weight
+
+        slot = len(self._ids)
+        n_docs = len(self._slot_of) + 1
+        norm = 0.0
+        for term, count in counts.items():
+            tf = 1.0 + math.log(count)
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = ([], [])
+                self._sorted_vocab = None
+            postings[0].append(slot)
+            postings[1].append(tf)
+            self._arrays.pop(term, None)
+            self._df[term] = self._df.get(term, 0) + 1
+            norm += (tf * self._idf(term, n_docs)) ** 2
+        self._ids.append(medicine_id)
+        self._alive.append(True)
+        self._norms.append(math.sqrt(norm) or 1.0)
+        self._info.append((brand, generic, category))
+        self._terms_of.append(tuple(counts))
+        self._slot_of[medicine_id] = slot
+        self._dense = None
+        self._max_id = max(self._max_id, medicine_id)
+        if self._warm:
+            self._changed += 1
+
+    def _remove(self, medicine_id):
+        slot = self._slot_of.pop(medicine_id, None)
+        if slot is None:
+            return
+        self._alive[slot] = False
+        self._dense = None
+        for term in self._terms_of[slot]:
+            self._df[term] -= 1
+        self._changed += 1
+
+    # ----------------------------------------------------------------- search
+    def _idf(self, term, n_docs):
+        return math.log((1 + n_docs) / (1 + self._df.get(term, 0))) + 1.0
+
+    def _terms(self, query):
+        """Query terms with weights; unknown words expand to vocabulary words they prefix"""
+        import bisect
+
+        weights = {}
+        for word in tokenize(query):
+            if word in self._postings:
+                weights[word] = weights.get(word, 0) + 1.0
+                continue
+            if len(word) < 3:
+                continue
+            if self._sorted_vocab is None:
+                self._sorted_vocab = sorted(self._postings)
+            start = bisect.bisect_left(self._sorted_vocab, word)
+            for term in self._sorted_vocab[start:start + 10]:
+                if not term.startswith(word):
+                    break
+                weights[term] = weights.get(term, 0) + 0.5
+        return weights
+
+    def search(self, db, query, k=10, min_score=0.05):
+        """Best k matches as dicts (id, brand_name, generic_name, category, score)"""
+        with self._lock:
+            self.sync(db)
+            return self._search(query, k, min_score)
+
+    def _search(self, query, k, min_score):
+        import numpy as np
+
+        terms = self._terms(query)
+        if not terms or not self._slot_of:
+            return []
+        n_slots = len(self._ids)
+        n_docs = len(self._slot_of)
+        scores = np.zeros(n_slots)
+        query_norm = 0.0
+        for term, weight in terms.items():
+            arrays = self._arrays.get(term)
+            if arrays is None:
+                slots, tfs = self._postings[term]
+                arrays = self._arrays[term] = (np.array(slots, dtype=np.int64),
+                                               np.array(tfs, dtype=float))
+            idf = self._idf(term, n_docs)
+            query_norm += (weight * idf) ** 2
+            scores += np.bincount(arrays[0], weights=arrays[1] * (weight * idf * idf),
+                                  minlength=n_slots)
+        if self._dense is None:
+            self._dense = (np.array(self._norms), np.array(self._alive))
+        norms, alive = self._dense
+        scores /= norms * math.sqrt(query_norm)
+        scores[~alive] = 0.0
+
+        k = min(k, n_slots)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        results = []
+        for slot in top:
+            if scores[slot] < min_score:
+                break
+            brand, generic, category = self._info[slot]
+            results.append({'id': self._ids[slot], 'brand_name': brand, 'generic_name': generic,
+                            'category': category, 'score': round(float(scores[slot]), 4)})
+        return results
+
+    def __len__(self):
+        return len(self._slot_of)
@@ -0,0 +1,277 @@
+# ============================================================================
+# PRAGNYA PHARM - Columnar sales snapshot for long-range analytics
+# ============================================================================
+# Closed months of `sales` are exported to Parquet, one Hive-style partition
+# per month (snapshots/sales/month=2026-09/part.parquet), so DuckDB, Polars
+# or pyarrow can read them directly. Each line carries what the analytics
+# page aggregates: units, line amount, its share of the bill total (revenue)
+# and a bill counter set on the bill's first line.
+#
+# SalesAnalytics answers daily sales and top-medicine queries from the
+# snapshot for months before its watermark and from SQLite for the rest, so
+# results match the live database up to the last snapshot run.
+#
+#   python -m pragnya.snapshot [--db pharmacy.db] [--dir snapshots/sales]
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Per line: bill revenue is split across lines by line amount so that the
+# lines of a bill sum to its total; unbilled (Excel) lines count at their
+# own amount, as in IndianPharmacyDB.get_daily_sales
+SNAPSHOT_QUERY = '''
+    SELECT s.sale_date, s.id AS sale_id, s.bill_id, s.medicine_id,
+           COALESCE(m.brand_name, 'Unknown') AS brand_name,
+           s.quantity, s.total_amount AS amount,
+           CASE WHEN s.bill_id IS NULL THEN s.total_amount
+                WHEN b.subtotal > 0 THEN b.total * s.total_amount / b.subtotal
+                ELSE 0 END AS revenue,
+           CASE WHEN s.bill_id IS NOT NULL
+                 AND ROW_NUMBER() OVER (PARTITION BY s.bill_id ORDER BY s.id) = 1
+                THEN 1 ELSE 0 END AS bills
+    FROM {sales} s
+    LEFT JOIN {bills} b ON s.bill_id = b.id
+    LEFT JOIN medicines m ON s.medicine_id = m.id
+    WHERE s.sale_date >= ? AND s.sale_date < ?
+    ORDER BY s.sale_date, s.id
+'''
+
+
+def month_start(day=None):
+    day = day or date.today()
+    return day.replace(day=1)
+
+
+def next_month(month):
+    """'YYYY-MM' -> first day of the following month as 'YYYY-MM-DD'"""
+    year, mon = map(int, month.split('-'))
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+
+
+class SalesSnapshot:
+    """Month-partitioned Parquet copy of closed months of sales"""
+
+    def __init__(self, directory='snapshots/sales'):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'watermark': None, 'months': {}}
+
+    @property
+    def watermark(self):
+        """First day not covered by the snapshot ('YYYY-MM-DD'), or None"""
+        return self.manifest['watermark']
+
+    def months(self):
+        return sorted(self.manifest['months'])
+
+    def refresh(self, db, today=None):
+        """Write every closed month whose sales changed since the last run
+
+        `db` is an IndianPharmacyDB; archived periods are read through its
+        archive. Returns the list of months written.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        watermark = month_start(today).isoformat()
+        conn = db.conn
+        sources = {'sales': db.archive.source('sales', None, watermark),
+                   'bills': db.archive.source('bills', None, watermark)}
+        # Row count and max id per month detect new or late (backdated) lines
+        current = {
+            month: [rows, max_id]
+            for month, rows, max_id in conn.execute(f'''
+                SELECT substr(sale_date, 1, 7), COUNT(*), MAX(id)
+                FROM {sources['sales']} WHERE sale_date < ?
+                GROUP BY 1
+            ''', (watermark,))
+        }
+        written = []
+        for month, state in sorted(current.items()):
+            if self.manifest['months'].get(month) == state:
+                continue
+            cursor = conn.execute(SNAPSHOT_QUERY.format(**sources),
+                                  (f"{month}-01", next_month(month)))
+            columns = [d[0] for d in cursor.description]
+            values = list(zip(*cursor.fetchall())) or [[] for _ in columns]
+            arrays = dict(zip(columns, values))
+            table = pa.table({
+                'sale_date': pc.cast(pc.strptime(pa.array(arrays['sale_date'], pa.string()),
+                                                 format='%Y-%m-%d', unit='s', error_is_null=True),
+                                     pa.date32()),
+                'sale_id': pa.array(arrays['sale_id'], pa.int64()),
+                'bill_id': pa.array(arrays['bill_id'], pa.int64()),
+                'medicine_id': pa.array(arrays['medicine_id'], pa.int64()),
+                'brand_name': pa.array(arrays['brand_name'], pa.string()),
+                'quantity': pa.array(arrays['quantity'], pa.int64()),
+                'amount': pa.array(arrays['amount'], pa.float64()),
+                'revenue': pa.array(arrays['revenue'], pa.float64()),
+                'bills': pa.array(arrays['bills'], pa.int32()),
+            })
+            partition = os.path.join(self.directory, f"month={month}")
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, 'part.parquet')
+            pq.write_table(table, path + '.tmp', compression='zstd')
+            os.replace(path + '.tmp', path)
+            self.manifest['months'][month] = state
+            written.append(month)
+
+        self.manifest['watermark'] = watermark
+        self._save_manifest()
+        return written
+
+    def _save_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def read(self, start, end, columns):
+        """Snapshot lines with start <= sale_date <= end as a pyarrow Table"""
+        import pyarrow.dataset as ds
+
+        months = [m for m in self.months() if start[:7] <= m <= end[:7]]
+        if not months:
+            return None
+        # Only the partitions in range are opened
+        dataset = ds.dataset([os.path.join(self.directory, f"month={m}", 'part.parquet')
+                              for m in months], format='parquet')
+        day = ds.field('sale_date')
+        return dataset.to_table(columns=columns, filter=(day >= date.fromisoformat(start))
+                                & (day <= date.fromisoformat(end)))
+
+
+class SalesAnalytics:
+    """Sales aggregates from the Parquet snapshot plus live SQLite data"""
+
+    def __init__(self, db, snapshot=None):
+        self.db = db
+        self.snapshot = snapshot
+
+    def _split(self, start, end):
+        """(snapshot range or None, live range or None) for start..end"""
+        watermark = self.snapshot.watermark if self.snapshot else None
+        if not watermark or start >= watermark:
+            return None, (start, end)
+        last_closed = date.fromordinal(date.fromisoformat(watermark).toordinal() - 1).isoformat()
+        if end < watermark:
+            return (start, end), None
+        return (start, last_closed), (watermark, end)
+
+    def daily_sales(self, start, end):
+        """Same frame as IndianPharmacyDB.get_daily_sales"""
+        import pandas as pd
+
+        old, live = self._split(start, end)
+        frames = []
+        if old:
+            table = self.snapshot.read(*old, ['sale_date', 'revenue', 'quantity', 'bills'])
+            if table is not None and table.num_rows:
+                daily = table.group_by('sale_date').aggregate(
+                    [('revenue', 'sum'), ('quantity', 'sum'), ('bills', 'sum')]).to_pandas()
+                daily = daily.rename(columns={'revenue_sum': 'daily_revenue',
+                                              'quantity_sum': 'daily_quantity',
+                                              'bills_sum': 'daily_bills'})
+                daily['sale_date'] = daily['sale_date'].astype(str)
+                frames.append(daily[['sale_date', 'daily_revenue', 'daily_quantity', 'daily_bills']])
+        if live:
+            frames.append(self.db.get_daily_sales(*live))
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return self.db.get_daily_sales(start, end)
+        return pd.concat(frames, ignore_index=True).sort_values('sale_date', ignore_index=True)
+
+    def top_medicines(self, start, end, limit=10):
+        """Best sellers by units: brand_name, total_sold, total_revenue"""
+        import pandas as pd
+
+        old, live = self._split(start, end)
+        frames = []
+        if old:
+            # Group on the integer id and name medicines as they are now, like
+            # the live query's join does; reading names per line is slower
+            table = self.snapshot.read(*old, ['medicine_id', 'quantity', 'amount'])
+            if table is not None and table.num_rows:
+                top = table.group_by('medicine_id').aggregate(
+                    [('quantity', 'sum'), ('amount', 'sum')]).to_pandas()
+                names = dict(self.db.conn.execute("SELECT id, brand_name FROM medicines"))
+                top['brand_name'] = top['medicine_id'].map(names).fillna('Unknown')
+                frames.append(top.rename(columns={'quantity_sum': 'total_sold',
+                                                  'amount_sum': 'total_revenue'})
+                              [['brand_name', 'total_sold', 'total_revenue']])
+        if live:
+            frames.append(pd.read_sql_query(f'''
+                SELECT COALESCE(m.brand_name, 'Unknown') AS brand_name,
+                       SUM(s.quantity) AS total_sold, SUM(s.total_amount) AS total_revenue
+                FROM {self.db.archive.source('sales', *live)} s
+                LEFT JOIN medicines m ON s.medicine_id = m.id
+                WHERE s.sale_date BETWEEN ? AND ?
+                GROUP BY 1
+            ''', self.db.conn, params=live))
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=['brand_name', 'total_sold', 'total_revenue'])
+        merged = pd.concat(frames).groupby('brand_name', as_index=False)[
+            ['total_sold', 'total_revenue']].sum()
+        return merged.sort_values('total_sold', ascending=False).head(limit).reset_index(drop=True)
+
+
+def open_analytics(db, directory='snapshots/sales'):
+    """SalesAnalytics over `directory`, or SQLite-only when pyarrow is missing"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.info("pyarrow not installed; analytics read SQLite only")
+        return SalesAnalytics(db)
+    return SalesAnalytics(db, SalesSnapshot(directory))
+
+
+def refresh_snapshot(db_file='pharmacy.db', directory='snapshots/sales'):
+    """Refresh the snapshot from its own connection (safe to run in a thread)"""
+    from pragnya.db import IndianPharmacyDB
+
+    try:
+        db = IndianPharmacyDB(db_file)
+        try:
+            return SalesSnapshot(directory).refresh(db)
+        finally:
+            db.conn.close()
+    except ImportError:
+        logger.info("pyarrow not installed; skipping sales snapshot")
+    except Exception:
+        logger.exception("Sales snapshot refresh failed")
+    return []
+
+
+def main():
+    from pragnya.db import IndianPharmacyDB
+
+    parser = argparse.ArgumentParser(description='Snapshot closed months of sales to Parquet')
+    parser.add_argument('--db', default='pharmacy.db')
+    parser.add_argument('--dir', default='snapshots/sales')
+    args = parser.parse_args()
+
+    snapshot = SalesSnapshot(args.dir)
+    written = snapshot.refresh(IndianPharmacyDB(args.db))
+    print(f"Snapshot through {snapshot.watermark}: wrote {len(written)} month(s) "
+          f"{', '.join(written)}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# ============================================================================
+# PRAGNYA PHARM - Multi-store registry and chain-wide consolidation
+# ============================================================================
+# Every branch keeps its own SQLite database (its own write lock, its own
+# fast local queries); stores.json lists them:
+#
+#   {"stores": [{"code": "HYD1", "name": "Hyderabad Main", "db_file": "stores/HYD1.db"},
+#               {"code": "SEC2", "name": "Secunderabad", "db_file": "stores/SEC2.db"}]}
+#
+# Without a registry the chain is the single store MAIN on pharmacy.db.
+#
+# ChainView fans one read-only query out to every store in parallel and
+# concatenates the results with a `store` column. The worker is a plain
+# module-level function over a file path, so a ThreadPoolExecutor (sqlite3
+# releases the GIL while a query runs) or a ProcessPoolExecutor both work.
+# A store whose database cannot be read is reported in `errors` and left
+# out of the merge instead of failing the whole dashboard.
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = {'code': 'MAIN', 'name': 'Main Store', 'db_file': 'pharmacy.db'}
+
+# Transfers keep this multiple of a donor's min_quantity on its shelf and
+# never move batches this close to expiry
+KEEP_FACTOR = 1.5
+TRANSFER_MIN_SHELF_DAYS = 60
+
+
+def load_stores(path='stores.json'):
+    """Store dicts (code, name, db_file) from the registry, relative to its folder"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            stores = json.load(f)['stores']
+    except FileNotFoundError:
+        return [dict(DEFAULT_STORE)]
+    base = os.path.dirname(os.path.abspath(path))
+    for store in stores:
+        store.setdefault('name', store['code'])
+        if not os.path.isabs(store['db_file']):
+            store['db_file'] = os.path.join(base, store['db_file'])
+    return stores
+
+
+def get_store(code=None, path='stores.json'):
+    """One store from the registry (the first one when `code` is None)"""
+    stores = load_stores(path)
+    if code is None:
+        return stores[0]
+    for store in stores:
+        if store['code'] == code:
+            return store
+    raise KeyError(f"Unknown store {code!r}; registered: {', '.join(s['code'] for s in stores)}")
+
+
+def run_query(db_file, sql, params=()):
+    """Run one read-only query on a store database; returns (columns, rows)"""
+    uri = pathlib.Path(db_file).absolute().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        conn.execute("PRAGMA busy_timeout=2000")
+        cursor = conn.execute(sql, params)
+        return [d[0] for d in cursor.description], cursor.fetchall()
+    finally:
+        conn.close()
+
+
+class ChainView:
+    """Parallel, merged read queries over every store database"""
+
+    STOCK_QUERY = '''
+        SELECT brand_name, generic_name,
+               SUM(quantity) AS quantity,
+               SUM(CASE WHEN expiry_date > ? THEN quantity ELSE 0 END) AS transferable,
+               MAX(min_quantity) AS min_quantity,
+               MAX(mrp) AS mrp,
+               SUM(quantity * COALESCE(purchase_price, 0)) AS stock_value,
+               MIN(expiry_date) AS earliest_expiry
+        FROM medicines
+        GROUP BY brand_name, generic_name
+    '''
+    STOCK_COLUMNS = ['brand_name', 'generic_name', 'quantity', 'transferable', 'min_quantity',
+                     'mrp', 'stock_value', 'earliest_expiry']
+
+    EXPIRY_QUERY = '''
+        SELECT brand_name, batch_no, expiry_date, quantity,
+               quantity * COALESCE(purchase_price, 0) AS value_at_risk,
+               CAST(julianday(expiry_date) - julianday('now') AS INTEGER) AS days_to_expiry
+        FROM medicines
+        WHERE quantity > 0 AND expiry_date <= ?
+        ORDER BY expiry_date
+    '''
+    EXPIRY_COLUMNS = ['brand_name', 'batch_no', 'expiry_date', 'quantity', 'value_at_risk',
+                      'days_to_expiry']
+
+    SALES_QUERY = '''
+        SELECT day AS sale_date, SUM(revenue) AS revenue, SUM(units) AS units, SUM(bills) AS bills
+        FROM (
+            SELECT bill_date AS day, total AS revenue, 0 AS units, 1 AS bills
+            FROM bills WHERE bill_date BETWEEN ? AND ?
+            UNION ALL
+            SELECT sale_date, CASE WHEN bill_id IS NULL THEN total_amount ELSE 0 END, quantity, 0
+            FROM sales WHERE sale_date BETWEEN ? AND ?
+        )
+        GROUP BY day
+    '''
+    SALES_COLUMNS = ['sale_date', 'revenue', 'units', 'bills']
+
+    def __init__(self, stores=None, executor=None, max_workers=8):
+        self.stores = stores if stores is not None else load_stores()
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers,
+                                                       thread_name_prefix='chain')
+        self.errors = {}
+
+    def query(self, sql, params=(), columns=None):
+        """Run `sql` on every store in parallel; DataFrame with a leading `store` column
+
+        `columns` names the result columns for when no store answers, so
+        callers still get an empty frame they can sort and group.
+        """
+        import pandas as pd
+
+        futures = [(store, self.executor.submit(run_query, store['db_file'], sql, params))
+                   for store in self.stores]
+        frames, self.errors = [], {}
+        for store, future in futures:
+            try:
+                names, rows = future.result()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("Store %s unavailable: %s", store['code'], e)
+                self.errors[store['code']] = str(e)
+                continue
+            frame = pd.DataFrame(rows, columns=names)
+            frame.insert(0, 'store', store['code'])
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=['store'] + (columns or []))
+        return pd.concat(frames, ignore_index=True)
+
+    def stock(self):
+        """Per-store stock by medicine"""
+        safe_expiry = (date.today() + timedelta(days=TRANSFER_MIN_SHELF_DAYS)).isoformat()
+        return self.query(self.STOCK_QUERY, (safe_expiry,), self.STOCK_COLUMNS)
+
+    def expiring(self, days=90):
+        """Batches expiring within `days` in every store, soonest first"""
+        limit = (date.today() + timedelta(days=days)).isoformat()
+        frame = self.query(self.EXPIRY_QUERY, (limit,), self.EXPIRY_COLUMNS)
+        if frame.empty:
+            return frame
+        return frame.sort_values('expiry_date', ignore_index=True)
+
+    def daily_sales(self, start, end):
+        """Per-store daily revenue, units and bills between two 'YYYY-MM-DD' dates"""
+        frame = self.query(self.SALES_QUERY, (start, end, start, end), self.SALES_COLUMNS)
+        if frame.empty:
+            return frame
+        return frame.sort_values(['sale_date', 'store'], ignore_index=True)
+
+    def summary(self, expiry_days=90):
+        """One row per store: medicines, units, stock value, low stock, expiring"""
+        import pandas as pd
+
+        stock = self.stock()
+        if stock.empty:
+            return pd.DataFrame(columns=['store', 'medicines', 'units', 'stock_value',
+                                         'low_stock', 'expiring'])
+        expiring = self.expiring(expiry_days).groupby('store').size()
+        stock['low'] = stock['quantity'] <= stock['min_quantity']
+        summary = stock.groupby('store').agg(medicines=('brand_name', 'count'),
+                                             units=('quantity', 'sum'),
+                                             stock_value=('stock_value', 'sum'),
+                                             low_stock=('low', 'sum')).reset_index()
+        summary['expiring'] = summary['store'].map(expiring).fillna(0).astype(int)
+        return summary
+
+    def transfer_suggestions(self, stock=None):
+        """Move surplus from well-stocked stores to stores below min_quantity
+
+        A donor keeps KEEP_FACTOR x its min_quantity and only gives batches
+        with at least TRANSFER_MIN_SHELF_DAYS of shelf life. For each
+        medicine the biggest surplus is matched to the biggest shortage.
+        """
+        import pandas as pd
+
+        stock = self.stock() if stock is None else stock
+        suggestions = []
+        for brand, rows in stock.groupby('brand_name'):
+            needs = []
+            gives = []
+            for row in rows.itertuples(index=False):
+                minimum = row.min_quantity or 0
+                if row.quantity < minimum:
+                    needs.append([minimum - row.quantity, row.store])
+                surplus = min(row.transferable, row.quantity - int(minimum * KEEP_FACTOR))
+                if surplus > 0:
+                    gives.append([surplus, row.store])
+            if not needs or not gives:
+                continue
+            needs.sort(reverse=True)
+            gives.sort(reverse=True)
+            for need in needs:
+                for give in gives:
+                    if need[0] <= 0:
+                        break
+                    qty = min(need[0], give[0])
+                    if qty <= 0:
+                        continue
+                    suggestions.append({'brand_name': brand, 'from_store': give[1],
+                                        'to_store': need[1], 'quantity': int(qty)})
+                    need[0] -= qty
+                    give[0] -= qty
+        return pd.DataFrame(suggestions, columns=['brand_name', 'from_store', 'to_store', 'quantity'])
+
+    def close(self):
+        self.executor.shutdown(wait=False)
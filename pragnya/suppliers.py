@@ -0,0 +1,368 @@
+# ============================================================================
+# PRAGNYA PHARM - Suppliers: medicine mapping, lead times, purchase orders
+# ============================================================================
+# medicine_suppliers maps each medicine to the suppliers it can be bought
+# from; the `preferred` one gets its purchase orders, at its unit_cost when
+# set, else the medicine's purchase_price.
+#
+# generate_purchase_orders() turns the Pending reorder_queue into one Draft
+# purchase order per supplier in a single transaction. Duplicate requests
+# for a medicine (every sale below minimum queues one) become one line for
+# the largest quantity asked. The requests move to 'Ordered' with their
+# po_id; medicines without a preferred supplier stay Pending.
+#
+# Receiving an order adds its lines to stock and records the supplier's
+# lead time (sent, or else created, to received). lead_time_stats() keeps
+# rolling statistics over the last LEAD_TIME_WINDOW receipts, and
+# safety_stock() turns them into stock that covers demand and lead-time
+# variability at the SERVICE_Z service level:
+#
+#   safety stock = z * sqrt(L * sd_demand^2 + demand^2 * sd_L^2)
+#
+# Suppliers with fewer than two receipts use DEFAULT_LEAD_DAYS and a
+# standard deviation of DEFAULT_LEAD_CV x their mean.
+import logging
+import math
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+PO_STATUSES = ('Draft', 'Sent', 'Received', 'Cancelled')
+LEAD_TIME_WINDOW = 20
+DEFAULT_LEAD_DAYS = 7.0
+DEFAULT_LEAD_CV = 0.25
+SERVICE_Z = 1.65  # ~95% of lead times covered
+
+UNIT_COST = 'COALESCE(ms.unit_cost, m.purchase_price, m.mrp * 0.6, 0)'
+
+LEAD_STATS_QUERY = '''
+    SELECT supplier_id, COUNT(*), AVG(lead_days), AVG(lead_days * lead_days),
+           MIN(lead_days), MAX(lead_days), MAX(received_date)
+    FROM (SELECT supplier_id, lead_days, received_date,
+                 ROW_NUMBER() OVER (PARTITION BY supplier_id
+                                    ORDER BY received_date DESC, id DESC) AS recent
+          FROM supplier_lead_times)
+    WHERE recent <= ?
+    GROUP BY supplier_id
+'''
+
+
+def default_lead_time():
+    """Lead-time statistics assumed for a supplier without history"""
+    return {'receipts': 0, 'mean_days': DEFAULT_LEAD_DAYS,
+            'std_days': DEFAULT_LEAD_DAYS * DEFAULT_LEAD_CV,
+            'min_days': None, 'max_days': None, 'last_received': None}
+
+
+def safety_stock(daily_demand, demand_std, lead_days, lead_std, z=SERVICE_Z):
+    """Units covering demand and lead-time variability over one lead time"""
+    return math.ceil(z * math.sqrt(lead_days * demand_std ** 2 + daily_demand ** 2 * lead_std ** 2))
+
+
+class SupplierBook:
+    """Medicine-supplier mapping, lead-time history and purchase orders of one database"""
+
+    def __init__(self, db):
+        self.db = db
+
+    # ------------------------------------------------------------- mapping
+    def map_medicines(self, medicine_ids, supplier_id, unit_cost=None):
+        """Make `supplier_id` the preferred supplier of these medicines; returns the count"""
+        return self._map([(int(i), supplier_id, unit_cost) for i in medicine_ids])
+
+    def _map(self, rows):
+        """Upsert preferred (medicine_id, supplier_id, unit_cost) mappings in one transaction"""
+        rows = list({row[0]: row for row in rows}.values())  # one preferred supplier per medicine
+        cursor = self.db.cursor
+        try:
+            cursor.executemany("UPDATE medicine_suppliers SET preferred = 0 WHERE medicine_id = ?",
+                               [(row[0],) for row in rows])
+            cursor.executemany('''
+                INSERT INTO medicine_suppliers (medicine_id, supplier_id, unit_cost, preferred)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT (medicine_id, supplier_id) DO UPDATE SET
+                    unit_cost = COALESCE(excluded.unit_cost, unit_cost), preferred = 1
+            ''', rows)
+            self.db.conn.commit()
+        except Exception:
+            self.db.conn.rollback()
+            raise
+        return len(rows)
+
+    def map_company(self, company, supplier_id):
+        """Make `supplier_id` the preferred supplier of every medicine made by `company`"""
+        ids = [row[0] for row in self.db.cursor.execute(
+            "SELECT id FROM medicines WHERE company = ?", (company,)).fetchall()]
+        return self.map_medicines(ids, supplier_id)
+
+    def import_mapping(self, df):
+        """Bulk mapping from a sheet with 'Supplier', 'Medicine ID' or 'Brand Name', optional 'Unit Cost'
+
+        Runs in a single transaction. Rows naming an unknown supplier or
+        medicine are skipped and counted.
+        """
+        suppliers = dict(self.db.cursor.execute("SELECT name, id FROM suppliers").fetchall())
+        names = dict(self.db.cursor.execute("SELECT brand_name, id FROM medicines").fetchall())
+        rows = []
+        skipped = 0
+        for row in df.to_dict('records'):
+            supplier_id = suppliers.get(row.get('Supplier'))
+            medicine_id = row.get('Medicine ID')
+            if medicine_id is None or str(medicine_id) == 'nan':
+                medicine_id = names.get(row.get('Brand Name'))
+            if supplier_id is None or medicine_id is None:
+                skipped += 1
+                continue
+            cost = row.get('Unit Cost')
+            rows.append((int(medicine_id), supplier_id,
+                         None if cost is None or str(cost) == 'nan' else float(cost)))
+        try:
+            mapped = self._map(rows)
+        except Exception as e:
+            return False, f"Error: {str(e)}"
+        return True, f"Mapped {mapped} medicines ({skipped} rows skipped)"
+
+    def unmapped_count(self):
+        """Medicines without a preferred supplier"""
+        return self.db.cursor.execute('''
+            SELECT COUNT(*) FROM medicines m
+            WHERE NOT EXISTS (SELECT 1 FROM medicine_suppliers ms
+                              WHERE ms.medicine_id = m.id AND ms.preferred = 1)
+        ''').fetchone()[0]
+
+    def supplier_for(self, medicine_id):
+        """(supplier id, name, email, unit cost) of a medicine's preferred supplier, or None"""
+        return self.db.cursor.execute(f'''
+            SELECT s.id, s.name, s.email, {UNIT_COST}
+            FROM medicine_suppliers ms
+            JOIN suppliers s ON s.id = ms.supplier_id
+            JOIN medicines m ON m.id = ms.medicine_id
+            WHERE ms.medicine_id = ? AND ms.preferred = 1
+        ''', (medicine_id,)).fetchone()
+
+    # ---------------------------------------------------------- lead times
+    def record_lead_time(self, supplier_id, ordered_date, received_date, po_id=None, commit=True):
+        """Record one delivery; dates are 'YYYY-MM-DD'. Returns the lead time in days."""
+        lead_days = (date.fromisoformat(str(received_date)[:10]) -
+                     date.fromisoformat(str(ordered_date)[:10])).days
+        if lead_days < 0:
+            raise ValueError(f"received {received_date} before ordered {ordered_date}")
+        self.db.cursor.execute('''
+            INSERT INTO supplier_lead_times (supplier_id, po_id, ordered_date, received_date, lead_days)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (supplier_id, po_id, str(ordered_date)[:10], str(received_date)[:10], lead_days))
+        if commit:
+            self.db.conn.commit()
+        return lead_days
+
+    def lead_time_stats(self, window=LEAD_TIME_WINDOW):
+        """{supplier_id: receipts, mean_days, std_days, min_days, max_days, last_received}
+
+        Over each supplier's last `window` receipts; suppliers without
+        history are absent (use default_lead_time()).
+        """
+        stats = {}
+        for supplier_id, n, mean, mean_sq, low, high, last in self.db.cursor.execute(
+                LEAD_STATS_QUERY, (window,)).fetchall():
+            if n >= 2:
+                std = math.sqrt(max(mean_sq - mean * mean, 0.0) * n / (n - 1))
+            else:
+                std = mean * DEFAULT_LEAD_CV
+            stats[supplier_id] = {'receipts': n, 'mean_days': round(mean, 2), 'std_days': round(std, 2),
+                                  'min_days': low, 'max_days': high, 'last_received': last}
+        return stats
+
+    def suppliers(self):
+        """Every supplier with its mapped medicines, open orders and lead-time statistics"""
+        import pandas as pd
+
+        frame = pd.read_sql_query('''
+            SELECT s.id, s.name, s.phone, s.email, s.city, s.payment_terms,
+                   (SELECT COUNT(*) FROM medicine_suppliers ms
+                    WHERE ms.supplier_id = s.id AND ms.preferred = 1) AS medicines,
+                   (SELECT COUNT(*) FROM purchase_orders po
+                    WHERE po.supplier_id = s.id AND po.status IN ('Draft', 'Sent')) AS open_orders
+            FROM suppliers s ORDER BY s.name
+        ''', self.db.conn)
+        stats = self.lead_time_stats()
+        rows = [stats.get(i, default_lead_time()) for i in frame['id']]
+        for key in ('receipts', 'mean_days', 'std_days', 'last_received'):
+            frame[key] = [row[key] for row in rows]
+        return frame
+
+    # ----------------------------------------------------- purchase orders
+    def generate_purchase_orders(self, reorder_ids=None):
+        """Draft one purchase order per supplier from Pending reorder requests
+
+        `reorder_ids` limits it to those requests. Returns (orders as dicts
+        with id, po_no, supplier_id, lines, total; medicines left Pending
+        for want of a preferred supplier).
+        """
+        where, params = "r.status = 'Pending'", []
+        if reorder_ids is not None:
+            reorder_ids = [int(i) for i in reorder_ids]
+            if not reorder_ids:
+                return [], 0
+            where += f" AND r.id IN ({','.join('?' * len(reorder_ids))})"
+            params = reorder_ids
+        conn = self.db.conn
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            wanted = conn.execute(f'''
+                SELECT ms.supplier_id, r.medicine_id, MAX(r.quantity), {UNIT_COST}
+                FROM reorder_queue r
+                JOIN medicines m ON m.id = r.medicine_id
+                LEFT JOIN medicine_suppliers ms ON ms.medicine_id = r.medicine_id AND ms.preferred = 1
+                WHERE {where}
+                GROUP BY r.medicine_id
+                HAVING MAX(r.quantity) > 0
+                ORDER BY ms.supplier_id, r.medicine_id
+            ''', params).fetchall()
+            per_supplier = {}
+            unassigned = 0
+            for supplier_id, medicine_id, quantity, cost in wanted:
+                if supplier_id is None:
+                    unassigned += 1
+                else:
+                    per_supplier.setdefault(supplier_id, []).append((medicine_id, quantity, cost))
+
+            orders = []
+            today = date.today()
+            stats = self.lead_time_stats()
+            for supplier_id, lines in per_supplier.items():
+                lead = stats.get(supplier_id, default_lead_time())['mean_days']
+                expected = date.fromordinal(today.toordinal() + math.ceil(lead)).isoformat()
+                total = round(sum(quantity * cost for _, quantity, cost in lines), 2)
+                po_id = conn.execute('''
+                    INSERT INTO purchase_orders (supplier_id, status, expected_date, item_count, total)
+                    VALUES (?, 'Draft', ?, ?, ?)
+                ''', (supplier_id, expected, len(lines), total)).lastrowid
+                po_no = f"PO-{today.strftime('%Y%m%d')}-{po_id:05d}"
+                conn.execute("UPDATE purchase_orders SET po_no = ? WHERE id = ?", (po_no, po_id))
+                conn.executemany('''
+                    INSERT INTO purchase_order_lines (po_id, medicine_id, quantity, unit_cost, amount)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(po_id, medicine_id, quantity, cost, round(quantity * cost, 2))
+                      for medicine_id, quantity, cost in lines])
+                conn.executemany(f'''
+                    UPDATE reorder_queue AS r SET status = 'Ordered', po_id = ?
+                    WHERE {where} AND r.medicine_id = ?
+                ''', [[po_id] + params + [medicine_id] for medicine_id, _, _ in lines])
+                orders.append({'id': po_id, 'po_no': po_no, 'supplier_id': supplier_id,
+                               'lines': len(lines), 'total': total})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Drafted %d purchase orders; %d medicines have no supplier", len(orders), unassigned)
+        return orders, unassigned
+
+    def purchase_orders(self, status=None, limit=200):
+        """Purchase orders with their supplier, newest first"""
+        import pandas as pd
+
+        where = "WHERE po.status = ?" if status else ""
+        return pd.read_sql_query(f'''
+            SELECT po.id, po.po_no, s.name AS supplier, po.status, po.created_date, po.sent_date,
+                   po.expected_date, po.received_date, po.item_count, po.total
+            FROM purchase_orders po LEFT JOIN suppliers s ON s.id = po.supplier_id
+            {where} ORDER BY po.id DESC LIMIT ?
+        ''', self.db.conn, params=([status] if status else []) + [limit])
+
+    def order_lines(self, po_id):
+        """Lines of one purchase order"""
+        import pandas as pd
+
+        return pd.read_sql_query('''
+            SELECT m.brand_name, m.generic_name, m.company, l.quantity, l.unit_cost, l.amount
+            FROM purchase_order_lines l JOIN medicines m ON m.id = l.medicine_id
+            WHERE l.po_id = ? ORDER BY m.brand_name
+        ''', self.db.conn, params=(po_id,))
+
+    def _status(self, po_id):
+        row = self.db.cursor.execute(
+            "SELECT status, supplier_id, COALESCE(sent_date, date(created_date)) FROM purchase_orders "
+            "WHERE id = ?", (po_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"no purchase order {po_id}")
+        return row
+
+    def mark_sent(self, po_id, sent_date=None):
+        """Draft -> Sent; the lead time is measured from this date"""
+        if self._status(po_id)[0] != 'Draft':
+            raise ValueError(f"purchase order {po_id} is not a draft")
+        self.db.cursor.execute("UPDATE purchase_orders SET status = 'Sent', sent_date = ? WHERE id = ?",
+                               (str(sent_date or date.today())[:10], po_id))
+        self.db.conn.commit()
+
+    def email_order(self, po_id, store_name='Pragnya Pharm'):
+        """Queue a draft order's email to its supplier and mark it Sent; returns the outbox id
+
+        The email goes out in the background (pragnya.outbox).
+        """
+        status, supplier_id, _ = self._status(po_id)
+        if status != 'Draft':
+            raise ValueError(f"purchase order {po_id} is not a draft")
+        po_no, name, email = self.db.cursor.execute(
+            "SELECT po.po_no, s.name, s.email FROM purchase_orders po JOIN suppliers s ON s.id = po.supplier_id "
+            "WHERE po.id = ?", (po_id,)).fetchone()
+        if not email:
+            raise ValueError(f"{name} has no email address")
+        lines = self.db.cursor.execute('''
+            SELECT m.brand_name, m.generic_name, l.quantity FROM purchase_order_lines l
+            JOIN medicines m ON m.id = l.medicine_id WHERE l.po_id = ? ORDER BY m.brand_name
+        ''', (po_id,)).fetchall()
+        items = [f"  {brand} ({generic or '-'}) x {quantity}" for brand, generic, quantity in lines]
+        body = '\n'.join([f"Dear {name},", '', f"Please supply the following against purchase order {po_no}:", '',
+                          *items, '', f"{len(lines)} items.", '', 'Regards,', store_name])
+        try:
+            message_id = self.db.outbox.enqueue(email, f"Purchase order {po_no} - {store_name}", body,
+                                                kind='purchase_order', supplier_id=supplier_id,
+                                                dedupe_key=f"po:{po_no}", commit=False)
+            self.db.cursor.execute("UPDATE purchase_orders SET status = 'Sent', sent_date = ? WHERE id = ?",
+                                   (date.today().isoformat(), po_id))
+            self.db.conn.commit()
+        except Exception:
+            self.db.conn.rollback()
+            raise
+        return message_id
+
+    def cancel(self, po_id):
+        """Cancel an open order; its reorder requests go back to Pending"""
+        if self._status(po_id)[0] not in ('Draft', 'Sent'):
+            raise ValueError(f"purchase order {po_id} is already closed")
+        self.db.cursor.execute("UPDATE purchase_orders SET status = 'Cancelled' WHERE id = ?", (po_id,))
+        self.db.cursor.execute("UPDATE reorder_queue SET status = 'Pending', po_id = NULL WHERE po_id = ?",
+                               (po_id,))
+        self.db.conn.commit()
+
+    def receive(self, po_id, received_date=None):
+        """Add an open order's lines to stock and record the supplier's lead time
+
+        Returns the lead time in days.
+        """
+        status, supplier_id, ordered = self._status(po_id)
+        if status not in ('Draft', 'Sent'):
+            raise ValueError(f"purchase order {po_id} is already {status.lower()}")
+        received = str(received_date or date.today())[:10]
+        cursor = self.db.cursor
+        try:
+            lead_days = self.record_lead_time(supplier_id, ordered, received, po_id, commit=False)
+            cursor.execute('''
+                UPDATE medicines SET quantity = medicines.quantity + l.quantity, last_updated = CURRENT_TIMESTAMP
+                FROM (SELECT medicine_id, SUM(quantity) AS quantity FROM purchase_order_lines
+                      WHERE po_id = ? GROUP BY medicine_id) AS l
+                WHERE medicines.id = l.medicine_id
+            ''', (po_id,))
+            cursor.execute("UPDATE purchase_orders SET status = 'Received', received_date = ? WHERE id = ?",
+                           (received, po_id))
+            cursor.execute("UPDATE reorder_queue SET status = 'Received' WHERE po_id = ?", (po_id,))
+            self.db.conn.commit()
+        except Exception:
+            self.db.conn.rollback()
+            raise
+        self.db.barcodes.invalidate()
+        self.db.search_index.invalidate()
+        # New stock can clear low-stock alerts
+        self.db.auto_resolve_alerts()
+        return lead_days